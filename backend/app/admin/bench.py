@@ -0,0 +1,311 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import platform
+import time
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Optional
+from urllib.parse import urlencode
+
+import httpx
+
+from .. import models
+from ..core.config import get_settings
+from ..database import SessionLocal, ensure_schema
+from ..services.telegram_auth import derive_secret_key, init_data_hash
+
+DEFAULT_ENDPOINTS = ("services", "portfolio", "create_request", "webhook")
+# Signs initData for in-process runs when no TELEGRAM_BOT_TOKEN is configured.
+BENCH_BOT_TOKEN = "123456:BENCH"
+
+
+@dataclass(slots=True)
+class Scenario:
+    name: str
+    method: str
+    path: str
+    build: Callable[[int], dict[str, Any]] = field(default=lambda _: {})
+
+
+@dataclass(slots=True)
+class EndpointResult:
+    name: str
+    requests: int
+    errors: int
+    # 429 answers; kept out of errors, RPS and latencies, which they would skew.
+    rate_limited: int
+    duration_s: float
+    rps: float
+    mean_ms: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    status_codes: dict[str, int]
+
+
+@dataclass(slots=True)
+class BenchConfig:
+    requests_per_endpoint: int = 500
+    concurrency: int = 20
+    endpoints: tuple[str, ...] = DEFAULT_ENDPOINTS
+    services: int = 0
+    portfolio: int = 0
+    existing_requests: int = 0
+    users: int = 100
+    base_url: Optional[str] = None
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted sample."""
+
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def sign_init_data(user_id: int, bot_token: str, auth_date: int | None = None) -> str:
+    """Build WebApp ``initData`` signed the same way Telegram does."""
+
+    data = {
+        "auth_date": str(auth_date or int(time.time())),
+        "query_id": f"bench-{user_id}",
+        "user": json.dumps(
+            {"id": user_id, "first_name": "Bench", "username": f"bench_{user_id}"},
+            separators=(",", ":"),
+        ),
+    }
+    data["hash"] = init_data_hash(derive_secret_key(bot_token), data)
+    return urlencode(data)
+
+
+def seed_dataset(services: int, portfolio: int, existing_requests: int) -> None:
+    """Top tables up with synthetic rows until they hold at least the given counts."""
+
+    ensure_schema()
+    with SessionLocal() as db:
+        have = db.query(models.Service).count()
+        db.add_all(
+            models.Service(
+                name=f"bench-service-{n}",
+                description="Synthetic benchmark service",
+                price="от 1000 ₽",
+                icon="tools",
+                is_active=True,
+            )
+            for n in range(have, services)
+        )
+        have = db.query(models.PortfolioItem).count()
+        db.add_all(
+            models.PortfolioItem(
+                title=f"bench-portfolio-{n}",
+                description="Synthetic benchmark portfolio item",
+                image_url="https://images.unsplash.com/photo-1505691938895-1758d7feb511",
+                wallpaper_type="Флизелин",
+                area_sqm="42",
+                highlights="Synthetic",
+            )
+            for n in range(have, portfolio)
+        )
+        have = db.query(models.Request).count()
+        if existing_requests > have:
+            db.merge(models.User(telegram_id=1, first_name="Bench"))
+            db.add_all(
+                models.Request(user_id=1, details=f"bench-request-{n}")
+                for n in range(have, existing_requests)
+            )
+        db.commit()
+
+
+def build_scenarios(config: BenchConfig) -> list[Scenario]:
+    settings = get_settings()
+    bot_token = settings.telegram_bot_token
+    if not bot_token and "create_request" in config.endpoints:
+        # A remote server would answer 401 to initData signed with a made-up token.
+        raise ValueError("create_request needs TELEGRAM_BOT_TOKEN of the benchmarked server")
+    init_data = (
+        [sign_init_data(10_000 + n, bot_token) for n in range(max(1, config.users))]
+        if bot_token
+        else []
+    )
+    webhook_headers = (
+        {"X-Telegram-Bot-Api-Secret-Token": settings.telegram_webhook_secret}
+        if settings.telegram_webhook_secret
+        else {}
+    )
+    update_ids = itertools.count(int(time.time()))
+
+    def create_request(n: int) -> dict[str, Any]:
+        return {
+            "json": {"service_id": None, "details": f"bench #{n}"},
+            "headers": {"X-Telegram-Init-Data": init_data[n % len(init_data)]},
+        }
+
+    def webhook(n: int) -> dict[str, Any]:
+        chat_id = 20_000 + n % max(1, config.users)
+        update = {
+            "update_id": next(update_ids),
+            "message": {
+                "message_id": n + 1,
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "from": {"id": chat_id, "is_bot": False, "first_name": "Bench"},
+                "text": "/start" if n % 2 else "Сколько стоит поклейка?",
+            },
+        }
+        return {"json": update, "headers": webhook_headers}
+
+    scenarios = {
+        "services": Scenario("services", "GET", "/api/services/"),
+        "portfolio": Scenario("portfolio", "GET", "/api/portfolio/"),
+        "create_request": Scenario("create_request", "POST", "/api/requests/", create_request),
+        "webhook": Scenario("webhook", "POST", "/telegram/webhook", webhook),
+    }
+    unknown = set(config.endpoints) - scenarios.keys()
+    if unknown:
+        raise ValueError(f"Unknown endpoints: {', '.join(sorted(unknown))}")
+    return [scenarios[name] for name in config.endpoints]
+
+
+async def run_scenario(
+    client: httpx.AsyncClient, scenario: Scenario, total: int, concurrency: int
+) -> EndpointResult:
+    requests = [scenario.build(n) for n in range(total)]
+    latencies: list[float] = []
+    status_codes: dict[str, int] = {}
+    errors = 0
+    rate_limited = 0
+    cursor = iter(requests)
+
+    async def worker() -> None:
+        nonlocal errors, rate_limited
+        for kwargs in cursor:
+            started = time.perf_counter()
+            try:
+                response = await client.request(scenario.method, scenario.path, **kwargs)
+                code = str(response.status_code)
+            except httpx.HTTPError:
+                code = "transport_error"
+            status_codes[code] = status_codes.get(code, 0) + 1
+            if code == "429":
+                rate_limited += 1
+                continue
+            if not code.isdigit() or int(code) >= 400:
+                errors += 1
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    duration = time.perf_counter() - started
+
+    latencies.sort()
+    return EndpointResult(
+        name=scenario.name,
+        requests=total,
+        errors=errors,
+        rate_limited=rate_limited,
+        duration_s=round(duration, 4),
+        rps=round(len(latencies) / duration, 2) if duration else 0.0,
+        mean_ms=round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+        p50_ms=round(percentile(latencies, 50), 3),
+        p95_ms=round(percentile(latencies, 95), 3),
+        p99_ms=round(percentile(latencies, 99), 3),
+        status_codes=status_codes,
+    )
+
+
+def _null_bot(token: str):
+    """Bot whose API calls all answer ``None``.
+
+    Keeps webhook handlers off the network so the benchmark measures only the
+    service's own update processing.
+    """
+
+    from aiogram import Bot
+    from aiogram.client.session.base import BaseSession
+
+    class NullBotSession(BaseSession):
+        async def make_request(self, bot, method, timeout=None):
+            return None
+
+        async def stream_content(self, *args, **kwargs) -> AsyncIterator[bytes]:
+            yield b""
+
+        async def close(self) -> None:
+            return None
+
+    return Bot(token=token, session=NullBotSession())
+
+
+@asynccontextmanager
+async def _in_process_client() -> AsyncIterator[httpx.AsyncClient]:
+    from ..main import create_app
+    from ..services.request_guard import RateLimiter, get_request_rate_limiter
+    from ..telegram.webhook import telegram_webhook_router
+
+    settings = get_settings()
+    telegram_webhook_router.bot = _null_bot(settings.telegram_bot_token)
+    app = create_app()
+    # A few users send hundreds of requests here; the per-user limit would turn them into 429s.
+    unlimited = RateLimiter(0, 1, 1)
+    app.dependency_overrides[get_request_rate_limiter] = lambda: unlimited
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            yield client
+
+
+def _remote_client(base_url: str) -> httpx.AsyncClient:
+    return httpx.AsyncClient(base_url=base_url, timeout=30)
+
+
+async def run_benchmark(config: BenchConfig) -> dict[str, Any]:
+    """Run every configured scenario and return a JSON-serialisable report."""
+
+    if config.base_url is None:
+        settings = get_settings()
+        # The app in this process verifies initData with the same settings object.
+        settings.telegram_bot_token = settings.telegram_bot_token or BENCH_BOT_TOKEN
+        seed_dataset(config.services, config.portfolio, config.existing_requests)
+        clients = _in_process_client()
+    else:
+        clients = _remote_client(config.base_url)
+
+    scenarios = build_scenarios(config)
+    results: list[EndpointResult] = []
+    async with clients as client:
+        for scenario in scenarios:
+            # One untimed request warms caches and lazy initialisation.
+            await client.request(scenario.method, scenario.path, **scenario.build(0))
+            results.append(
+                await run_scenario(
+                    client, scenario, config.requests_per_endpoint, config.concurrency
+                )
+            )
+
+    return {
+        "started_at": datetime.utcnow().isoformat(timespec="seconds"),
+        "target": config.base_url or "in-process",
+        "python": platform.python_version(),
+        "config": asdict(config),
+        "results": [asdict(result) for result in results],
+    }
+
+
+def format_report(report: dict[str, Any]) -> str:
+    header = (
+        f"{'endpoint':<16}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+        f"{'errors':>8}{'429':>6}"
+    )
+    lines = [header, "-" * len(header)]
+    for result in report["results"]:
+        lines.append(
+            f"{result['name']:<16}{result['rps']:>10.1f}{result['p50_ms']:>10.2f}"
+            f"{result['p95_ms']:>10.2f}{result['p99_ms']:>10.2f}{result['errors']:>8}"
+            f"{result.get('rate_limited', 0):>6}"
+        )
+    return "\n".join(lines)
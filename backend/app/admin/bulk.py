@@ -0,0 +1,267 @@
+from __future__ import annotations
+
+import csv
+import json
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from enum import Enum
+from pathlib import Path
+from typing import IO, Any, Callable, Iterable, Iterator, Optional
+
+from sqlalchemy import Boolean, DateTime, Enum as SQLEnum, Integer, Table, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from .. import crud, models
+from ..services import analytics
+from ..services.catalog_cache import PORTFOLIO_KEY, SERVICES_KEY, notify_catalog_changed
+
+FORMATS = ("csv", "jsonl")
+
+
+@dataclass(frozen=True, slots=True)
+class EntitySpec:
+    model: type
+    # Candidate conflict targets, tried in order; the first one fully present
+    # in a group of rows is used for ON CONFLICT.
+    conflict_keys: tuple[tuple[str, ...], ...]
+
+    @property
+    def table(self) -> Table:
+        return self.model.__table__
+
+
+# Imports into these tables must refresh the API's catalog cache.
+CATALOG_KEYS = {"services": SERVICES_KEY, "portfolio": PORTFOLIO_KEY}
+
+ENTITIES: dict[str, EntitySpec] = {
+    "services": EntitySpec(models.Service, (("id",), ("name",))),
+    "portfolio": EntitySpec(models.PortfolioItem, (("id",),)),
+    "users": EntitySpec(models.User, (("telegram_id",),)),
+    "requests": EntitySpec(models.Request, (("id",),)),
+}
+
+
+@dataclass(slots=True)
+class BulkResult:
+    rows: int
+    batches: int
+    duration_s: float
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.duration_s if self.duration_s else 0.0
+
+
+def resolve_format(path: str, fmt: Optional[str]) -> str:
+    if fmt is None:
+        suffix = Path(path).suffix.lower().lstrip(".")
+        fmt = {"json": "jsonl", "ndjson": "jsonl"}.get(suffix, suffix)
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt!r}; use one of: {', '.join(FORMATS)}")
+    return fmt
+
+
+@contextmanager
+def _open(path: str, mode: str) -> Iterator[IO[str]]:
+    if path == "-":
+        yield sys.stdin if "r" in mode else sys.stdout
+        return
+    with open(path, mode, encoding="utf-8", newline="") as handle:
+        yield handle
+
+
+def _parse_bool(value: str) -> bool:
+    return value.strip().lower() in {"1", "true", "t", "yes", "y"}
+
+
+def _parse_enum(enum_class: type[Enum]) -> Callable[[Any], Enum]:
+    def parse(value: Any) -> Enum:
+        try:
+            return enum_class(value)
+        except ValueError:
+            return enum_class[value]
+
+    return parse
+
+
+def _column_parsers(table: Table) -> dict[str, Callable[[Any], Any]]:
+    parsers: dict[str, Callable[[Any], Any]] = {}
+    for column in table.columns:
+        if isinstance(column.type, SQLEnum) and column.type.enum_class is not None:
+            parsers[column.name] = _parse_enum(column.type.enum_class)
+        elif isinstance(column.type, Boolean):
+            parsers[column.name] = lambda v: v if isinstance(v, bool) else _parse_bool(str(v))
+        elif isinstance(column.type, Integer):
+            parsers[column.name] = int
+        elif isinstance(column.type, DateTime):
+            parsers[column.name] = lambda v: v if isinstance(v, datetime) else datetime.fromisoformat(v)
+        else:
+            parsers[column.name] = str
+    return parsers
+
+
+def read_rows(path: str, fmt: str, table: Table) -> Iterator[dict[str, Any]]:
+    """Stream typed rows for ``table`` from a CSV or JSONL file (``-`` is stdin).
+
+    Empty cells become ``NULL``, or are left out for NOT NULL columns so the
+    column default applies. Unknown columns are rejected.
+    """
+
+    parsers = _column_parsers(table)
+    required = {column.name for column in table.columns if not column.nullable}
+    with _open(path, "r") as handle:
+        records: Iterable[dict[str, Any]]
+        if fmt == "csv":
+            records = csv.DictReader(handle)
+        else:
+            records = (json.loads(line) for line in handle if line.strip())
+
+        for line_no, record in enumerate(records, start=1):
+            unknown = record.keys() - parsers.keys()
+            if unknown:
+                raise ValueError(f"Row {line_no}: unknown columns {', '.join(sorted(unknown))}")
+            try:
+                yield {
+                    name: None if value is None or value == "" else parsers[name](value)
+                    for name, value in record.items()
+                    if not (name in required and (value is None or value == ""))
+                }
+            except (KeyError, ValueError) as exc:
+                raise ValueError(f"Row {line_no}: {exc}") from exc
+
+
+def _batched(rows: Iterable[dict[str, Any]], size: int) -> Iterator[list[dict[str, Any]]]:
+    batch: list[dict[str, Any]] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def upsert_statement(engine: Engine, spec: EntitySpec, rows: list[dict[str, Any]]):
+    """One multi-row ``INSERT ... ON CONFLICT DO UPDATE`` for rows sharing a column set."""
+
+    columns = rows[0].keys()
+    statement = crud.dialect_insert(engine.dialect.name)(spec.table).values(rows)
+    for keys in spec.conflict_keys:
+        if set(keys) <= columns:
+            updates = {name: statement.excluded[name] for name in columns if name not in keys}
+            if updates:
+                return statement.on_conflict_do_update(index_elements=keys, set_=updates)
+            return statement.on_conflict_do_nothing(index_elements=keys)
+    # No natural key in the data: plain inserts with generated ids.
+    return statement
+
+
+def _group_by_columns(batch: list[dict[str, Any]]) -> Iterator[list[dict[str, Any]]]:
+    groups: dict[tuple[str, ...], list[dict[str, Any]]] = {}
+    for row in batch:
+        groups.setdefault(tuple(sorted(row)), []).append(row)
+    return iter(groups.values())
+
+
+def _sync_sequence(engine: Engine, table: Table) -> None:
+    # Explicit ids bypass Postgres sequences; move them past the imported rows.
+    if engine.dialect.name != "postgresql":
+        return
+    primary_key = list(table.primary_key.columns)
+    if len(primary_key) != 1 or not primary_key[0].autoincrement:
+        return
+    column = primary_key[0].name
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                f"SELECT setval(pg_get_serial_sequence(:table, :column), "
+                f"COALESCE((SELECT MAX({column}) FROM {table.name}), 1))"
+            ),
+            {"table": table.name, "column": column},
+        )
+
+
+def import_rows(
+    engine: Engine,
+    entity: str,
+    rows: Iterable[dict[str, Any]],
+    *,
+    batch_size: int = 1000,
+    on_batch: Optional[Callable[[BulkResult], None]] = None,
+) -> BulkResult:
+    """Upsert ``rows`` into ``entity`` one batch per transaction."""
+
+    spec = ENTITIES[entity]
+    started = time.perf_counter()
+    result = BulkResult(rows=0, batches=0, duration_s=0.0)
+    try:
+        for batch in _batched(rows, max(1, batch_size)):
+            with engine.begin() as conn:
+                for group in _group_by_columns(batch):
+                    conn.execute(upsert_statement(engine, spec, group))
+            result.rows += len(batch)
+            result.batches += 1
+            result.duration_s = time.perf_counter() - started
+            if on_batch is not None:
+                on_batch(result)
+    finally:
+        if spec.model is models.Request and result.rows:
+            # Core upserts skip the ORM events that keep status counters and
+            # daily rollups current; batches committed before a failure count too.
+            with Session(engine) as db:
+                crud.recount_request_statuses(db)
+            analytics.backfill(engine)
+    _sync_sequence(engine, spec.table)
+    if entity in CATALOG_KEYS and result.rows:
+        notify_catalog_changed(CATALOG_KEYS[entity])
+    result.duration_s = time.perf_counter() - started
+    return result
+
+
+def _serialise(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+
+def export_rows(
+    engine: Engine,
+    entity: str,
+    path: str,
+    fmt: str,
+    *,
+    batch_size: int = 1000,
+) -> BulkResult:
+    """Stream ``entity`` to CSV/JSONL in primary-key order, ``batch_size`` rows at a time."""
+
+    table = ENTITIES[entity].table
+    columns = [column.name for column in table.columns]
+    started = time.perf_counter()
+    result = BulkResult(rows=0, batches=0, duration_s=0.0)
+
+    with engine.connect() as conn, _open(path, "w") as handle:
+        writer = csv.DictWriter(handle, fieldnames=columns) if fmt == "csv" else None
+        if writer is not None:
+            writer.writeheader()
+        rows = conn.execution_options(yield_per=max(1, batch_size)).execute(
+            select(table).order_by(*table.primary_key.columns)
+        )
+        for partition in rows.mappings().partitions():
+            for row in partition:
+                record = {name: _serialise(row[name]) for name in columns}
+                if writer is not None:
+                    writer.writerow(record)
+                else:
+                    handle.write(json.dumps(record, ensure_ascii=False) + "\n")
+            result.rows += len(partition)
+            result.batches += 1
+
+    result.duration_s = time.perf_counter() - started
+    return result
+
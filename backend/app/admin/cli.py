@@ -1,26 +1,40 @@
 from __future__ import annotations
 
+import asyncio
+import json
+import os
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, Iterable, Optional
 
 import typer
+from sqlalchemy.exc import DBAPIError
 
 from .. import crud, models
 from ..core.config import get_settings
-from ..database import Base, SessionLocal, engine
+from ..database import SessionLocal, engine, ensure_schema
 
-cli = typer.Typer(help="Админ-инструменты мастера")
+if TYPE_CHECKING:
+    from .bulk import BulkResult
 
+# Commands import their heavy dependencies (aiogram, Pillow, the HTTP app)
+# themselves, so e.g. `list-requests` starts without loading the bot stack.
+DEFAULT_BENCH_ENDPOINTS = "services,portfolio,create_request,webhook"
 
-def _ensure_db() -> None:
-    Base.metadata.create_all(bind=engine)
+cli = typer.Typer(help="Админ-инструменты мастера")
 
 
 @cli.command()
-def seed(sample_images: Optional[str] = None) -> None:
-    """Fill the database with demo services and portfolio items."""
+def seed(
+    sample_images: Optional[str] = None,
+    workers: Optional[int] = typer.Option(None, help="Image ingestion processes"),
+) -> None:
+    """Fill the database with demo services and portfolio items.
+
+    With --sample-images (a file with one URL or path per line) the images
+    are also ingested into local storage with resized variants.
+    """
 
-    _ensure_db()
+    ensure_schema()
     demo_services = [
         {
             "name": "Поклейка обоев",
@@ -73,6 +87,10 @@ def seed(sample_images: Optional[str] = None) -> None:
         },
     ]
 
+    image_keys: dict[str, str] = {}
+    if sample_images:
+        image_keys = _ingest((item["image_url"] for item in demo_portfolio), workers)
+
     with SessionLocal() as db:
         for data in demo_services:
             existing = (
@@ -91,24 +109,413 @@ def seed(sample_images: Optional[str] = None) -> None:
                 .filter(models.PortfolioItem.title == data["title"])
                 .first()
             )
+            image_key = image_keys.get(data["image_url"])
             if exists:
+                if image_key and not exists.image_key:
+                    exists.image_key = image_key
                 continue
-            item = models.PortfolioItem(**data)
+            item = models.PortfolioItem(**data, image_key=image_key)
             db.add(item)
 
         db.commit()
         typer.echo("Demo content created")
 
 
+def _ingest(sources: Iterable[str], workers: Optional[int]) -> dict[str, str]:
+    from ..services.images import ingest_many
+
+    settings = get_settings()
+    keys = ingest_many(
+        sources, settings.media_dir, workers or settings.media_ingest_workers or None
+    )
+    typer.echo(f"Ingested {len(keys)} image(s) into {settings.media_dir}")
+    return keys
+
+
+@cli.command("ingest-images")
+def ingest_images(
+    force: bool = typer.Option(False, help="Re-ingest items that already have variants"),
+    workers: Optional[int] = typer.Option(None, help="Image ingestion processes"),
+) -> None:
+    """Download portfolio images and build thumb/medium/full WebP and JPEG variants."""
+
+    ensure_schema()
+    with SessionLocal() as db:
+        items = [
+            item
+            for item in db.query(models.PortfolioItem).all()
+            if force or not item.image_key
+        ]
+        keys = _ingest((item.image_url for item in items), workers)
+        for item in items:
+            item.image_key = keys.get(item.image_url, item.image_key)
+        db.commit()
+
+
+def _resolve_bulk_args(entity: str, path: str, fmt: Optional[str]) -> str:
+    from .bulk import ENTITIES, resolve_format
+
+    if entity not in ENTITIES:
+        raise typer.BadParameter(f"choose one of: {', '.join(ENTITIES)}", param_hint="ENTITY")
+    try:
+        return resolve_format(path, fmt)
+    except ValueError as exc:
+        raise typer.BadParameter(str(exc), param_hint="--format") from exc
+
+
+def _report(verb: str, entity: str, result: BulkResult) -> None:
+    typer.echo(
+        f"{verb} {result.rows} {entity} row(s) in {result.batches} batch(es), "
+        f"{result.duration_s:.2f}s ({result.rows_per_second:.0f} rows/s)",
+        err=True,
+    )
+
+
+@cli.command("import")
+def import_data(
+    entity: str = typer.Argument(..., help="services, portfolio, users or requests"),
+    path: str = typer.Argument(..., help="CSV or JSONL file, '-' for stdin"),
+    fmt: Optional[str] = typer.Option(None, "--format", help="csv or jsonl (default: by suffix)"),
+    batch_size: int = typer.Option(1000, help="Rows per INSERT ... ON CONFLICT statement"),
+) -> None:
+    """Upsert rows from CSV/JSONL; rows with a key (id, name, telegram_id) are updated."""
+
+    from .bulk import ENTITIES, import_rows, read_rows
+
+    fmt = _resolve_bulk_args(entity, path, fmt)
+    ensure_schema()
+    rows = read_rows(path, fmt, ENTITIES[entity].table)
+    try:
+        result = import_rows(
+            engine,
+            entity,
+            rows,
+            batch_size=batch_size,
+            on_batch=lambda progress: _report("Importing:", entity, progress),
+        )
+    except (ValueError, DBAPIError) as exc:
+        reason = exc.orig if isinstance(exc, DBAPIError) else exc
+        typer.echo(f"Import stopped: {reason}", err=True)
+        raise typer.Exit(code=1) from exc
+    _report("Imported", entity, result)
+
+
+@cli.command("export")
+def export_data(
+    entity: str = typer.Argument(..., help="services, portfolio, users or requests"),
+    path: str = typer.Argument("-", help="Output file, '-' for stdout"),
+    fmt: Optional[str] = typer.Option(None, "--format", help="csv or jsonl (default: by suffix)"),
+    batch_size: int = typer.Option(1000, help="Rows fetched per round-trip"),
+) -> None:
+    """Stream a table to CSV/JSONL without loading it into memory."""
+
+    from .bulk import export_rows
+
+    if path == "-" and fmt is None:
+        fmt = "jsonl"
+    fmt = _resolve_bulk_args(entity, path, fmt)
+    ensure_schema()
+    _report("Exported", entity, export_rows(engine, entity, path, fmt, batch_size=batch_size))
+
+
+@cli.command()
+def reindex(
+    kind: Optional[str] = typer.Option(None, help="request or portfolio (default: both)"),
+    batch_size: int = typer.Option(1000, help="Rows copied per progress step"),
+) -> None:
+    """Rebuild the full-text search indexes."""
+
+    from ..services.search import KINDS, is_supported, reindex as rebuild
+
+    if kind is not None and kind not in KINDS:
+        raise typer.BadParameter(f"choose one of: {', '.join(KINDS)}", param_hint="--kind")
+    ensure_schema()
+    if not is_supported(engine):
+        typer.echo("Full-text search needs SQLite FTS5", err=True)
+        raise typer.Exit(code=1)
+    for result in rebuild(
+        engine,
+        kinds=(kind,) if kind else KINDS,
+        batch_size=batch_size,
+        on_batch=lambda progress: typer.echo(
+            f"{progress.index}: {progress.rows} row(s)", err=True
+        ),
+    ):
+        typer.echo(
+            f"Reindexed {result.rows} row(s) into {result.index} in {result.batches} "
+            f"batch(es), {result.duration_s:.2f}s"
+        )
+
+
+@cli.command()
+def migrate(
+    show_status: bool = typer.Option(
+        False, "--status", help="List applied and pending migrations"
+    ),
+    to: Optional[int] = typer.Option(None, help="Stop after this version"),
+) -> None:
+    """Apply pending schema migrations; new indexes are built online."""
+
+    from .. import migrations
+    from ..database import migrate_schema
+
+    if show_status:
+        current = migrations.current_version(engine)
+        for migration in migrations.MIGRATIONS:
+            state = "applied" if migration.version <= current else "pending"
+            typer.echo(f"{migration.version:04d} {migration.name}: {state}")
+        return
+
+    results = migrate_schema(
+        target=to,
+        on_step=lambda result: typer.echo(
+            f"Applied {result.version:04d} {result.name} in {result.duration_s:.2f}s"
+        ),
+    )
+    if not results:
+        typer.echo("Schema is up to date")
+
+
+@cli.command("backfill-analytics")
+def backfill_analytics(
+    chunk_size: int = typer.Option(5000, help="Request ids grouped per query"),
+) -> None:
+    """Rebuild the daily request rollups behind /api/analytics."""
+
+    from ..services.analytics import backfill
+
+    ensure_schema()
+    result = backfill(
+        engine,
+        chunk_size=chunk_size,
+        on_chunk=lambda progress: typer.echo(f"{progress.rows} request(s)", err=True),
+    )
+    typer.echo(
+        f"Counted {result.rows} request(s) into {result.groups} rollup row(s) in "
+        f"{result.chunks} chunk(s), {result.duration_s:.2f}s"
+    )
+
+
+@cli.command("build-assets")
+def build_frontend_assets(
+    output: Optional[Path] = typer.Option(None, help="Build directory (FRONTEND_BUILD_DIR)"),
+) -> None:
+    """Fingerprint and precompress the Mini App frontend."""
+
+    from ..services.assets import build_assets
+
+    settings = get_settings()
+    target = output or settings.frontend_build_dir
+    build = build_assets(settings.frontend_dir, target, settings.static_mount_path)
+    for original, hashed in sorted(build.manifest.items()):
+        typer.echo(f"{original} -> {hashed}")
+    typer.echo(f"Wrote {build.written} file(s) to {target}, removed {build.removed} stale")
+
+
 @cli.command()
-def list_requests() -> None:
-    _ensure_db()
+def list_requests(
+    status: Optional[models.RequestStatusEnum] = None,
+    service_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+    chunk_size: int = typer.Option(500, help="Rows fetched per keyset page"),
+) -> None:
+    ensure_schema()
     with SessionLocal() as db:
-        for request in crud.list_requests(db):
+        for request in crud.iter_requests(
+            db,
+            chunk_size=chunk_size,
+            status=status,
+            service_id=service_id,
+            user_id=user_id,
+        ):
             typer.echo(
                 f"#{request.id} | {request.status} | user={request.user_id} | service={request.service_id}"
             )
 
 
+@cli.command()
+def bench(
+    requests_per_endpoint: int = typer.Option(500, "--requests", "-n"),
+    concurrency: int = typer.Option(20, "--concurrency", "-c"),
+    endpoints: str = typer.Option(DEFAULT_BENCH_ENDPOINTS, help="Comma-separated list"),
+    services: int = typer.Option(0, help="Ensure at least this many services exist"),
+    portfolio: int = typer.Option(0, help="Ensure at least this many portfolio items exist"),
+    existing_requests: int = typer.Option(0, help="Ensure at least this many requests exist"),
+    users: int = typer.Option(100, help="Distinct Telegram users for signed requests"),
+    base_url: Optional[str] = typer.Option(None, help="Benchmark a running server instead"),
+    output: Path = typer.Option(Path("bench_results.json"), help="Where to save JSON results"),
+) -> None:
+    """Measure latency percentiles and RPS of the HTTP API and webhook.
+
+    Without --base-url the app is driven in-process and synthetic rows are
+    added to the configured database, so point DATABASE_URL at a scratch DB.
+    """
+
+    from .bench import BenchConfig, format_report, run_benchmark
+
+    config = BenchConfig(
+        requests_per_endpoint=requests_per_endpoint,
+        concurrency=concurrency,
+        endpoints=tuple(name.strip() for name in endpoints.split(",") if name.strip()),
+        services=services,
+        portfolio=portfolio,
+        existing_requests=existing_requests,
+        users=users,
+        base_url=base_url,
+    )
+    report = asyncio.run(run_benchmark(config))
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2))
+    typer.echo(format_report(report))
+    typer.echo(f"Results saved to {output}")
+
+
+@cli.command("startup-bench")
+def startup_bench(
+    top: int = typer.Option(10, help="Packages to list per import profile"),
+    repeat: int = typer.Option(3, help="Runs per measurement; the best one is kept"),
+    max_import_seconds: Optional[float] = typer.Option(
+        None, "--max-import-seconds", help="Exit non-zero if an import takes longer"
+    ),
+    output: Path = typer.Option(Path("startup_results.json"), help="Where to save JSON results"),
+) -> None:
+    """Profile cold imports and time-to-first-response in fresh interpreters."""
+
+    from .startup_bench import check_thresholds, format_startup_report, run_startup_benchmark
+
+    report = run_startup_benchmark(top=top, repeat=repeat)
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2))
+    typer.echo(format_startup_report(report))
+    typer.echo(f"Results saved to {output}")
+    failures = check_thresholds(report, max_import_seconds)
+    for failure in failures:
+        typer.echo(failure, err=True)
+    if failures:
+        raise typer.Exit(code=1)
+
+
+@cli.command("serialization-bench")
+def serialization_bench(
+    rows: int = typer.Option(10_000, help="Rows per payload"),
+    repeat: int = typer.Option(5, help="Runs per path; the best one is kept"),
+    output: Path = typer.Option(
+        Path("serialization_results.json"), help="Where to save JSON results"
+    ),
+) -> None:
+    """Compare response_model, TypeAdapter and RowEncoder on long list payloads."""
+
+    from .serialization_bench import format_serialization_report, run_serialization_benchmark
+
+    report = run_serialization_benchmark(rows=rows, repeat=repeat)
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2))
+    typer.echo(format_serialization_report(report))
+    typer.echo(f"Results saved to {output}")
+    if not all(result["matches_response_model"] for result in report["results"]):
+        raise typer.Exit(code=1)
+
+
+async def _run_outbox_worker() -> None:
+    from ..services.notifications import notification_service
+    from ..services.outbox import outbox_worker
+
+    await notification_service.start()
+    try:
+        await outbox_worker.run_forever()
+    finally:
+        await notification_service.stop()
+
+
+@cli.command("outbox-worker")
+def run_outbox_worker() -> None:
+    """Deliver pending master notifications from the outbox until interrupted."""
+
+    ensure_schema()
+    typer.echo("Outbox worker started, press Ctrl+C to stop")
+    try:
+        asyncio.run(_run_outbox_worker())
+    except KeyboardInterrupt:
+        typer.echo("Outbox worker stopped")
+
+
+@cli.command("bot-poll")
+def bot_poll(
+    timeout: Optional[int] = typer.Option(None, help="Long polling timeout, seconds"),
+    limit: Optional[int] = typer.Option(None, help="Updates per getUpdates call (max 100)"),
+    workers: Optional[int] = typer.Option(None, help="Concurrent update workers"),
+    api_base: Optional[str] = typer.Option(None, help="Custom Bot API server URL"),
+) -> None:
+    """Run the bot with long polling instead of the webhook."""
+
+    from ..telegram.polling import build_polling_runner
+
+    overrides = {
+        "telegram_polling_timeout": timeout,
+        "telegram_polling_limit": limit,
+        "telegram_update_workers": workers,
+        "telegram_api_base_url": api_base,
+    }
+    settings = get_settings().model_copy(
+        update={key: value for key, value in overrides.items() if value is not None}
+    )
+    runner = build_polling_runner(settings)
+    typer.echo("Long polling started, press Ctrl+C to stop")
+    try:
+        asyncio.run(runner.run())
+    except KeyboardInterrupt:
+        typer.echo("Long polling stopped")
+
+
+@cli.command("fake-bot-api")
+def fake_bot_api(host: str = "127.0.0.1", port: int = 8081) -> None:
+    """Serve an in-memory Telegram Bot API for offline runs of bot-poll."""
+
+    import uvicorn
+
+    from ..telegram.fake_api import create_fake_api_app
+
+    uvicorn.run(create_fake_api_app(), host=host, port=port)
+
+
+@cli.command()
+def serve(
+    host: str = "0.0.0.0",
+    port: int = 8000,
+    workers: int = typer.Option(os.cpu_count() or 1, help="Worker processes"),
+    log_level: str = "info",
+) -> None:
+    """Run the API in several worker processes.
+
+    Schema creation and the frontend build happen once here, before workers
+    start; the workers share catalog invalidations and Telegram update dedup
+    through SHARED_STATE_PATH.
+    """
+
+    import uvicorn
+
+    from ..services.assets import build_assets
+
+    settings = get_settings()
+    ensure_schema()
+    if settings.frontend_build_on_startup and settings.frontend_dir.exists():
+        build_assets(settings.frontend_dir, settings.frontend_build_dir, settings.static_mount_path)
+    # Worker processes read settings from the environment they inherit.
+    os.environ["FRONTEND_BUILD_ON_STARTUP"] = "false"
+    if workers > 1:
+        os.environ.setdefault("TELEGRAM_UPDATE_SHARED_DEDUP", "true")
+        if not settings.shared_state_enabled:
+            typer.echo(
+                "SHARED_STATE_ENABLED is off: catalog caches converge only via the TTL",
+                err=True,
+            )
+
+    uvicorn.run(
+        "backend.app.main:app",
+        host=host,
+        port=port,
+        workers=workers,
+        log_level=log_level,
+        proxy_headers=True,
+    )
+
+
 if __name__ == "__main__":
     cli()
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import platform
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from pydantic import BaseModel
+
+from .. import models, schemas
+from ..core import serialization
+from ..core.serialization import RowEncoder
+
+PAYLOADS = ("requests", "portfolio", "services")
+
+
+def _rows(payload: str, count: int) -> list[Any]:
+    """Transient ORM rows shaped like production data; nothing touches the database."""
+
+    now = datetime.utcnow()
+    services = [
+        models.Service(
+            id=index,
+            name=f"Услуга {index}",
+            description="Профессиональная поклейка любых типов обоев с подготовкой стен.",
+            price="от 600 ₽/м²",
+            icon="wallpaper",
+            is_active=True,
+        )
+        for index in range(1, 11)
+    ]
+    if payload == "services":
+        return [services[index % len(services)] for index in range(count)]
+    if payload == "portfolio":
+        return [
+            models.PortfolioItem(
+                id=index,
+                title=f"Гостиная {index}",
+                description="Светлые флизелиновые обои под покраску, выравнивание стен.",
+                image_url=f"https://example.com/portfolio/{index}.jpg",
+                image_key=f"{index:032x}" if index % 2 else None,
+                wallpaper_type="флизелин",
+                area_sqm="24",
+                highlights="Подготовка стен, грунтовка, стыковка рисунка",
+                created_at=now - timedelta(minutes=index),
+                category="wallpaper",
+            )
+            for index in range(count)
+        ]
+    return [
+        models.Request(
+            id=index,
+            user_id=1_000_000 + index,
+            service_id=services[index % len(services)].id,
+            service=services[index % len(services)],
+            status=list(models.RequestStatusEnum)[index % 3],
+            details="Нужна поклейка обоев в комнате 18 м², стены уже выровнены.",
+            created_at=now - timedelta(seconds=index),
+        )
+        for index in range(count)
+    ]
+
+
+_SCHEMAS: dict[str, type[BaseModel]] = {
+    "requests": schemas.RequestPublic,
+    "portfolio": schemas.PortfolioPublic,
+    "services": schemas.ServicePublic,
+}
+
+
+def _paths(schema: type[BaseModel]) -> dict[str, Callable[[list[Any]], bytes]]:
+    field = create_response_field(name="bench", type_=list[schema], mode="serialization")
+    encoder = RowEncoder(schema)
+    loop = asyncio.new_event_loop()
+
+    def response_model(rows: list[Any]) -> bytes:
+        # What FastAPI does for a route that returns ORM rows with response_model.
+        content = loop.run_until_complete(
+            serialize_response(field=field, response_content=rows, is_coroutine=True)
+        )
+        return JSONResponse(content).body
+
+    return {
+        "response_model": response_model,
+        "type_adapter": lambda rows: encoder.adapter.dump_json(
+            encoder.adapter.validate_python(rows, from_attributes=True)
+        ),
+        "row_encoder": encoder.encode,
+    }
+
+
+def _best_of(
+    repeat: int, encode: Callable[[list[Any]], bytes], rows: list[Any]
+) -> tuple[float, bytes]:
+    best, body = float("inf"), b""
+    for _ in range(max(1, repeat)):
+        started = time.perf_counter()
+        body = encode(rows)
+        best = min(best, time.perf_counter() - started)
+    return best, body
+
+
+def run_serialization_benchmark(
+    rows: int = 10_000, repeat: int = 5, payloads: tuple[str, ...] = PAYLOADS
+) -> dict[str, Any]:
+    """Best-of-``repeat`` encode time per payload and path, with output checks."""
+
+    results = []
+    for payload in payloads:
+        data = _rows(payload, rows)
+        baseline = None
+        for path, encode in _paths(_SCHEMAS[payload]).items():
+            seconds, body = _best_of(repeat, encode, data)
+            decoded = json.loads(body)
+            if baseline is None:
+                baseline = decoded
+            results.append(
+                {
+                    "payload": payload,
+                    "path": path,
+                    "ms": round(seconds * 1000, 2),
+                    "bytes": len(body),
+                    "rows_per_s": round(rows / seconds) if seconds else None,
+                    "matches_response_model": decoded == baseline,
+                }
+            )
+    return {
+        "started_at": datetime.utcnow().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "orjson": serialization.orjson is not None,
+        "rows": rows,
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def format_serialization_report(report: dict[str, Any]) -> str:
+    engine = "orjson" if report["orjson"] else "pydantic-core (orjson not installed)"
+    lines = [f"{report['rows']} rows, best of {report['repeat']}, row_encoder uses {engine}"]
+    baselines = {
+        result["payload"]: result["ms"]
+        for result in report["results"]
+        if result["path"] == "response_model"
+    }
+    for result in report["results"]:
+        speedup = baselines[result["payload"]] / result["ms"] if result["ms"] else 0.0
+        check = "" if result["matches_response_model"] else "  OUTPUT DIFFERS"
+        lines.append(
+            f"  {result['payload']:<10}{result['path']:<16}{result['ms']:>9.1f} ms"
+            f"{speedup:>7.1f}x{check}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import json
+import platform
+import subprocess
+import sys
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Any, Optional
+
+DEFAULT_TARGETS = ("backend.app.main", "backend.app.admin.cli")
+
+# Runs in a fresh interpreter so module caches and lazy state start cold.
+_FIRST_RESPONSE_PROBE = """
+import asyncio, json, time
+started = time.perf_counter()
+from backend.app.main import app
+imported = time.perf_counter()
+
+async def probe():
+    import httpx
+    from backend.app.admin.bench import _null_bot
+    from backend.app.core.config import get_settings
+    from backend.app.telegram.webhook import telegram_webhook_router
+
+    timings = {"import_s": imported - started}
+    async with app.router.lifespan_context(app):
+        timings["lifespan_s"] = time.perf_counter() - imported
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://startup") as client:
+            response = await client.get("/api/health")
+            response.raise_for_status()
+            timings["first_response_s"] = time.perf_counter() - started
+            if get_settings().telegram_bot_token:
+                # The stub bot imports aiogram too, so it counts towards the first hit.
+                hit = time.perf_counter()
+                telegram_webhook_router.bot = _null_bot(get_settings().telegram_bot_token)
+                response = await client.post(
+                    "/telegram/webhook",
+                    json={"update_id": 1, "message": {
+                        "message_id": 1, "date": 0, "text": "/start",
+                        "chat": {"id": 1, "type": "private"},
+                        "from": {"id": 1, "is_bot": False, "first_name": "Startup"},
+                    }},
+                )
+                response.raise_for_status()
+                timings["first_webhook_s"] = time.perf_counter() - hit
+    return timings
+
+print(json.dumps(asyncio.run(probe())))
+"""
+
+
+@dataclass(slots=True)
+class ImportProfile:
+    target: str
+    total_s: float
+    modules: int
+    top: list[dict[str, Any]]
+
+
+def parse_importtime(output: str) -> list[tuple[str, int, int]]:
+    """``(module, self_us, cumulative_us)`` rows from ``-X importtime`` stderr."""
+
+    rows: list[tuple[str, int, int]] = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        if not self_us.strip().isdigit():
+            continue  # header line
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def _top_level_packages(rows: list[tuple[str, int, int]], limit: int) -> list[dict[str, Any]]:
+    # Self time summed per top-level package shows what a cold start pays for.
+    totals: dict[str, int] = {}
+    for name, self_us, _ in rows:
+        package = name.split(".")[0]
+        totals[package] = totals.get(package, 0) + self_us
+    ranked = sorted(totals.items(), key=lambda item: item[1], reverse=True)[:limit]
+    return [{"package": package, "ms": round(us / 1000, 2)} for package, us in ranked]
+
+
+def profile_import(target: str, top: int = 10) -> ImportProfile:
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Importing {target} failed:\n{completed.stderr[-2000:]}")
+    rows = parse_importtime(completed.stderr)
+    total_us = next((cumulative for name, _, cumulative in rows if name == target), 0)
+    return ImportProfile(
+        target=target,
+        total_s=round(total_us / 1_000_000, 4),
+        modules=len(rows),
+        top=_top_level_packages(rows, top),
+    )
+
+
+def measure_first_response() -> dict[str, float]:
+    """Time import, lifespan and the first HTTP/webhook responses in a fresh process."""
+
+    completed = subprocess.run(
+        [sys.executable, "-c", _FIRST_RESPONSE_PROBE],
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Startup probe failed:\n{completed.stderr[-2000:]}")
+    timings = json.loads(completed.stdout.strip().splitlines()[-1])
+    return {name: round(value, 4) for name, value in timings.items()}
+
+
+def run_startup_benchmark(
+    targets: tuple[str, ...] = DEFAULT_TARGETS, top: int = 10, repeat: int = 3
+) -> dict[str, Any]:
+    """Best-of-``repeat`` import profiles and time-to-first-response."""
+
+    profiles = []
+    for target in targets:
+        runs = [profile_import(target, top) for _ in range(max(1, repeat))]
+        profiles.append(asdict(min(runs, key=lambda run: run.total_s)))
+    responses = [measure_first_response() for _ in range(max(1, repeat))]
+    return {
+        "started_at": datetime.utcnow().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "repeat": repeat,
+        "imports": profiles,
+        "first_response": min(responses, key=lambda run: run["first_response_s"]),
+    }
+
+
+def check_thresholds(report: dict[str, Any], max_import_s: Optional[float]) -> list[str]:
+    if max_import_s is None:
+        return []
+    return [
+        f"{profile['target']} imports in {profile['total_s']:.3f}s (limit {max_import_s:.3f}s)"
+        for profile in report["imports"]
+        if profile["total_s"] > max_import_s
+    ]
+
+
+def format_startup_report(report: dict[str, Any]) -> str:
+    lines: list[str] = []
+    for profile in report["imports"]:
+        lines.append(
+            f"{profile['target']}: {profile['total_s'] * 1000:.1f} ms, {profile['modules']} modules"
+        )
+        lines.extend(f"  {item['package']:<24}{item['ms']:>10.1f} ms" for item in profile["top"])
+    lines.append("time to first response:")
+    lines.extend(
+        f"  {name:<24}{value * 1000:>10.1f} ms" for name, value in report["first_response"].items()
+    )
+    return "\n".join(lines)
@@ -0,0 +1,47 @@
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ... import schemas
+from ...database import get_async_db
+from ...services import analytics as analytics_service
+from ...services.telegram_auth import TelegramAuthResult, require_master
+
+router = APIRouter(prefix="/analytics", tags=["analytics"])
+
+DEFAULT_RANGE_DAYS = 30
+
+
+@router.get("", response_model=schemas.AnalyticsReport)
+async def read_analytics(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    group_by: list[analytics_service.Group] = Query(default=["service", "status"]),
+    _: TelegramAuthResult = Depends(require_master),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Requests per day, service and/or status, from the daily rollups.
+
+    Days are UTC creation dates; the range defaults to the last 30 days.
+    """
+
+    date_to = date_to or datetime.utcnow().date()
+    date_from = date_from or date_to - timedelta(days=DEFAULT_RANGE_DAYS - 1)
+    if date_from > date_to:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "date_from is after date_to")
+    if (date_to - date_from).days >= analytics_service.MAX_RANGE_DAYS:
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST,
+            f"Range is limited to {analytics_service.MAX_RANGE_DAYS} days",
+        )
+
+    rows = await analytics_service.report(db, date_from, date_to, group_by)
+    return schemas.AnalyticsReport(
+        date_from=date_from,
+        date_to=date_to,
+        group_by=[group for group in analytics_service.GROUPS if group in group_by],
+        total=sum(row["count"] for row in rows),
+        rows=[schemas.AnalyticsRow(**row) for row in rows],
+    )
@@ -1,12 +1,26 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-
-from ... import crud, schemas
-from ...database import get_db
+from fastapi import APIRouter, Depends, Request, Response
+from ... import crud_async, schemas
+from ...core.serialization import RowEncoder
+from ...database import AsyncSessionLocal
+from ...services.catalog_cache import (
+    PORTFOLIO_KEY,
+    CatalogCache,
+    catalog_response,
+    get_catalog_cache,
+)
 
 router = APIRouter(prefix="/portfolio", tags=["portfolio"])
 
+_portfolio_encoder = RowEncoder(schemas.PortfolioPublic)
+
+
+async def _load_portfolio() -> bytes:
+    async with AsyncSessionLocal() as db:
+        return _portfolio_encoder.encode(await crud_async.list_portfolio(db))
+
 
 @router.get("/", response_model=list[schemas.PortfolioPublic])
-def read_portfolio(db: Session = Depends(get_db)):
-    return crud.list_portfolio(db)
+async def read_portfolio(
+    request: Request, cache: CatalogCache = Depends(get_catalog_cache)
+) -> Response:
+    return catalog_response(request, await cache.get(PORTFOLIO_KEY, _load_portfolio))
@@ -1,35 +1,300 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+import base64
+from datetime import datetime
+from typing import Optional, Sequence
 
-from ... import crud, schemas
-from ...database import get_db
-from ...services.notifications import NotificationService, get_notification_service
-from ...services.telegram_auth import validate_init_data
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ... import crud, crud_async, models, schemas
+from ...core.config import get_settings
+from ...core.serialization import FastJSONResponse, RowEncoder
+from ...database import get_async_db
+from ...services.catalog_cache import CatalogCache, find_active_service, get_catalog_cache
+from ...services.notifications import RequestNotification
+from ...services.outbox import OutboxWorker, get_outbox_worker
+from ...services.request_events import (
+    RequestBroadcaster,
+    TooManySubscribers,
+    get_request_broadcaster,
+    stream_events,
+)
+from ...services.request_guard import (
+    IDEMPOTENCY_HEADER,
+    REPLAYED_HEADER,
+    IdempotencyCache,
+    RateLimiter,
+    get_idempotency_cache,
+    get_request_rate_limiter,
+)
+from ...services.request_workflow import InvalidTransition, RequestNotFound, apply_action
+from ...services.telegram_auth import (
+    TelegramAuthResult,
+    require_master,
+    require_master_stream,
+    require_telegram_auth,
+)
+from ...write_queue import WriteQueue, get_write_queue
 
 router = APIRouter(prefix="/requests", tags=["requests"])
 
 
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+_requests_encoder = RowEncoder(schemas.RequestPublic)
+
+
+def encode_cursor(request: models.Request) -> str:
+    raw = f"{request.created_at.isoformat()}|{request.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def page_response(page: Sequence[models.Request], limit: int) -> FastJSONResponse:
+    """Encode a page of requests without ``response_model`` validation."""
+
+    response = FastJSONResponse(_requests_encoder.encode(page))
+    if len(page) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(page[-1])
+    return response
+
+
+def decode_cursor(cursor: str) -> crud.RequestCursor:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, request_id = base64.urlsafe_b64decode(padded).decode().split("|")
+        return datetime.fromisoformat(created_at), int(request_id)
+    except ValueError as exc:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "Invalid cursor") from exc
+
+
 @router.get("/", response_model=list[schemas.RequestPublic])
-def read_requests(db: Session = Depends(get_db)):
-    return crud.list_requests(db)
+async def read_requests(
+    limit: int = Query(default=50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    status_filter: Optional[models.RequestStatusEnum] = Query(default=None, alias="status"),
+    service_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Newest-first page of requests; follow ``X-Next-Cursor`` for the next one."""
+
+    page = await crud_async.list_requests(
+        db,
+        limit=limit,
+        after=decode_cursor(cursor) if cursor else None,
+        status=status_filter,
+        service_id=service_id,
+        user_id=user_id,
+    )
+    return page_response(page, limit)
+
+
+@router.get("/queue", response_model=list[schemas.RequestPublic])
+async def read_request_queue(
+    limit: int = Query(default=50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    status_filter: Optional[models.RequestStatusEnum] = Query(default=None, alias="status"),
+    _: TelegramAuthResult = Depends(require_master),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Unfinished requests, oldest first; follow ``X-Next-Cursor`` for more."""
+
+    page = await crud_async.list_request_queue(
+        db,
+        limit=limit,
+        after=decode_cursor(cursor) if cursor else None,
+        status=status_filter,
+    )
+    return page_response(page, limit)
+
+
+@router.get("/counts", response_model=schemas.RequestStatusCounts)
+async def read_status_counts(
+    _: TelegramAuthResult = Depends(require_master),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Requests per status from the maintained counters, without ``COUNT(*)``."""
+
+    counts = await crud_async.status_counts(db)
+    total = sum(counts.values())
+    return schemas.RequestStatusCounts(
+        counts=counts, open=total - counts[models.RequestStatusEnum.CLOSED], total=total
+    )
+
+
+@router.get("/stream", response_class=StreamingResponse)
+async def stream_requests(
+    _: TelegramAuthResult = Depends(require_master_stream),
+    broadcaster: RequestBroadcaster = Depends(get_request_broadcaster),
+    last_event_id: Optional[str] = Header(default=None, alias="Last-Event-ID"),
+):
+    """Server-sent events for created requests and status changes.
+
+    Event ids are status history ids: reconnecting with ``Last-Event-ID``
+    replays what was missed from the database. ``reset`` means the gap was
+    too long and the list has to be reloaded. ``initData`` may come in the
+    ``init_data`` query parameter, so ``EventSource`` can open the stream.
+    """
+
+    try:
+        after_id = int(last_event_id) if last_event_id else None
+    except ValueError as exc:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "Invalid Last-Event-ID") from exc
+
+    settings = get_settings()
+    try:
+        events = stream_events(
+            broadcaster,
+            after_id,
+            keepalive_seconds=settings.request_stream_keepalive_seconds,
+            replay_limit=settings.request_stream_replay_limit,
+        )
+        # Subscribe now, so the limit is answered with a status code instead of a broken stream.
+        first = await anext(events)
+    except TooManySubscribers as exc:
+        raise HTTPException(
+            status.HTTP_503_SERVICE_UNAVAILABLE, str(exc), headers={"Retry-After": "5"}
+        ) from exc
+
+    async def body():
+        try:
+            yield first
+            async for chunk in events:
+                yield chunk
+        finally:
+            await events.aclose()
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get(
+    "/{request_id}/history", response_model=list[schemas.RequestStatusHistoryPublic]
+)
+async def read_request_history(
+    request_id: int,
+    _: TelegramAuthResult = Depends(require_master),
+    db: AsyncSession = Depends(get_async_db),
+):
+    history = await crud_async.list_status_history(db, request_id)
+    if not history and not await db.get(models.Request, request_id):
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Request not found")
+    return history
+
+
+async def _run_action(
+    request_id: int,
+    action: str,
+    body: Optional[schemas.RequestTransition],
+    auth_result: TelegramAuthResult,
+    writer: WriteQueue,
+) -> schemas.RequestPublic:
+    async def persist(db: AsyncSession) -> schemas.RequestPublic:
+        request = await apply_action(
+            db,
+            request_id,
+            action,
+            actor_id=auth_result.payload.id,
+            note=body.note if body else None,
+        )
+        return schemas.RequestPublic.model_validate(request)
+
+    try:
+        return await writer.submit(persist)
+    except RequestNotFound as exc:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, str(exc)) from exc
+    except InvalidTransition as exc:
+        raise HTTPException(status.HTTP_409_CONFLICT, str(exc)) from exc
+
+
+@router.post("/{request_id}/claim", response_model=schemas.RequestPublic)
+async def claim_request(
+    request_id: int,
+    body: Optional[schemas.RequestTransition] = None,
+    auth_result: TelegramAuthResult = Depends(require_master),
+    writer: WriteQueue = Depends(get_write_queue),
+):
+    """Take a new request into work."""
+
+    return await _run_action(request_id, "claim", body, auth_result, writer)
+
+
+@router.post("/{request_id}/close", response_model=schemas.RequestPublic)
+async def close_request(
+    request_id: int,
+    body: Optional[schemas.RequestTransition] = None,
+    auth_result: TelegramAuthResult = Depends(require_master),
+    writer: WriteQueue = Depends(get_write_queue),
+):
+    """Close a new or in-progress request."""
+
+    return await _run_action(request_id, "close", body, auth_result, writer)
 
 
 @router.post("/", response_model=schemas.RequestPublic, status_code=status.HTTP_201_CREATED)
-def create_request(
+async def create_request(
     request_in: schemas.RequestCreate,
-    db: Session = Depends(get_db),
-    notifier: NotificationService = Depends(get_notification_service),
+    response: Response,
+    auth_result: TelegramAuthResult = Depends(require_telegram_auth),
+    writer: WriteQueue = Depends(get_write_queue),
+    outbox: OutboxWorker = Depends(get_outbox_worker),
+    limiter: RateLimiter = Depends(get_request_rate_limiter),
+    idempotency: IdempotencyCache = Depends(get_idempotency_cache),
+    catalog: CatalogCache = Depends(get_catalog_cache),
+    idempotency_key: Optional[str] = Header(default=None, alias=IDEMPOTENCY_HEADER),
 ):
-    auth_result = validate_init_data(request_in.init_data)
+    """Create a request for the signed-in user.
+
+    Submissions are rate limited per Telegram user. With an
+    ``Idempotency-Key`` header, repeating the same body within the TTL
+    returns the original request, also when the retry reaches another
+    worker. The service comes from the catalog cache, and the user upsert
+    only rewrites the row when the Telegram profile changed.
+    """
+
+    user_id = auth_result.payload.id
+
+    async def persist(db: AsyncSession, service: Optional[schemas.ServicePublic]):
+        await crud_async.upsert_user_profile(db, auth_result.payload)
 
-    user = crud.upsert_user(db, auth_result.payload)
+        request = await crud_async.create_request(db, user_id=user_id, request_in=request_in)
+        await db.flush()
+        notification = RequestNotification.from_request(
+            request, service_name=service.name if service else None
+        )
+        await crud_async.add_outbox_entry(db, request=request, payload=notification.to_json())
+        return schemas.RequestPublic(
+            id=request.id,
+            status=request.status,
+            details=request.details,
+            created_at=request.created_at,
+            service=service,
+        )
 
-    if request_in.service_id and not crud.get_service(db, request_in.service_id):
-        raise HTTPException(status_code=404, detail="Service not found")
+    async def submit() -> schemas.RequestPublic:
+        limiter.check(user_id)
+        service = None
+        if request_in.service_id:
+            service = await find_active_service(catalog, request_in.service_id)
+            if service is None:
+                raise HTTPException(status_code=404, detail="Service not found")
+        created = await writer.submit(lambda db: persist(db, service))
+        outbox.wake()
+        return created
 
-    request = crud.create_request(db, user=user, request_in=request_in)
-    db.commit()
-    db.refresh(request)
+    if not idempotency_key:
+        return await submit()
 
-    notifier.enqueue(request)
-    return request
+    # initData is refreshed by the client between retries; it is not part of the request.
+    fingerprint = IdempotencyCache.fingerprint(
+        request_in.model_dump_json(exclude={"init_data"})
+    )
+    result, replayed = await idempotency.run(
+        user_id, idempotency_key, fingerprint, submit, schemas.RequestPublic
+    )
+    if replayed:
+        response.headers[REPLAYED_HEADER] = "true"
+    return result
@@ -0,0 +1,43 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ... import schemas
+from ...database import engine, get_async_db
+from ...services import search as search_service
+from ...services.telegram_auth import TelegramAuthResult, require_master
+
+router = APIRouter(prefix="/search", tags=["search"])
+
+
+@router.get("", response_model=schemas.SearchResults)
+async def search(
+    q: str = Query(min_length=1, max_length=200),
+    kind: Optional[str] = Query(default=None, pattern="^(request|portfolio)$"),
+    limit: int = Query(default=20, ge=1, le=100),
+    offset: int = Query(default=0, ge=0, le=10_000),
+    _: TelegramAuthResult = Depends(require_master),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Full-text search over request details and portfolio, best matches first.
+
+    Matched words in ``title``/``snippet`` are wrapped in ``**``.
+    """
+
+    if not search_service.is_supported(engine):
+        raise HTTPException(status.HTTP_501_NOT_IMPLEMENTED, "Search needs SQLite FTS5")
+    page = await search_service.search(
+        db,
+        q,
+        kinds=(kind,) if kind else search_service.KINDS,
+        limit=limit,
+        offset=offset,
+    )
+    return schemas.SearchResults(
+        query=q,
+        total=page.total,
+        limit=limit,
+        offset=offset,
+        items=[schemas.SearchHit(**hit) for hit in page.hits],
+    )
@@ -1,12 +1,19 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Request, Response
 
-from ... import crud, schemas
-from ...database import get_db
+from ... import schemas
+from ...services.catalog_cache import (
+    SERVICES_KEY,
+    CatalogCache,
+    catalog_response,
+    get_catalog_cache,
+    load_services,
+)
 
 router = APIRouter(prefix="/services", tags=["services"])
 
 
 @router.get("/", response_model=list[schemas.ServicePublic])
-def read_services(db: Session = Depends(get_db)):
-    return crud.list_services(db)
+async def read_services(
+    request: Request, cache: CatalogCache = Depends(get_catalog_cache)
+) -> Response:
+    return catalog_response(request, await cache.get(SERVICES_KEY, load_services))
@@ -15,20 +15,65 @@ class Settings(BaseSettings):
         default="sqlite:///./data/master_service.db", alias="DATABASE_URL"
     )
     log_level: str = Field(default="INFO", alias="LOG_LEVEL")
+    log_format: str = Field(default="text", alias="LOG_FORMAT")
+    log_async: bool = Field(default=True, alias="LOG_ASYNC")
+    log_debug_sample_rate: float = Field(default=0.1, alias="LOG_DEBUG_SAMPLE_RATE")
+    metrics_enabled: bool = Field(default=True, alias="METRICS_ENABLED")
     frontend_dir: Path = Field(
         default=Path(__file__).resolve().parents[3] / "frontend",
         alias="FRONTEND_DIR",
     )
     static_mount_path: str = Field(default="/web", alias="STATIC_MOUNT_PATH")
+    frontend_build_dir: Path = Field(
+        default=Path("./data/frontend"), alias="FRONTEND_BUILD_DIR"
+    )
+    frontend_build_on_startup: bool = Field(
+        default=True, alias="FRONTEND_BUILD_ON_STARTUP"
+    )
+    media_dir: Path = Field(default=Path("./data/media"), alias="MEDIA_DIR")
+    media_mount_path: str = Field(default="/media", alias="MEDIA_MOUNT_PATH")
+    media_ingest_workers: int = Field(default=0, alias="MEDIA_INGEST_WORKERS")
     telegram_bot_token: Optional[str] = Field(
         default=None, alias="TELEGRAM_BOT_TOKEN"
     )
     telegram_master_chat_id: Optional[int] = Field(
         default=None, alias="TELEGRAM_MASTER_CHAT_ID"
     )
+    # Telegram user ids allowed to work the request queue; the master chat id
+    # is always included, which covers a private chat with the master.
+    telegram_master_ids: List[int] = Field(default=[], alias="TELEGRAM_MASTER_IDS")
     telegram_webhook_secret: Optional[str] = Field(
         default=None, alias="TELEGRAM_WEBHOOK_SECRET"
     )
+    telegram_webhook_processing: str = Field(
+        default="queued", alias="TELEGRAM_WEBHOOK_PROCESSING"
+    )
+    telegram_update_workers: int = Field(default=8, alias="TELEGRAM_UPDATE_WORKERS")
+    telegram_update_queue_size: int = Field(
+        default=1000, alias="TELEGRAM_UPDATE_QUEUE_SIZE"
+    )
+    telegram_update_dedup_window: int = Field(
+        default=10000, alias="TELEGRAM_UPDATE_DEDUP_WINDOW"
+    )
+    telegram_update_shared_dedup: bool = Field(
+        default=False, alias="TELEGRAM_UPDATE_SHARED_DEDUP"
+    )
+    telegram_api_base_url: Optional[str] = Field(
+        default=None, alias="TELEGRAM_API_BASE_URL"
+    )
+    telegram_polling_timeout: int = Field(default=30, alias="TELEGRAM_POLLING_TIMEOUT")
+    telegram_polling_limit: int = Field(default=100, alias="TELEGRAM_POLLING_LIMIT")
+    telegram_polling_offset_file: Path = Field(
+        default=Path("./data/telegram_polling_offset"),
+        alias="TELEGRAM_POLLING_OFFSET_FILE",
+    )
+    telegram_auth_max_age_seconds: int = Field(
+        default=24 * 60 * 60, alias="TELEGRAM_AUTH_MAX_AGE_SECONDS"
+    )
+    telegram_auth_cache_size: int = Field(default=4096, alias="TELEGRAM_AUTH_CACHE_SIZE")
+    telegram_auth_cache_ttl_seconds: float = Field(
+        default=300.0, alias="TELEGRAM_AUTH_CACHE_TTL_SECONDS"
+    )
     telegram_web_app_url: Optional[AnyUrl] = Field(
         default=None, alias="TELEGRAM_WEB_APP_URL"
     )
@@ -39,9 +84,84 @@ class Settings(BaseSettings):
         default=["https://web.telegram.org", "https://telegram.org", "*"],
         alias="CORS_ALLOW_ORIGINS",
     )
+    catalog_cache_ttl_seconds: float = Field(
+        default=60.0, alias="CATALOG_CACHE_TTL_SECONDS"
+    )
+    request_rate_limit_per_minute: float = Field(
+        default=6.0, alias="REQUEST_RATE_LIMIT_PER_MINUTE"
+    )
+    request_rate_limit_burst: int = Field(default=3, alias="REQUEST_RATE_LIMIT_BURST")
+    request_rate_limit_max_users: int = Field(
+        default=10000, alias="REQUEST_RATE_LIMIT_MAX_USERS"
+    )
+    idempotency_ttl_seconds: float = Field(
+        default=24 * 60 * 60, alias="IDEMPOTENCY_TTL_SECONDS"
+    )
+    idempotency_cache_size: int = Field(default=10000, alias="IDEMPOTENCY_CACHE_SIZE")
+    request_stream_buffer_size: int = Field(default=100, alias="REQUEST_STREAM_BUFFER_SIZE")
+    request_stream_max_subscribers: int = Field(
+        default=1000, alias="REQUEST_STREAM_MAX_SUBSCRIBERS"
+    )
+    request_stream_keepalive_seconds: float = Field(
+        default=15.0, alias="REQUEST_STREAM_KEEPALIVE_SECONDS"
+    )
+    request_stream_replay_limit: int = Field(default=1000, alias="REQUEST_STREAM_REPLAY_LIMIT")
+    shared_state_enabled: bool = Field(default=True, alias="SHARED_STATE_ENABLED")
+    shared_state_path: Path = Field(
+        default=Path("./data/shared_state.db"), alias="SHARED_STATE_PATH"
+    )
+    shared_state_poll_interval_seconds: float = Field(
+        default=1.0, alias="SHARED_STATE_POLL_INTERVAL_SECONDS"
+    )
+    schema_lock_path: Path = Field(
+        default=Path("./data/schema.lock"), alias="SCHEMA_LOCK_PATH"
+    )
+    migrate_on_startup: bool = Field(default=True, alias="MIGRATE_ON_STARTUP")
+    sqlite_journal_mode: str = Field(default="WAL", alias="SQLITE_JOURNAL_MODE")
+    sqlite_synchronous: str = Field(default="NORMAL", alias="SQLITE_SYNCHRONOUS")
+    sqlite_busy_timeout_ms: int = Field(default=5000, alias="SQLITE_BUSY_TIMEOUT_MS")
+    sqlite_mmap_size: int = Field(default=256 * 1024 * 1024, alias="SQLITE_MMAP_SIZE")
+    sqlite_cache_size_kib: int = Field(default=64 * 1024, alias="SQLITE_CACHE_SIZE_KIB")
+    sqlite_write_queue_enabled: bool = Field(
+        default=True, alias="SQLITE_WRITE_QUEUE_ENABLED"
+    )
+    sqlite_write_batch_size: int = Field(default=64, alias="SQLITE_WRITE_BATCH_SIZE")
+    notification_sink: str = Field(default="telegram", alias="NOTIFICATION_SINK")
+    notification_queue_size: int = Field(default=1000, alias="NOTIFICATION_QUEUE_SIZE")
+    notification_digest_window_seconds: float = Field(
+        default=2.0, alias="NOTIFICATION_DIGEST_WINDOW_SECONDS"
+    )
+    notification_digest_max_items: int = Field(
+        default=20, alias="NOTIFICATION_DIGEST_MAX_ITEMS"
+    )
+    notification_max_retries: int = Field(default=5, alias="NOTIFICATION_MAX_RETRIES")
+    notification_retry_base_seconds: float = Field(
+        default=1.0, alias="NOTIFICATION_RETRY_BASE_SECONDS"
+    )
+    notification_chat_rate_per_second: float = Field(
+        default=1.0, gt=0, alias="NOTIFICATION_CHAT_RATE_PER_SECOND"
+    )
+    notification_chat_burst: int = Field(default=3, alias="NOTIFICATION_CHAT_BURST")
+    notification_global_rate_per_second: float = Field(
+        default=30.0, gt=0, alias="NOTIFICATION_GLOBAL_RATE_PER_SECOND"
+    )
+    outbox_worker_enabled: bool = Field(default=True, alias="OUTBOX_WORKER_ENABLED")
+    outbox_batch_size: int = Field(default=50, alias="OUTBOX_BATCH_SIZE")
+    outbox_poll_interval_seconds: float = Field(
+        default=1.0, alias="OUTBOX_POLL_INTERVAL_SECONDS"
+    )
+    outbox_lease_seconds: float = Field(default=60.0, alias="OUTBOX_LEASE_SECONDS")
+    outbox_max_attempts: int = Field(default=10, alias="OUTBOX_MAX_ATTEMPTS")
 
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
 
+    @property
+    def master_ids(self) -> set[int]:
+        ids = set(self.telegram_master_ids)
+        if self.telegram_master_chat_id is not None and self.telegram_master_chat_id > 0:
+            ids.add(self.telegram_master_chat_id)
+        return ids
+
 
 @lru_cache
 def get_settings() -> Settings:
@@ -1,9 +1,113 @@
+import atexit
+import json
 import logging
+import queue
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
 from logging.config import dictConfig
-from typing import Literal
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Literal
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from .config import get_settings
 
+CORRELATION_HEADER = "X-Request-ID"
+
+correlation_id: ContextVar[str | None] = ContextVar("correlation_id", default=None)
+
+# Attributes every LogRecord has; anything else was passed through ``extra``.
+_RECORD_ATTRS = set(logging.LogRecord("", 0, "", 0, "", (), None).__dict__) | {
+    "message",
+    "asctime",
+    "correlation_id",
+}
+
+_listener: QueueListener | None = None
+
+
+def new_correlation_id() -> str:
+    return uuid.uuid4().hex
+
+
+class CorrelationIdFilter(logging.Filter):
+    """Stamp records with the correlation id of the current context."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, "correlation_id", None) is None:
+            record.correlation_id = correlation_id.get() or "-"
+        return True
+
+
+class DebugSamplingFilter(logging.Filter):
+    """Keep a fixed share of DEBUG records, counted per message template.
+
+    Sampling is deterministic (every ``1/rate``-th record of a template), so a
+    rare debug message is still logged the first time it occurs.
+    """
+
+    def __init__(self, rate: float = 1.0) -> None:
+        super().__init__()
+        self.rate = min(1.0, max(0.0, rate))
+        self._seen: dict[str, int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno != logging.DEBUG or self.rate >= 1.0:
+            return True
+        key = str(record.msg)
+        if key not in self._seen and len(self._seen) >= 1024:
+            self._seen.clear()
+        seen = self._seen.get(key, 0)
+        self._seen[key] = seen + 1
+        return int(seen * self.rate) != int((seen - 1) * self.rate) or seen == 0
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, including ``extra`` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data: dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "correlation_id": getattr(record, "correlation_id", None),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                data[f"extra_{key}" if key in data else key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exc_info"] = record.exc_text
+        if record.stack_info:
+            data["stack_info"] = self.formatStack(record.stack_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class _PreparedQueueHandler(QueueHandler):
+    # The stock ``prepare`` bakes the traceback into ``msg``; keep it separate
+    # so the JSON formatter can emit it as its own field.
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _stop_listener() -> None:
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
 
 def configure_logging(level: Literal[
     "CRITICAL", "ERROR", "WARNING", "INFO", "DEBUG"
@@ -12,6 +116,7 @@ def configure_logging(level: Literal[
 
     settings = get_settings()
     service_level = level or settings.log_level
+    _stop_listener()
 
     dictConfig(
         {
@@ -19,13 +124,22 @@ def configure_logging(level: Literal[
             "disable_existing_loggers": False,
             "formatters": {
                 "default": {
-                    "format": "%(asctime)s | %(levelname)s | %(name)s | %(message)s"
-                }
+                    "format": "%(asctime)s | %(levelname)s | %(name)s | %(correlation_id)s | %(message)s"
+                },
+                "json": {"()": JsonFormatter},
+            },
+            "filters": {
+                "correlation": {"()": CorrelationIdFilter},
+                "sampling": {
+                    "()": DebugSamplingFilter,
+                    "rate": settings.log_debug_sample_rate,
+                },
             },
             "handlers": {
                 "console": {
                     "class": "logging.StreamHandler",
-                    "formatter": "default",
+                    "formatter": "json" if settings.log_format == "json" else "default",
+                    "filters": ["sampling", "correlation"],
                 }
             },
             "root": {
@@ -35,6 +149,59 @@ def configure_logging(level: Literal[
         }
     )
 
+    if settings.log_async:
+        # Filters must run on the emitting thread, where the contextvars live,
+        # so they move to the queue handler; the listener thread only does I/O.
+        root = logging.getLogger()
+        console = root.handlers[0]
+        queue_handler = _PreparedQueueHandler(queue.SimpleQueue())
+        for log_filter in console.filters:
+            queue_handler.addFilter(log_filter)
+        console.filters.clear()
+        root.handlers = [queue_handler]
+        global _listener
+        _listener = QueueListener(queue_handler.queue, console, respect_handler_level=True)
+        _listener.start()
+
     logging.getLogger(__name__).info(
-        "Logging configured", extra={"level": service_level, "app": settings.app_name}
+        "Logging configured",
+        extra={
+            "level": service_level,
+            "app": settings.app_name,
+            "format": settings.log_format,
+            "async": settings.log_async,
+        },
     )
+
+
+atexit.register(_stop_listener)
+
+
+class CorrelationIdMiddleware:
+    """Bind a correlation id to each HTTP request and echo it in the response.
+
+    A client-supplied ``X-Request-ID`` is reused so ids can be followed across
+    services; otherwise a new one is generated.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = Headers(scope=scope).get(CORRELATION_HEADER)
+        value = incoming[:64] if incoming else new_correlation_id()
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)[CORRELATION_HEADER] = value
+            await send(message)
+
+        token = correlation_id.set(value)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            correlation_id.reset(token)
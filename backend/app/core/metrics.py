@@ -0,0 +1,317 @@
+from __future__ import annotations
+
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Any, Iterable
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+UNMATCHED_ROUTE = "<unmatched>"
+SQL_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE"}
+
+LabelValues = tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    """Base for metrics sharded per thread.
+
+    Each thread writes only to its own shard dict, so recording takes no lock;
+    ``collect`` merges shards, copying each one atomically under the GIL.
+    """
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards: list[dict[LabelValues, Any]] = []
+
+    def _shard(self) -> dict[LabelValues, Any]:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard: dict[LabelValues, Any] = {}
+            self._local.shard = shard
+            self._shards.append(shard)
+            return shard
+
+    def _labels(self, values: LabelValues, extra: dict[str, str] | None = None) -> str:
+        pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(self.labelnames, values)]
+        pairs += [f'{name}="{value}"' for name, value in (extra or {}).items()]
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0.0) + amount
+
+    def collect(self) -> dict[LabelValues, float]:
+        totals: dict[LabelValues, float] = {}
+        for shard in list(self._shards):
+            for labels, value in shard.copy().items():
+                totals[labels] = totals.get(labels, 0.0) + value
+        return totals
+
+    def _samples(self) -> list[str]:
+        return [
+            f"{self.name}{self._labels(labels)} {_format_value(value)}"
+            for labels, value in sorted(self.collect().items())
+        ]
+
+
+class Gauge(Counter):
+    """Up/down value; per-thread deltas sum to the current level."""
+
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels: str) -> None:
+        shard = self._shard()
+        state = shard.get(labels)
+        if state is None:
+            # Per-bucket counts (last slot is +Inf), then sum.
+            state = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        state[bisect_left(self.buckets, value)] += 1
+        state[-1] += value
+
+    def collect(self) -> dict[LabelValues, list[float]]:
+        totals: dict[LabelValues, list[float]] = {}
+        for shard in list(self._shards):
+            for labels, state in shard.copy().items():
+                merged = totals.setdefault(labels, [0] * len(state))
+                for index, value in enumerate(list(state)):
+                    merged[index] += value
+        return totals
+
+    def _samples(self) -> list[str]:
+        lines: list[str] = []
+        bounds = self.buckets + (float("inf"),)
+        for labels, state in sorted(self.collect().items()):
+            cumulative = 0
+            for bound, count in zip(bounds, state):
+                cumulative += count
+                lines.append(
+                    f"{self.name}_bucket{self._labels(labels, {'le': _format_value(bound)})} {cumulative}"
+                )
+            lines.append(f"{self.name}_sum{self._labels(labels)} {_format_value(state[-1])}")
+            lines.append(f"{self.name}_count{self._labels(labels)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> Any:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+HTTP_REQUESTS = registry.counter(
+    "http_requests_total", "HTTP requests by route and status.", ("method", "route", "status")
+)
+HTTP_LATENCY = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency.", ("method", "route")
+)
+HTTP_IN_FLIGHT = registry.gauge(
+    "http_requests_in_flight", "HTTP requests currently being served.", ("method", "route")
+)
+HTTP_DB_QUERIES = registry.histogram(
+    "http_request_db_queries",
+    "SQL statements issued while serving one HTTP request.",
+    ("method", "route"),
+    QUERY_COUNT_BUCKETS,
+)
+DB_QUERY_LATENCY = registry.histogram(
+    "db_query_duration_seconds", "SQL statement execution time.", ("operation",)
+)
+AUTH_CACHE_HITS = registry.counter(
+    "telegram_auth_cache_hits_total", "initData validations answered from the cache."
+)
+AUTH_LATENCY = registry.histogram(
+    "telegram_auth_duration_seconds", "initData validation time.", ("result",)
+)
+NOTIFICATIONS = registry.counter(
+    "notifications_total", "Master notifications by outcome.", ("outcome",)
+)
+NOTIFICATION_SENDS = registry.histogram(
+    "notification_send_duration_seconds", "Bot API send time for one digest.", ("outcome",)
+)
+REQUEST_GUARD = registry.counter(
+    "request_submissions_guarded_total",
+    "Request submissions rate limited or replayed from an idempotency key.",
+    ("outcome",),
+)
+REQUEST_STREAM_SUBSCRIBERS = registry.gauge(
+    "request_stream_subscribers", "Open request event streams."
+)
+REQUEST_STREAM_DROPPED = registry.counter(
+    "request_stream_dropped_total",
+    "Request event streams refused at the subscriber limit or evicted as too slow.",
+    ("outcome",),
+)
+TELEGRAM_UPDATES = registry.histogram(
+    "telegram_update_duration_seconds", "Dispatcher processing time per update.", ("outcome",)
+)
+
+# Statement counter of the HTTP request being served; the write queue carries
+# it over to the task that runs the request's write units.
+request_queries: ContextVar[list[int] | None] = ContextVar("request_queries", default=None)
+
+
+def render_metrics() -> str:
+    return registry.render()
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, status and in-flight count per route template.
+
+    The route is resolved up front by matching the app's routes, so labels use
+    templates such as ``/api/services/{id}`` and stay bounded.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    @staticmethod
+    def _route_for(scope: Scope) -> str:
+        app = scope.get("app")
+        router = getattr(app, "router", None)
+        for route in getattr(router, "routes", ()):
+            match, _ = route.matches(scope)
+            if match is Match.FULL:
+                return getattr(route, "path", None) or UNMATCHED_ROUTE
+        return UNMATCHED_ROUTE
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = self._route_for(scope)
+        status_code = "500"
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = str(message["status"])
+            await send(message)
+
+        queries = [0]
+        token = request_queries.set(queries)
+        HTTP_IN_FLIGHT.inc(method, route)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_LATENCY.observe(time.perf_counter() - started, method, route)
+            HTTP_IN_FLIGHT.dec(method, route)
+            HTTP_REQUESTS.inc(method, route, status_code)
+            HTTP_DB_QUERIES.observe(queries[0], method, route)
+            request_queries.reset(token)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    starts = conn.info.get("metrics_query_start")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    verb = statement.lstrip()[:6].upper()
+    operation = verb if verb in SQL_OPERATIONS else "OTHER"
+    DB_QUERY_LATENCY.observe(elapsed, operation)
+    queries = request_queries.get()
+    if queries is not None:
+        queries[0] += 1
+
+
+def _handle_error(context) -> None:
+    starts = context.connection.info.get("metrics_query_start") if context.connection else None
+    if starts:
+        starts.pop()
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Time every statement on ``engine`` and count it against the current request."""
+
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
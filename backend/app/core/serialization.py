@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import inspect
+import types
+from operator import attrgetter
+from typing import Any, Callable, Generic, Iterable, Optional, TypeVar, Union, get_args, get_origin
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, TypeAdapter
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+RowGetter = Callable[[Any], Any]
+
+_any_adapter: TypeAdapter[Any] = TypeAdapter(Any)
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return _any_adapter.dump_json(content)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response encoded with orjson when it is installed.
+
+    ``bytes`` content is taken as already encoded JSON, which is what
+    ``RowEncoder.encode`` and the catalog cache produce.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, (bytes, bytearray)):
+            return bytes(content)
+        return dumps(content)
+
+
+def _nested_model(annotation: Any) -> Optional[type[BaseModel]]:
+    origin = get_origin(annotation)
+    if origin in (Union, types.UnionType):
+        models = [arg for arg in get_args(annotation) if arg is not type(None)]
+        return _nested_model(models[0]) if len(models) == 1 else None
+    if origin is not None:
+        if any(_nested_model(arg) for arg in get_args(annotation)):
+            raise TypeError(f"Containers of models are not supported: {annotation}")
+        return None
+    if inspect.isclass(annotation) and issubclass(annotation, BaseModel):
+        return annotation
+    return None
+
+
+def _compile(schema: type[BaseModel]) -> Callable[[Any], dict[str, Any]]:
+    getters: list[tuple[str, RowGetter]] = []
+    for name, field in schema.model_fields.items():
+        if field.exclude:
+            continue
+        key = field.serialization_alias or field.alias or name
+        nested = _nested_model(field.annotation)
+        if nested is None:
+            getters.append((key, attrgetter(name)))
+            continue
+        to_dict = _compile(nested)
+        getters.append(
+            (key, lambda row, name=name, to_dict=to_dict: _nested(getattr(row, name), to_dict))
+        )
+    # ``model_computed_fields`` is only readable on instances in this Pydantic version.
+    for name, decorator in schema.__pydantic_decorators__.computed_fields.items():
+        getters.append((decorator.info.alias or name, decorator.info.wrapped_property.fget))
+
+    def to_dict(row: Any) -> dict[str, Any]:
+        return {key: get(row) for key, get in getters}
+
+    return to_dict
+
+
+def _nested(value: Any, to_dict: Callable[[Any], dict[str, Any]]) -> Optional[dict[str, Any]]:
+    return None if value is None else to_dict(value)
+
+
+class RowEncoder(Generic[ModelT]):
+    """Encode ORM rows straight to JSON shaped like ``schema``.
+
+    The row-to-dict function is built once from the schema: fields are read
+    as attributes, nested models recursively and computed fields by calling
+    their getter on the row. Rows skip Pydantic validation, which is most of
+    the cost of ``response_model`` on long lists, so this is only for rows
+    the database already constrains. Without orjson it falls back to the
+    schema's ``TypeAdapter``, which gives the same bytes.
+    """
+
+    def __init__(self, schema: type[ModelT]) -> None:
+        self.schema = schema
+        self.adapter = TypeAdapter(list[schema])
+        self._to_dict = _compile(schema)
+
+    def to_python(self, rows: Iterable[Any]) -> list[dict[str, Any]]:
+        return [self._to_dict(row) for row in rows]
+
+    def encode(self, rows: Iterable[Any]) -> bytes:
+        if orjson is None:
+            return self.adapter.dump_json(self.adapter.validate_python(rows, from_attributes=True))
+        return orjson.dumps(self.to_python(rows), default=_default)
+
+    def decode(self, body: bytes) -> list[ModelT]:
+        return self.adapter.validate_json(body)
@@ -1,7 +1,8 @@
-from typing import Iterable, Optional
+from datetime import datetime
+from typing import Iterable, Iterator, Optional
 
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy import Select, delete, func, insert, literal_column, or_, select, tuple_
+from sqlalchemy.orm import Session, selectinload
 
 from . import models, schemas
 
@@ -38,6 +39,45 @@ def upsert_user(db: Session, payload: schemas.TelegramUserPayload) -> models.Use
     return user
 
 
+USER_PROFILE_COLUMNS = ("first_name", "last_name", "username")
+
+
+def dialect_insert(dialect_name: str):
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        raise RuntimeError(f"Upsert is not supported on {dialect_name}")
+    return dialect_insert
+
+
+def user_upsert_statement(dialect_name: str, payload: schemas.TelegramUserPayload):
+    """One ``INSERT ... ON CONFLICT DO UPDATE`` that only writes changed profiles.
+
+    Like ``upsert_user``, missing fields keep the stored value, and the
+    ``WHERE`` clause turns an unchanged profile into a no-op instead of a
+    rewritten row.
+    """
+
+    users = models.User.__table__
+    statement = dialect_insert(dialect_name)(users).values(
+        telegram_id=payload.id,
+        **{column: getattr(payload, column) or None for column in USER_PROFILE_COLUMNS},
+    )
+    merged = {
+        column: func.coalesce(statement.excluded[column], users.c[column])
+        for column in USER_PROFILE_COLUMNS
+    }
+    return statement.on_conflict_do_update(
+        index_elements=[users.c.telegram_id],
+        set_=merged,
+        where=or_(
+            *(value.is_distinct_from(users.c[column]) for column, value in merged.items())
+        ),
+    )
+
+
 def create_request(
     db: Session,
     *,
@@ -49,10 +89,155 @@ def create_request(
         service_id=request_in.service_id,
         details=request_in.details,
     )
+    request.history.append(
+        models.RequestStatusHistory(
+            to_status=models.RequestStatusEnum.NEW, actor_id=user.telegram_id
+        )
+    )
     db.add(request)
     return request
 
 
-def list_requests(db: Session) -> Iterable[models.Request]:
-    statement = select(models.Request).order_by(models.Request.created_at.desc())
+RequestCursor = tuple[datetime, int]
+
+
+def requests_page_statement(
+    *,
+    limit: Optional[int] = None,
+    after: Optional[RequestCursor] = None,
+    status: Optional[models.RequestStatusEnum] = None,
+    service_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+) -> Select[tuple[models.Request]]:
+    """Newest-first keyset page over ``(created_at, id)``.
+
+    ``after`` is the ``(created_at, id)`` of the last row of the previous
+    page; every filter combination is backed by a composite index ending in
+    ``created_at, id`` so the page is an index range scan.
+    """
+
+    request = models.Request
+    statement = (
+        select(request)
+        .options(selectinload(request.service))
+        .order_by(request.created_at.desc(), request.id.desc())
+    )
+    if status is not None:
+        statement = statement.where(request.status == status)
+    if service_id is not None:
+        statement = statement.where(request.service_id == service_id)
+    if user_id is not None:
+        statement = statement.where(request.user_id == user_id)
+    if after is not None:
+        statement = statement.where(tuple_(request.created_at, request.id) < tuple_(*after))
+    if limit is not None:
+        statement = statement.limit(limit)
+    return statement
+
+
+def request_queue_statement(
+    *,
+    limit: Optional[int] = None,
+    after: Optional[RequestCursor] = None,
+    status: Optional[models.RequestStatusEnum] = None,
+) -> Select[tuple[models.Request]]:
+    """Oldest-first keyset page of unfinished requests, the master's work queue.
+
+    The ``status != 'CLOSED'`` predicate matches the partial index
+    ``ix_requests_open_created_at_id``, so the queue never scans closed rows;
+    narrowing to one status uses ``ix_requests_status_created_at_id``.
+    """
+
+    request = models.Request
+    statement = (
+        select(request)
+        .options(selectinload(request.service))
+        # A literal, not a bound parameter: SQLite only picks a partial index
+        # when the query's WHERE visibly implies the index predicate.
+        .where(request.status != literal_column(f"'{models.RequestStatusEnum.CLOSED.name}'"))
+        .order_by(request.created_at, request.id)
+    )
+    if status is not None:
+        statement = statement.where(request.status == status)
+    if after is not None:
+        statement = statement.where(tuple_(request.created_at, request.id) > tuple_(*after))
+    if limit is not None:
+        statement = statement.limit(limit)
+    return statement
+
+
+def status_counts_from_rows(
+    rows: Iterable[tuple[models.RequestStatusEnum, int]],
+) -> dict[models.RequestStatusEnum, int]:
+    counts = {status: 0 for status in models.RequestStatusEnum}
+    for status, count in rows:
+        counts[status] = count
+    return counts
+
+
+def status_counts(db: Session) -> dict[models.RequestStatusEnum, int]:
+    table = models.RequestStatusCount
+    return status_counts_from_rows(db.execute(select(table.status, table.count)).tuples())
+
+
+def recount_request_statuses(db: Session) -> dict[models.RequestStatusEnum, int]:
+    """Rebuild ``request_status_counts`` with one ``GROUP BY`` over ``requests``.
+
+    The counters follow ORM writes on their own; this is for the migration
+    that introduced them and for writes that bypass the ORM, such as bulk
+    imports.
+    """
+
+    request = models.Request
+    counts = status_counts_from_rows(
+        db.execute(select(request.status, func.count()).group_by(request.status)).tuples()
+    )
+    db.execute(delete(models.RequestStatusCount))
+    db.execute(
+        insert(models.RequestStatusCount),
+        [{"status": status, "count": count} for status, count in counts.items()],
+    )
+    db.commit()
+    return counts
+
+
+def list_requests(
+    db: Session,
+    *,
+    limit: Optional[int] = None,
+    after: Optional[RequestCursor] = None,
+    status: Optional[models.RequestStatusEnum] = None,
+    service_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+) -> Iterable[models.Request]:
+    statement = requests_page_statement(
+        limit=limit, after=after, status=status, service_id=service_id, user_id=user_id
+    )
     return db.scalars(statement).all()
+
+
+def iter_requests(
+    db: Session,
+    *,
+    chunk_size: int = 500,
+    status: Optional[models.RequestStatusEnum] = None,
+    service_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+) -> Iterator[models.Request]:
+    """Stream all matching requests page by page with flat memory use."""
+
+    after: Optional[RequestCursor] = None
+    while True:
+        page = list_requests(
+            db,
+            limit=chunk_size,
+            after=after,
+            status=status,
+            service_id=service_id,
+            user_id=user_id,
+        )
+        yield from page
+        if len(page) < chunk_size:
+            return
+        after = (page[-1].created_at, page[-1].id)
+        db.expunge_all()
@@ -0,0 +1,191 @@
+import logging
+from datetime import datetime
+from typing import Optional, Sequence
+
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from . import crud, models, schemas
+
+logger = logging.getLogger(__name__)
+
+
+async def list_services(db: AsyncSession) -> Sequence[models.Service]:
+    statement = select(models.Service).where(models.Service.is_active.is_(True))
+    return (await db.scalars(statement)).all()
+
+
+async def list_portfolio(db: AsyncSession) -> Sequence[models.PortfolioItem]:
+    statement = select(models.PortfolioItem).order_by(models.PortfolioItem.created_at.desc())
+    return (await db.scalars(statement)).all()
+
+
+async def get_service(db: AsyncSession, service_id: int) -> Optional[models.Service]:
+    return await db.get(models.Service, service_id)
+
+
+async def upsert_user_profile(db: AsyncSession, payload: schemas.TelegramUserPayload) -> None:
+    """Insert the user or update a changed profile in a single statement."""
+
+    await db.execute(crud.user_upsert_statement(db.get_bind().dialect.name, payload))
+    logger.info("Saved user profile", extra={"user_id": payload.id})
+
+
+async def create_request(
+    db: AsyncSession,
+    *,
+    user_id: int,
+    request_in: schemas.RequestCreate,
+) -> models.Request:
+    request = models.Request(
+        user_id=user_id,
+        service_id=request_in.service_id,
+        details=request_in.details,
+    )
+    request.history.append(
+        models.RequestStatusHistory(to_status=models.RequestStatusEnum.NEW, actor_id=user_id)
+    )
+    db.add(request)
+    logger.info(
+        "Creating request",
+        extra={"user_id": user_id, "service_id": request_in.service_id},
+    )
+    return request
+
+
+async def list_requests(
+    db: AsyncSession,
+    *,
+    limit: Optional[int] = None,
+    after: Optional[crud.RequestCursor] = None,
+    status: Optional[models.RequestStatusEnum] = None,
+    service_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+) -> Sequence[models.Request]:
+    statement = crud.requests_page_statement(
+        limit=limit, after=after, status=status, service_id=service_id, user_id=user_id
+    )
+    return (await db.scalars(statement)).all()
+
+
+async def list_request_queue(
+    db: AsyncSession,
+    *,
+    limit: Optional[int] = None,
+    after: Optional[crud.RequestCursor] = None,
+    status: Optional[models.RequestStatusEnum] = None,
+) -> Sequence[models.Request]:
+    statement = crud.request_queue_statement(limit=limit, after=after, status=status)
+    return (await db.scalars(statement)).all()
+
+
+async def status_counts(db: AsyncSession) -> dict[models.RequestStatusEnum, int]:
+    table = models.RequestStatusCount
+    return crud.status_counts_from_rows(
+        (await db.execute(select(table.status, table.count))).tuples()
+    )
+
+
+async def get_request_for_update(db: AsyncSession, request_id: int) -> Optional[models.Request]:
+    statement = (
+        select(models.Request)
+        .options(selectinload(models.Request.service))
+        .where(models.Request.id == request_id)
+        .with_for_update()
+    )
+    return await db.scalar(statement)
+
+
+async def list_status_history(
+    db: AsyncSession, request_id: int
+) -> Sequence[models.RequestStatusHistory]:
+    history = models.RequestStatusHistory
+    statement = select(history).where(history.request_id == request_id).order_by(history.id)
+    return (await db.scalars(statement)).all()
+
+
+async def list_request_events(
+    db: AsyncSession, *, after_id: int, limit: int
+) -> Sequence[tuple[models.RequestStatusHistory, models.Request]]:
+    history = models.RequestStatusHistory
+    statement = (
+        select(history, models.Request)
+        .join(history.request)
+        .where(history.id > after_id)
+        .order_by(history.id)
+        .limit(limit)
+    )
+    return (await db.execute(statement)).tuples().all()
+
+
+async def latest_request_event_id(db: AsyncSession) -> int:
+    return await db.scalar(select(func.max(models.RequestStatusHistory.id))) or 0
+
+
+async def add_outbox_entry(
+    db: AsyncSession, *, request: models.Request, payload: str
+) -> models.NotificationOutbox:
+    entry = models.NotificationOutbox(request_id=request.id, payload=payload)
+    db.add(entry)
+    return entry
+
+
+async def claim_outbox_batch(
+    db: AsyncSession,
+    *,
+    token: str,
+    limit: int,
+    max_attempts: int,
+    now: datetime,
+    lease_until: datetime,
+) -> Sequence[models.NotificationOutbox]:
+    outbox = models.NotificationOutbox
+    claimable = (
+        select(outbox.id)
+        .where(
+            outbox.sent_at.is_(None),
+            outbox.attempts < max_attempts,
+            outbox.available_at <= now,
+            or_(outbox.claimed_until.is_(None), outbox.claimed_until < now),
+        )
+        .order_by(outbox.id)
+        .limit(limit)
+    )
+    await db.execute(
+        update(outbox)
+        .where(
+            outbox.id.in_(claimable.scalar_subquery()),
+            or_(outbox.claimed_until.is_(None), outbox.claimed_until < now),
+        )
+        .values(claim_token=token, claimed_until=lease_until)
+        .execution_options(synchronize_session=False)
+    )
+    statement = select(outbox).where(outbox.claim_token == token).order_by(outbox.id)
+    return (await db.scalars(statement)).all()
+
+
+async def mark_outbox_sent(db: AsyncSession, *, ids: Sequence[int], now: datetime) -> None:
+    await db.execute(
+        update(models.NotificationOutbox)
+        .where(models.NotificationOutbox.id.in_(ids))
+        .values(sent_at=now, claim_token=None, claimed_until=None)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def mark_outbox_failed(
+    db: AsyncSession, *, entry_id: int, error: str, retry_at: datetime
+) -> None:
+    await db.execute(
+        update(models.NotificationOutbox)
+        .where(models.NotificationOutbox.id == entry_id)
+        .values(
+            attempts=models.NotificationOutbox.attempts + 1,
+            last_error=error,
+            available_at=retry_at,
+            claim_token=None,
+            claimed_until=None,
+        )
+        .execution_options(synchronize_session=False)
+    )
@@ -1,20 +1,173 @@
-from collections.abc import Generator
+from collections.abc import AsyncGenerator, Callable, Generator
+from contextlib import contextmanager
 
-from sqlalchemy import create_engine
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms
+    fcntl = None
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.orm import DeclarativeBase, Session, sessionmaker
 
 from .core.config import get_settings
 
+_ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "postgresql+psycopg": "postgresql+asyncpg",
+}
+_SYNC_DRIVERS = {
+    "sqlite+aiosqlite": "sqlite",
+    "postgresql+asyncpg": "postgresql",
+}
+
+
+def _sync_url(url: URL) -> URL:
+    return url.set(drivername=_SYNC_DRIVERS.get(url.drivername, url.drivername))
+
+
+def _async_url(url: URL) -> URL | None:
+    if url.get_dialect().is_async:
+        return url
+    if url.drivername not in _ASYNC_DRIVERS:
+        return None
+    return url.set(drivername=_ASYNC_DRIVERS[url.drivername])
+
+
+class AsyncDriverUnavailable:
+    """Stands in for ``AsyncSessionLocal`` when ``DATABASE_URL`` has no usable async driver.
+
+    The CLI only needs the sync engine, so the error is raised when an async
+    session is actually opened rather than on import.
+    """
+
+    def __init__(self, reason: str) -> None:
+        self.reason = reason
+
+    def __call__(self, *args, **kwargs) -> AsyncSession:
+        raise RuntimeError(self.reason)
+
+
+def _create_async_engine(url: URL) -> tuple[AsyncEngine | None, str | None]:
+    async_url = _async_url(url)
+    if async_url is None:
+        return None, (
+            f"No async driver is known for {url.drivername!r}; "
+            "set DATABASE_URL to an async driver such as postgresql+asyncpg"
+        )
+    try:
+        return create_async_engine(async_url, echo=False, connect_args=connect_args), None
+    except ImportError as exc:
+        return None, f"The async driver for {async_url.drivername!r} is not installed ({exc})"
+
+
 settings = get_settings()
-connect_args = {"check_same_thread": False} if settings.database_url.startswith("sqlite") else {}
-engine = create_engine(settings.database_url, echo=False, connect_args=connect_args)
+database_url = make_url(settings.database_url)
+connect_args = {"check_same_thread": False} if database_url.get_backend_name() == "sqlite" else {}
+
+# The sync engine backs the CLI and DDL; API routes go through the async engine.
+# DATABASE_URL may name either driver flavour, the counterpart is derived from it.
+engine = create_engine(_sync_url(database_url), echo=False, connect_args=connect_args)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine, _async_engine_error = _create_async_engine(database_url)
+AsyncSessionLocal: async_sessionmaker[AsyncSession] | AsyncDriverUnavailable = (
+    async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+    if async_engine is not None
+    else AsyncDriverUnavailable(_async_engine_error)
+)
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={settings.sqlite_journal_mode}")
+    cursor.execute(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+    cursor.execute(f"PRAGMA mmap_size={int(settings.sqlite_mmap_size)}")
+    # Negative cache_size is interpreted by SQLite as KiB rather than pages.
+    cursor.execute(f"PRAGMA cache_size=-{int(settings.sqlite_cache_size_kib)}")
+    cursor.close()
+
+
+def _disable_driver_transactions(dbapi_connection, connection_record) -> None:
+    # pysqlite and aiosqlite only open a transaction before DML, never before
+    # a SAVEPOINT, so a RELEASE would commit on its own. Take that over and
+    # emit BEGIN ourselves (SQLAlchemy's documented SQLite SAVEPOINT recipe).
+    dbapi_connection.isolation_level = None
+
+
+def _begin_sqlite_transaction(conn) -> None:
+    conn.exec_driver_sql("BEGIN")
+
+
+if database_url.get_backend_name() == "sqlite":
+    _engines = [engine] if async_engine is None else [engine, async_engine.sync_engine]
+    for _target in _engines:
+        event.listen(_target, "connect", _apply_sqlite_pragmas)
+        event.listen(_target, "connect", _disable_driver_transactions)
+        event.listen(_target, "begin", _begin_sqlite_transaction)
+
 
 class Base(DeclarativeBase):
     """Base class for all ORM models."""
 
 
+@contextmanager
+def _schema_lock() -> Generator[None, None, None]:
+    if fcntl is None:
+        yield
+        return
+    lock_path = settings.schema_lock_path
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def migrate_schema(
+    *, target: int | None = None, on_step: Callable | None = None
+) -> list:
+    """Apply pending migrations (see ``migrations.upgrade``) under the schema lock."""
+
+    from .migrations import upgrade
+
+    with _schema_lock():
+        return upgrade(engine, target=target, on_step=on_step)
+
+
+def ensure_schema() -> None:
+    """Make sure the schema is current before serving.
+
+    With every migration recorded this is one read and no DDL, so worker
+    startup stays cheap and needs no lock. Pending migrations are applied
+    under a file lock, so concurrent workers do not race; with
+    ``MIGRATE_ON_STARTUP=false`` they are an error and must be applied with
+    the ``migrate`` command instead.
+    """
+
+    from .migrations import is_current
+
+    if is_current(engine):
+        return
+    if not settings.migrate_on_startup:
+        raise RuntimeError(
+            "Database schema is out of date, run `python -m backend.app.admin.cli migrate`"
+        )
+    migrate_schema()
+
+
 def get_db() -> Generator[Session, None, None]:
     """Provide a database session dependency for FastAPI routes."""
 
@@ -23,3 +176,10 @@ def get_db() -> Generator[Session, None, None]:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """Provide an async database session that never blocks the event loop."""
+
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -3,18 +3,28 @@ from __future__ import annotations
 from datetime import datetime
 from pathlib import Path
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
 from fastapi.staticfiles import StaticFiles
+from starlette.responses import PlainTextResponse, Response
 
-from . import models  # noqa: F401 - ensures models are registered
-from .api.routes import portfolio, requests, services
+from . import crud, models  # noqa: F401 - ensures models are registered
+from .api.routes import analytics, portfolio, requests, search, services
 from .core.config import get_settings
-from .core.logging import configure_logging
-from .database import Base, engine
+from .core.logging import CORRELATION_HEADER, CorrelationIdMiddleware, configure_logging
+from .core.metrics import CONTENT_TYPE, MetricsMiddleware, instrument_engine, render_metrics
+from .core.serialization import FastJSONResponse
+from .database import async_engine, engine, ensure_schema
 from .schemas import APIHealth
-from .telegram.bot import router as telegram_router
+from .services import search as search_service
+from .services.assets import PrecompressedStaticFiles, build_assets
+from .services.catalog_cache import catalog_watcher
+from .services.images import ImmutableStaticFiles
+from .services.notifications import notification_service
+from .services.outbox import outbox_worker
+from .services.request_events import request_events_watcher
+from .telegram.webhook import router as telegram_router
+from .write_queue import write_queue
 
 settings = get_settings()
 configure_logging(settings.log_level)
@@ -24,23 +34,28 @@ def _mount_frontend(app: FastAPI, frontend_dir: Path) -> None:
     if not frontend_dir.exists():
         return
 
-    app.mount(
-        settings.static_mount_path,
-        StaticFiles(directory=str(frontend_dir), html=True),
-        name="web",
-    )
+    build_dir = settings.frontend_build_dir
+    # The build itself runs in the startup hook; importing the app writes nothing.
+    if settings.frontend_build_on_startup or (build_dir / "index.html").exists():
+        static: StaticFiles = PrecompressedStaticFiles(
+            directory=str(build_dir), html=True, check_dir=False
+        )
+        index_file = build_dir / "index.html"
+    else:
+        static = StaticFiles(directory=str(frontend_dir), html=True)
+        index_file = frontend_dir / "index.html"
 
-    index_file = frontend_dir / "index.html"
+    app.mount(settings.static_mount_path, static, name="web")
 
     @app.get("/", include_in_schema=False)
-    async def root_index() -> FileResponse:
+    async def root_index(request: Request) -> Response:
         if not index_file.exists():
             raise HTTPException(status_code=404, detail="Frontend is not built yet")
-        return FileResponse(index_file)
+        return await static.get_response("index.html", request.scope)
 
 
 def create_app() -> FastAPI:
-    app = FastAPI(title=settings.app_name)
+    app = FastAPI(title=settings.app_name, default_response_class=FastJSONResponse)
 
     app.add_middleware(
         CORSMiddleware,
@@ -48,23 +63,71 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["ETag", "X-Next-Cursor", CORRELATION_HEADER],
     )
+    app.add_middleware(CorrelationIdMiddleware)
+    if settings.metrics_enabled:
+        app.add_middleware(MetricsMiddleware)
+        instrument_engine(engine)
+        if async_engine is not None:
+            instrument_engine(async_engine.sync_engine)
 
     @app.on_event("startup")
     def startup_event() -> None:
-        Base.metadata.create_all(bind=engine)
+        ensure_schema()
+        if settings.frontend_build_on_startup and settings.frontend_dir.exists():
+            build_assets(
+                settings.frontend_dir, settings.frontend_build_dir, settings.static_mount_path
+            )
+        # Probed here so /api/search never opens a sync connection on the event loop.
+        search_service.is_supported(engine)
+
+    @app.on_event("startup")
+    async def start_background_workers() -> None:
+        await write_queue.start()
+        await notification_service.start()
+        if settings.outbox_worker_enabled:
+            await outbox_worker.start()
+        if catalog_watcher is not None:
+            await catalog_watcher.start()
+        if request_events_watcher is not None:
+            await request_events_watcher.start()
+
+    @app.on_event("shutdown")
+    async def stop_background_workers() -> None:
+        if request_events_watcher is not None:
+            await request_events_watcher.stop()
+        if catalog_watcher is not None:
+            await catalog_watcher.stop()
+        await outbox_worker.stop()
+        await notification_service.stop()
+        await write_queue.stop()
 
     app.include_router(services.router, prefix="/api")
     app.include_router(portfolio.router, prefix="/api")
     app.include_router(requests.router, prefix="/api")
+    app.include_router(search.router, prefix="/api")
+    app.include_router(analytics.router, prefix="/api")
     app.include_router(telegram_router)
 
+    settings.media_dir.mkdir(parents=True, exist_ok=True)
+    app.mount(
+        settings.media_mount_path,
+        ImmutableStaticFiles(directory=str(settings.media_dir)),
+        name="media",
+    )
     _mount_frontend(app, settings.frontend_dir)
 
     @app.get("/api/health", response_model=APIHealth, tags=["system"])
     async def healthcheck() -> APIHealth:
         return APIHealth(status="ok", timestamp=datetime.utcnow())
 
+    if settings.metrics_enabled:
+
+        @app.get("/api/metrics", include_in_schema=False)
+        async def metrics() -> PlainTextResponse:
+            return PlainTextResponse(render_metrics(), media_type=CONTENT_TYPE)
+
     return app
 
 
@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import logging
+import re
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Optional
+
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    func,
+    insert,
+    inspect,
+    select,
+)
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateIndex
+
+from . import crud, models
+from .database import Base
+from .services import analytics
+
+logger = logging.getLogger(__name__)
+
+# Kept out of Base.metadata: the version check must not depend on the models.
+schema_migrations = Table(
+    "schema_migrations",
+    MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("name", String(120), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+_CREATE_INDEX = re.compile(r"^CREATE (UNIQUE )?INDEX ")
+
+
+@dataclass(frozen=True, slots=True)
+class Migration:
+    """One versioned schema step.
+
+    Every step must be idempotent: databases created before migrations
+    existed start at version 0 and replay all of them, and a fresh database
+    already gets the current tables, with their indexes, from the first one.
+    ``indexes`` names model indexes that are built online after ``upgrade``.
+    """
+
+    version: int
+    name: str
+    upgrade: Optional[Callable[[Engine], None]] = None
+    indexes: tuple[str, ...] = ()
+
+
+@dataclass(slots=True)
+class MigrationResult:
+    version: int
+    name: str
+    duration_s: float
+
+
+def _model_index(name: str) -> Index:
+    for table in Base.metadata.tables.values():
+        for index in table.indexes:
+            if index.name == name:
+                return index
+    raise LookupError(f"No model index named {name}")
+
+
+def create_index_online(engine: Engine, index: Index) -> None:
+    """Build ``index`` unless it exists, holding write locks as briefly as possible.
+
+    PostgreSQL builds it ``CONCURRENTLY`` outside a transaction, so writes go
+    on meanwhile; an invalid index left by an interrupted build is dropped
+    first. SQLite has no online build: each index gets its own transaction,
+    so writers wait for one index at a time (up to ``busy_timeout``) while
+    WAL readers are not blocked at all.
+    """
+
+    ddl = str(CreateIndex(index, if_not_exists=True).compile(dialect=engine.dialect))
+    if engine.dialect.name != "postgresql":
+        with engine.begin() as conn:
+            conn.exec_driver_sql(ddl)
+        return
+
+    quoted = engine.dialect.identifier_preparer.quote(index.name)
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        invalid = conn.exec_driver_sql(
+            "SELECT NOT indisvalid FROM pg_index WHERE indexrelid = to_regclass(%(name)s)",
+            {"name": quoted},
+        ).scalar()
+        if invalid:
+            conn.exec_driver_sql(f"DROP INDEX CONCURRENTLY IF EXISTS {quoted}")
+        conn.exec_driver_sql(_CREATE_INDEX.sub(r"CREATE \1INDEX CONCURRENTLY ", ddl, count=1))
+
+
+def _add_column(engine: Engine, column: Column) -> None:
+    table = column.table.name
+    with engine.begin() as conn:
+        if column.name in {existing["name"] for existing in inspect(conn).get_columns(table)}:
+            return
+        column_type = column.type.compile(dialect=conn.dialect)
+        conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {column.name} {column_type}")
+
+
+def _create_tables(engine: Engine) -> None:
+    # Only tables that are missing; the metadata ``after_create`` hook adds
+    # and fills the SQLite full-text indexes the same way.
+    Base.metadata.create_all(bind=engine)
+
+
+def _add_portfolio_image_key(engine: Engine) -> None:
+    _add_column(engine, models.PortfolioItem.__table__.c.image_key)
+
+
+def _fill_request_counters(engine: Engine) -> None:
+    with Session(engine) as db:
+        crud.recount_request_statuses(db)
+    analytics.backfill(engine)
+
+
+MIGRATIONS: tuple[Migration, ...] = (
+    Migration(1, "create_tables", _create_tables),
+    Migration(2, "portfolio_image_key", _add_portfolio_image_key),
+    Migration(
+        3,
+        "request_indexes",
+        indexes=(
+            "ix_requests_created_at_id",
+            "ix_requests_user_created_at_id",
+            "ix_requests_status_created_at_id",
+            "ix_requests_service_created_at_id",
+            "ix_requests_open_created_at_id",
+        ),
+    ),
+    Migration(4, "catalog_indexes", indexes=("ix_portfolio_created_at", "ix_services_is_active")),
+    Migration(5, "fill_request_counters", _fill_request_counters),
+)
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+def current_version(engine: Engine) -> int:
+    with engine.connect() as conn:
+        if not inspect(conn).has_table(schema_migrations.name):
+            return 0
+        return conn.execute(select(func.max(schema_migrations.c.version))).scalar() or 0
+
+
+def is_current(engine: Engine) -> bool:
+    return current_version(engine) >= LATEST_VERSION
+
+
+def pending(engine: Engine) -> list[Migration]:
+    version = current_version(engine)
+    return [migration for migration in MIGRATIONS if migration.version > version]
+
+
+def upgrade(
+    engine: Engine,
+    *,
+    target: Optional[int] = None,
+    on_step: Optional[Callable[[MigrationResult], None]] = None,
+) -> list[MigrationResult]:
+    """Apply pending migrations in order, recording each one once it is done.
+
+    Callers serialise this across processes (see ``database.migrate_schema``).
+    An interrupted run resumes from the first unrecorded step.
+    """
+
+    schema_migrations.create(engine, checkfirst=True)
+    results = []
+    for migration in pending(engine):
+        if target is not None and migration.version > target:
+            break
+        started = time.perf_counter()
+        if migration.upgrade is not None:
+            migration.upgrade(engine)
+        for name in migration.indexes:
+            create_index_online(engine, _model_index(name))
+        with engine.begin() as conn:
+            conn.execute(
+                insert(schema_migrations).values(
+                    version=migration.version, name=migration.name, applied_at=datetime.utcnow()
+                )
+            )
+
+        result = MigrationResult(
+            version=migration.version,
+            name=migration.name,
+            duration_s=time.perf_counter() - started,
+        )
+        logger.info(
+            "Applied migration",
+            extra={
+                "version": result.version,
+                "migration": result.name,
+                "duration_s": round(result.duration_s, 3),
+            },
+        )
+        results.append(result)
+        if on_step is not None:
+            on_step(result)
+    return results
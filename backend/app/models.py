@@ -1,13 +1,33 @@
 from __future__ import annotations
 
-from datetime import datetime
+import logging
+from datetime import date, datetime
 from enum import Enum as PyEnum
 
-from sqlalchemy import Boolean, DateTime, Enum as SQLEnum, ForeignKey, Integer, String, Text
+from sqlalchemy import (
+    Boolean,
+    Date,
+    DateTime,
+    Enum as SQLEnum,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+    event,
+    insert,
+    inspect,
+    text,
+    update,
+)
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .database import Base
 
+logger = logging.getLogger(__name__)
+
 
 class Service(Base):
     __tablename__ = "services"
@@ -17,7 +37,7 @@ class Service(Base):
     description: Mapped[str] = mapped_column(Text, nullable=False)
     price: Mapped[str] = mapped_column(String(64), nullable=False)
     icon: Mapped[str] = mapped_column(String(64), nullable=False, default="hammer")
-    is_active: Mapped[bool] = mapped_column(Boolean, default=True)
+    is_active: Mapped[bool] = mapped_column(Boolean, default=True, index=True)
 
     requests: Mapped[list[Request]] = relationship("Request", back_populates="service")
 
@@ -29,10 +49,13 @@ class PortfolioItem(Base):
     title: Mapped[str] = mapped_column(String(160), nullable=False)
     description: Mapped[str] = mapped_column(Text, nullable=False)
     image_url: Mapped[str] = mapped_column(String(512), nullable=False)
+    image_key: Mapped[str | None] = mapped_column(String(64), nullable=True)
     wallpaper_type: Mapped[str] = mapped_column(String(120), nullable=False)
     area_sqm: Mapped[str] = mapped_column(String(64), nullable=False)
     highlights: Mapped[str] = mapped_column(String(255), nullable=False)
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.utcnow, index=True
+    )
     category: Mapped[str] = mapped_column(String(64), nullable=False, default="wallpaper")
 
 
@@ -57,6 +80,20 @@ class RequestStatusEnum(str, PyEnum):
 
 class Request(Base):
     __tablename__ = "requests"
+    __table_args__ = (
+        Index("ix_requests_created_at_id", "created_at", "id"),
+        Index("ix_requests_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_requests_service_created_at_id", "service_id", "created_at", "id"),
+        Index("ix_requests_user_created_at_id", "user_id", "created_at", "id"),
+        # The master's work queue: only unfinished requests, oldest first.
+        Index(
+            "ix_requests_open_created_at_id",
+            "created_at",
+            "id",
+            sqlite_where=text("status != 'CLOSED'"),
+            postgresql_where=text("status != 'CLOSED'"),
+        ),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.telegram_id"), nullable=False)
@@ -69,3 +106,222 @@ class Request(Base):
 
     user: Mapped[User] = relationship("User", back_populates="requests")
     service: Mapped[Service | None] = relationship("Service", back_populates="requests")
+    history: Mapped[list[RequestStatusHistory]] = relationship(
+        "RequestStatusHistory",
+        back_populates="request",
+        order_by="RequestStatusHistory.id",
+    )
+
+
+class RequestStatusHistory(Base):
+    __tablename__ = "request_status_history"
+    __table_args__ = (Index("ix_request_status_history_request_id_id", "request_id", "id"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    request_id: Mapped[int] = mapped_column(ForeignKey("requests.id"), nullable=False)
+    from_status: Mapped[RequestStatusEnum | None] = mapped_column(
+        SQLEnum(RequestStatusEnum), nullable=True
+    )
+    to_status: Mapped[RequestStatusEnum] = mapped_column(
+        SQLEnum(RequestStatusEnum), nullable=False
+    )
+    # Telegram id of whoever made the change; not a FK, the master need not be a user.
+    actor_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    note: Mapped[str | None] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+    request: Mapped[Request] = relationship("Request", back_populates="history")
+
+
+class RequestStatusCount(Base):
+    """Number of requests per status, kept current by the mapper events below."""
+
+    __tablename__ = "request_status_counts"
+
+    status: Mapped[RequestStatusEnum] = mapped_column(
+        SQLEnum(RequestStatusEnum), primary_key=True
+    )
+    count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+def _bump_status_count(connection: Connection, status: RequestStatusEnum, delta: int) -> None:
+    counts = RequestStatusCount.__table__
+    result = connection.execute(
+        update(counts).where(counts.c.status == status).values(count=counts.c.count + delta)
+    )
+    if result.rowcount == 0:
+        connection.execute(insert(counts).values(status=status, count=delta))
+
+
+class RequestDailyRollup(Base):
+    """Requests per creation day (UTC), service and current status.
+
+    Kept current by the mapper events below, so analytics never scan
+    ``requests``. A status change moves the request between rows of its
+    creation day.
+    """
+
+    __tablename__ = "request_daily_rollups"
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    # Primary key columns cannot be NULL: requests without a service use 0.
+    service_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    status: Mapped[RequestStatusEnum] = mapped_column(
+        SQLEnum(RequestStatusEnum), primary_key=True
+    )
+    count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+NO_SERVICE_ID = 0
+
+RollupKey = tuple[date, int, RequestStatusEnum]
+
+
+def rollup_key(
+    created_at: datetime, service_id: int | None, status: RequestStatusEnum
+) -> RollupKey:
+    return created_at.date(), service_id or NO_SERVICE_ID, status
+
+
+def _bump_rollup(connection: Connection, key: RollupKey, delta: int) -> None:
+    rollups = RequestDailyRollup.__table__
+    day, service_id, status = key
+    result = connection.execute(
+        update(rollups)
+        .where(
+            rollups.c.day == day,
+            rollups.c.service_id == service_id,
+            rollups.c.status == status,
+        )
+        .values(count=rollups.c.count + delta)
+    )
+    if result.rowcount == 0:
+        connection.execute(
+            insert(rollups).values(day=day, service_id=service_id, status=status, count=delta)
+        )
+
+
+def _previous_value(target: Request, name: str):
+    history = inspect(target).attrs[name].history
+    return history.deleted[0] if history.added and history.deleted else getattr(target, name)
+
+
+@event.listens_for(Request, "after_insert")
+def _count_inserted_request(mapper, connection: Connection, target: Request) -> None:
+    status = target.status or RequestStatusEnum.NEW
+    _bump_status_count(connection, status, 1)
+    _bump_rollup(connection, rollup_key(target.created_at, target.service_id, status), 1)
+
+
+@event.listens_for(Request, "after_update")
+def _count_status_change(mapper, connection: Connection, target: Request) -> None:
+    history = inspect(target).attrs.status.history
+    if history.added and history.deleted and history.added[0] != history.deleted[0]:
+        _bump_status_count(connection, history.deleted[0], -1)
+        _bump_status_count(connection, history.added[0], 1)
+
+    before = rollup_key(
+        _previous_value(target, "created_at"),
+        _previous_value(target, "service_id"),
+        _previous_value(target, "status"),
+    )
+    after = rollup_key(target.created_at, target.service_id, target.status)
+    if before != after:
+        _bump_rollup(connection, before, -1)
+        _bump_rollup(connection, after, 1)
+
+
+@event.listens_for(Request, "after_delete")
+def _count_deleted_request(mapper, connection: Connection, target: Request) -> None:
+    _bump_status_count(connection, target.status, -1)
+    _bump_rollup(connection, rollup_key(target.created_at, target.service_id, target.status), -1)
+
+
+class NotificationOutbox(Base):
+    __tablename__ = "notifications_outbox"
+    __table_args__ = (Index("ix_notifications_outbox_pending", "sent_at", "available_at"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    request_id: Mapped[int] = mapped_column(ForeignKey("requests.id"), nullable=False)
+    payload: Mapped[str] = mapped_column(Text, nullable=False)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    available_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    claim_token: Mapped[str | None] = mapped_column(String(36), nullable=True)
+    claimed_until: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    sent_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+# Full-text search: SQLite FTS5 indexes over existing tables (external
+# content, so text is not stored twice), kept in sync by triggers. Triggers
+# rather than ORM events, so Core bulk imports are indexed too.
+SEARCH_TOKENIZER = "unicode61 remove_diacritics 2"
+SEARCH_INDEXES: dict[str, tuple[str, tuple[str, ...]]] = {
+    "requests_fts": ("requests", ("details",)),
+    "portfolio_fts": ("portfolio", ("title", "description", "highlights")),
+}
+
+
+def search_text(expression: str) -> str:
+    """SQL folding ``ё`` into ``е`` (unicode61 only strips Latin diacritics).
+
+    The FTS index stores folded text while snippets are cut from the original
+    rows; the fold keeps every character in place, so offsets still match.
+    """
+
+    return f"replace(replace({expression}, 'ё', 'е'), 'Ё', 'Е')"
+
+
+def _search_index_ddl(index: str, table: str, columns: tuple[str, ...]) -> list[str]:
+    names = ", ".join(columns)
+    new_values = ", ".join(search_text(f"new.{column}") for column in columns)
+    old_values = ", ".join(search_text(f"old.{column}") for column in columns)
+    insert_new = f"INSERT INTO {index}(rowid, {names}) VALUES (new.id, {new_values});"
+    delete_old = (
+        f"INSERT INTO {index}({index}, rowid, {names}) VALUES ('delete', old.id, {old_values});"
+    )
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {index} USING fts5({names}, "
+        f"content='{table}', content_rowid='id', tokenize='{SEARCH_TOKENIZER}')",
+        f"CREATE TRIGGER IF NOT EXISTS {index}_ai AFTER INSERT ON {table} BEGIN {insert_new} END",
+        f"CREATE TRIGGER IF NOT EXISTS {index}_ad AFTER DELETE ON {table} BEGIN {delete_old} END",
+        f"CREATE TRIGGER IF NOT EXISTS {index}_au AFTER UPDATE OF {names} ON {table} "
+        f"BEGIN {delete_old} {insert_new} END",
+    ]
+
+
+def search_fill_statement(index: str, where: str = "") -> str:
+    """``INSERT ... SELECT`` copying rows of the indexed table into ``index``."""
+
+    table, columns = SEARCH_INDEXES[index]
+    values = ", ".join(search_text(column) for column in columns)
+    return (
+        f"INSERT INTO {index}(rowid, {', '.join(columns)}) "
+        f"SELECT id, {values} FROM {table} {where}"
+    )
+
+
+def create_search_indexes(connection: Connection) -> None:
+    """Create missing FTS5 tables and triggers; new ones are filled from their table."""
+
+    if connection.dialect.name != "sqlite":
+        return
+    for index, (table, columns) in SEARCH_INDEXES.items():
+        exists = connection.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (index,)
+        ).first()
+        try:
+            for statement in _search_index_ddl(index, table, columns):
+                connection.exec_driver_sql(statement)
+        except OperationalError:
+            logger.warning("SQLite has no FTS5, search is disabled", exc_info=True)
+            return
+        if not exists:
+            # Not the FTS5 'rebuild' command: that would index unfolded text.
+            connection.exec_driver_sql(search_fill_statement(index))
+
+
+@event.listens_for(Base.metadata, "after_create")
+def _create_search_indexes(target, connection: Connection, **kw) -> None:
+    create_search_indexes(connection)
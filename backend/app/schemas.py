@@ -1,9 +1,10 @@
-from datetime import datetime
+from datetime import date, datetime
 from typing import Optional
 
-from pydantic import BaseModel, HttpUrl
+from pydantic import BaseModel, Field, computed_field
 
 from .models import RequestStatusEnum
+from .services.images import variant_urls
 
 
 class ServiceBase(BaseModel):
@@ -24,16 +25,36 @@ class ServicePublic(ServiceBase):
 class PortfolioBase(BaseModel):
     title: str
     description: str
-    image_url: HttpUrl
+    image_url: str
     wallpaper_type: str
     area_sqm: str
     highlights: str
     category: str
 
 
+class ImageVariant(BaseModel):
+    width: int
+    webp: str
+    jpeg: str
+
+
+class PortfolioImages(BaseModel):
+    thumb: ImageVariant
+    medium: ImageVariant
+    full: ImageVariant
+
+
 class PortfolioPublic(PortfolioBase):
     id: int
     created_at: datetime
+    image_key: Optional[str] = Field(default=None, exclude=True)
+
+    @computed_field  # type: ignore[misc]
+    @property
+    def images(self) -> Optional[PortfolioImages]:
+        if not self.image_key:
+            return None
+        return PortfolioImages.model_validate(variant_urls(self.image_key))
 
     class Config:
         from_attributes = True
@@ -70,6 +91,77 @@ class RequestPublic(BaseModel):
         from_attributes = True
 
 
+class RequestTransition(BaseModel):
+    note: Optional[str] = Field(default=None, max_length=1000)
+
+
+class RequestStatusHistoryPublic(BaseModel):
+    id: int
+    request_id: int
+    from_status: Optional[RequestStatusEnum]
+    to_status: RequestStatusEnum
+    actor_id: Optional[int]
+    note: Optional[str]
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class RequestEventPublic(BaseModel):
+    """Payload of one request stream event; ``id`` is the status history id."""
+
+    id: int
+    request_id: int
+    status: RequestStatusEnum
+    from_status: Optional[RequestStatusEnum]
+    service_id: Optional[int]
+    details: Optional[str]
+    created_at: datetime
+    changed_at: datetime
+    actor_id: Optional[int]
+    note: Optional[str]
+
+
+class RequestStatusCounts(BaseModel):
+    counts: dict[RequestStatusEnum, int]
+    open: int
+    total: int
+
+
+class AnalyticsRow(BaseModel):
+    day: Optional[date] = None
+    service_id: Optional[int] = None
+    service_name: Optional[str] = None
+    status: Optional[RequestStatusEnum] = None
+    count: int
+
+
+class AnalyticsReport(BaseModel):
+    date_from: date
+    date_to: date
+    group_by: list[str]
+    total: int
+    rows: list[AnalyticsRow]
+
+
+class SearchHit(BaseModel):
+    kind: str
+    id: int
+    title: Optional[str]
+    snippet: Optional[str]
+    rank: float
+    created_at: Optional[datetime]
+
+
+class SearchResults(BaseModel):
+    query: str
+    total: int
+    limit: int
+    offset: int
+    items: list[SearchHit]
+
+
 class APIHealth(BaseModel):
     status: str
     timestamp: datetime
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import time
+from collections import Counter
+from dataclasses import dataclass
+from datetime import date
+from typing import Callable, Literal, Optional, Sequence
+
+from sqlalchemy import Date, delete, func, insert, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import crud_async, models
+from .request_workflow import STATUS_LABELS, format_counts
+
+Group = Literal["day", "service", "status"]
+GROUPS: tuple[Group, ...] = ("day", "service", "status")
+# Longest range one analytics call may cover; rollups grow with days, not requests.
+MAX_RANGE_DAYS = 366
+
+
+@dataclass(slots=True)
+class BackfillResult:
+    rows: int
+    chunks: int
+    groups: int
+    duration_s: float
+
+
+def backfill(
+    engine: Engine,
+    *,
+    chunk_size: int = 5000,
+    on_chunk: Optional[Callable[[BackfillResult], None]] = None,
+) -> BackfillResult:
+    """Rebuild ``request_daily_rollups`` from ``requests`` in one write transaction.
+
+    The old rollups are deleted first, which takes the write lock: the
+    mapper events of requests created or changed meanwhile wait for the
+    commit and apply on top of the new counts instead of being overwritten.
+    Each ``chunk_size`` id range is grouped by the database, so memory holds
+    one entry per day, service and status. Writers wait up to the SQLite busy
+    timeout.
+    """
+
+    request = models.Request
+    rollup = models.RequestDailyRollup
+    day = func.date(request.created_at, type_=Date)
+    service_id = func.coalesce(request.service_id, models.NO_SERVICE_ID)
+    counts: Counter[models.RollupKey] = Counter()
+    result = BackfillResult(rows=0, chunks=0, groups=0, duration_s=0.0)
+    started = time.perf_counter()
+
+    with engine.begin() as conn:
+        conn.execute(delete(rollup))
+        high_water = conn.execute(select(func.max(request.id))).scalar() or 0
+        last_id = 0
+        while last_id < high_water:
+            rows = conn.execute(
+                select(day, service_id, request.status, func.count())
+                .where(request.id > last_id, request.id <= last_id + chunk_size)
+                .group_by(day, service_id, request.status)
+            ).all()
+            for created_on, service, status, total in rows:
+                counts[created_on, service, status] += total
+                result.rows += total
+            last_id += chunk_size
+            result.chunks += 1
+            result.duration_s = time.perf_counter() - started
+            if on_chunk is not None:
+                on_chunk(result)
+        if counts:
+            conn.execute(
+                insert(rollup),
+                [
+                    {"day": day, "service_id": service_id, "status": status, "count": total}
+                    for (day, service_id, status), total in counts.items()
+                ],
+            )
+    result.groups = len(counts)
+    result.duration_s = time.perf_counter() - started
+    return result
+
+
+async def report(
+    db: AsyncSession,
+    date_from: date,
+    date_to: date,
+    group_by: Sequence[Group] = ("service", "status"),
+) -> list[dict]:
+    """Request counts for ``[date_from, date_to]`` grouped by ``group_by``.
+
+    Reads only the rollups, so the cost depends on the number of days and
+    services in the range, not on the number of requests.
+    """
+
+    rollup = models.RequestDailyRollup
+    columns = {"day": rollup.day, "service": rollup.service_id, "status": rollup.status}
+    selected = [columns[group] for group in GROUPS if group in group_by]
+    statement = (
+        select(*selected, func.sum(rollup.count).label("count"))
+        .where(rollup.day.between(date_from, date_to))
+        .group_by(*selected)
+        .having(func.sum(rollup.count) > 0)
+        .order_by(*selected)
+    )
+    if "service" in group_by:
+        statement = (
+            statement.add_columns(models.Service.name.label("service_name"))
+            .outerjoin(models.Service, models.Service.id == rollup.service_id)
+            .group_by(models.Service.name)
+        )
+
+    rows = []
+    for row in (await db.execute(statement)).mappings():
+        item = dict(row)
+        if "service_id" in item and item["service_id"] == models.NO_SERVICE_ID:
+            item["service_id"] = None
+        rows.append(item)
+    return rows
+
+
+async def daily_digest(db: AsyncSession, day: date) -> str:
+    """Text for the master: requests created on ``day`` by service and status."""
+
+    rows = await report(db, day, day, ("service", "status"))
+    by_service: dict[Optional[str], list[str]] = {}
+    for row in rows:
+        by_service.setdefault(row["service_name"], []).append(
+            f"{STATUS_LABELS[row['status']]} {row['count']}"
+        )
+
+    total = sum(row["count"] for row in rows)
+    lines = [f"Сводка за {day:%d.%m.%Y}: заявок — {total}"]
+    for name, parts in by_service.items():
+        lines.append(f"{name or 'Без услуги'}: {', '.join(parts)}")
+    lines.append(f"Все заявки — {format_counts(await crud_async.status_counts(db))}")
+    return "\n".join(lines)
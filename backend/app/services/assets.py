@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse
+
+from .images import IMMUTABLE_CACHE_CONTROL
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "assets-manifest.json"
+COMPRESSIBLE_SUFFIXES = {".html", ".js", ".mjs", ".css", ".svg", ".json", ".txt", ".map"}
+# Preferred first when the client accepts several encodings.
+ENCODINGS: dict[str, str] = {"br": ".br", "gzip": ".gz"}
+_FINGERPRINT = re.compile(r"\.[0-9a-f]{12}\.[^./]+$")
+
+
+@dataclass(slots=True)
+class AssetBuild:
+    manifest: dict[str, str] = field(default_factory=dict)
+    written: int = 0
+    removed: int = 0
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+
+def _brotli_compress(data: bytes) -> bytes | None:
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli.compress(data, quality=11)
+
+
+def _write_with_variants(path: Path, data: bytes) -> int:
+    """Write ``data`` plus its ``.gz``/``.br`` siblings; returns files written."""
+
+    written = 0
+    if not path.exists() or path.read_bytes() != data:
+        _write_atomic(path, data)
+        written += 1
+    if path.suffix not in COMPRESSIBLE_SUFFIXES:
+        return written
+
+    variants = {
+        ".gz": lambda: gzip.compress(data, compresslevel=9, mtime=0),
+        ".br": lambda: _brotli_compress(data),
+    }
+    for suffix, compress in variants.items():
+        target = path.with_name(path.name + suffix)
+        if target.exists() and not written:
+            continue
+        compressed = compress()
+        # Tiny files can grow when compressed; serve those as they are.
+        if compressed is None or len(compressed) >= len(data):
+            target.unlink(missing_ok=True)
+            continue
+        _write_atomic(target, compressed)
+        written += 1
+    return written
+
+
+def _remove_stale(output_dir: Path, current: set[str]) -> int:
+    """Delete fingerprinted files (and their variants) left by earlier builds."""
+
+    removed = 0
+    for path in output_dir.rglob("*"):
+        if not path.is_file():
+            continue
+        relative = path.relative_to(output_dir).as_posix()
+        for suffix in ENCODINGS.values():
+            relative = relative.removesuffix(suffix)
+        if _FINGERPRINT.search(relative) and relative not in current:
+            path.unlink(missing_ok=True)
+            removed += 1
+    return removed
+
+
+def fingerprinted_name(relative: Path, data: bytes) -> Path:
+    digest = hashlib.sha256(data).hexdigest()[:12]
+    return relative.with_name(f"{relative.stem}.{digest}{relative.suffix}")
+
+
+def build_assets(source_dir: Path, output_dir: Path, mount_path: str) -> AssetBuild:
+    """Fingerprint frontend assets into ``output_dir`` and precompress them.
+
+    Every file except ``index.html`` is copied under a content-hashed name,
+    references to ``{mount_path}/<file>`` in ``index.html`` are rewritten to
+    the hashed names, and gzip/brotli variants are written next to each
+    text asset. Files are content-addressed and replaced atomically, so
+    rebuilding is cheap; hashed files left by earlier builds are removed so
+    the output directory does not grow with every change.
+    """
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    prefix = mount_path.rstrip("/")
+    build = AssetBuild()
+
+    index_source = source_dir / "index.html"
+    for path in sorted(source_dir.rglob("*")):
+        if not path.is_file() or path == index_source or path.name.startswith("."):
+            continue
+        relative = path.relative_to(source_dir)
+        data = path.read_bytes()
+        hashed = fingerprinted_name(relative, data)
+        target = output_dir / hashed
+        target.parent.mkdir(parents=True, exist_ok=True)
+        build.written += _write_with_variants(target, data)
+        build.manifest[relative.as_posix()] = hashed.as_posix()
+
+    if index_source.exists():
+        html = index_source.read_text(encoding="utf-8")
+        for original, hashed in build.manifest.items():
+            html = re.sub(
+                rf'(["\']){re.escape(prefix)}/{re.escape(original)}(["\'])',
+                rf"\g<1>{prefix}/{hashed}\g<2>",
+                html,
+            )
+        build.written += _write_with_variants(output_dir / "index.html", html.encode("utf-8"))
+
+    manifest = json.dumps(build.manifest, indent=2, sort_keys=True).encode("utf-8")
+    _write_with_variants(output_dir / MANIFEST_NAME, manifest)
+    build.removed = _remove_stale(output_dir, set(build.manifest.values()))
+    logger.info(
+        "Frontend assets built",
+        extra={
+            "assets": len(build.manifest),
+            "written": build.written,
+            "removed": build.removed,
+            "output": str(output_dir),
+        },
+    )
+    return build
+
+
+def accepted_encodings(header: str) -> set[str]:
+    accepted: set[str] = set()
+    refused: set[str] = set()
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            (accepted if quality > 0 else refused).add(name)
+    if "*" in accepted:
+        accepted.update(ENCODINGS)
+    # An explicit ``q=0`` wins over the wildcard (``br;q=0, *``).
+    return accepted - refused
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """Serve build output, picking a precompressed sibling per ``Accept-Encoding``.
+
+    Fingerprinted files are cached forever; everything else (``index.html``)
+    must be revalidated so clients pick up new asset names.
+    """
+
+    def file_response(
+        self,
+        full_path,
+        stat_result: os.stat_result,
+        scope,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        media_type = mimetypes.guess_type(str(full_path))[0] or "text/plain"
+        accepted = accepted_encodings(request_headers.get("accept-encoding", ""))
+        headers = {"Vary": "Accept-Encoding"}
+
+        path = str(full_path)
+        for encoding, suffix in ENCODINGS.items():
+            if encoding not in accepted:
+                continue
+            try:
+                variant_stat = os.stat(path + suffix)
+            except OSError:
+                continue
+            path, stat_result = path + suffix, variant_stat
+            headers["Content-Encoding"] = encoding
+            break
+
+        headers["Cache-Control"] = (
+            IMMUTABLE_CACHE_CONTROL if _FINGERPRINT.search(str(full_path)) else "no-cache"
+        )
+        response = FileResponse(
+            path,
+            status_code=status_code,
+            headers=headers,
+            media_type=media_type,
+            stat_result=stat_result,
+        )
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import itertools
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+from fastapi import Request, Response, status
+from sqlalchemy import event
+from sqlalchemy.orm import ORMExecuteState, Session
+
+from .. import crud_async
+from ..core.config import get_settings
+from ..core.serialization import RowEncoder
+from ..database import AsyncSessionLocal
+from ..models import PortfolioItem, Service
+from ..schemas import ServicePublic
+from .shared_state import VersionWatcher, shared_state
+
+T = TypeVar("T")
+
+SERVICES_KEY = "services"
+PORTFOLIO_KEY = "portfolio"
+
+_MODEL_KEYS: dict[type, str] = {Service: SERVICES_KEY, PortfolioItem: PORTFOLIO_KEY}
+_PENDING_INFO_KEY = "catalog_cache_pending"
+
+
+@dataclass(frozen=True, slots=True)
+class CatalogEntry:
+    body: bytes
+    etag: str
+    loaded_at: float
+
+
+class CatalogCache:
+    """In-process cache of pre-serialized catalog payloads.
+
+    Entries are keyed by endpoint and carry a strong ETag derived from the
+    payload hash. Local writes invalidate entries through session events and
+    bump a shared version, which other workers pick up through
+    ``catalog_watcher``; the TTL bounds staleness when shared state is off.
+    """
+
+    def __init__(self, ttl_seconds: float) -> None:
+        self.ttl_seconds = ttl_seconds
+        self._entries: dict[str, CatalogEntry] = {}
+        self._generations: dict[str, int] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._decoded: dict[str, tuple[str, Any]] = {}
+
+    def _is_fresh(self, entry: CatalogEntry | None) -> bool:
+        if entry is None:
+            return False
+        if self.ttl_seconds <= 0:
+            return True
+        return time.monotonic() - entry.loaded_at < self.ttl_seconds
+
+    def _lock_for(self, key: str) -> asyncio.Lock:
+        return self._locks.setdefault(key, asyncio.Lock())
+
+    async def get(self, key: str, loader: Callable[[], Awaitable[bytes]]) -> CatalogEntry:
+        entry = self._entries.get(key)
+        if self._is_fresh(entry):
+            return entry
+
+        async with self._lock_for(key):
+            entry = self._entries.get(key)
+            if self._is_fresh(entry):
+                return entry
+
+            generation = self._generations.get(key, 0)
+            body = await loader()
+            entry = CatalogEntry(
+                body=body,
+                etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"',
+                loaded_at=time.monotonic(),
+            )
+            # A write committed while we were loading makes this payload stale.
+            if self._generations.get(key, 0) == generation:
+                self._entries[key] = entry
+            return entry
+
+    def decoded(self, key: str, entry: CatalogEntry, decode: Callable[[bytes], T]) -> T:
+        """``decode(entry.body)``, parsed once per payload version."""
+
+        cached = self._decoded.get(key)
+        if cached is None or cached[0] != entry.etag:
+            cached = self._decoded[key] = (entry.etag, decode(entry.body))
+        return cached[1]
+
+    def invalidate(self, *keys: str) -> None:
+        for key in keys or tuple(self._entries):
+            self._generations[key] = self._generations.get(key, 0) + 1
+            self._entries.pop(key, None)
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {value.strip() for value in if_none_match.split(",")}
+    if "*" in candidates:
+        return True
+    # If-None-Match uses weak comparison, so W/-prefixed validators still match.
+    return any(value.removeprefix("W/") == etag for value in candidates)
+
+
+def catalog_response(request: Request, entry: CatalogEntry) -> Response:
+    """Answer with the cached payload or 304 when the client copy is current."""
+
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+catalog_cache = CatalogCache(get_settings().catalog_cache_ttl_seconds)
+
+
+def get_catalog_cache() -> CatalogCache:
+    return catalog_cache
+
+
+services_encoder = RowEncoder(ServicePublic)
+
+
+async def load_services() -> bytes:
+    async with AsyncSessionLocal() as db:
+        return services_encoder.encode(await crud_async.list_services(db))
+
+
+async def active_services(cache: CatalogCache) -> dict[int, ServicePublic]:
+    entry = await cache.get(SERVICES_KEY, load_services)
+    return cache.decoded(
+        SERVICES_KEY,
+        entry,
+        lambda body: {service.id: service for service in services_encoder.decode(body)},
+    )
+
+
+async def find_active_service(cache: CatalogCache, service_id: int) -> Optional[ServicePublic]:
+    """Look ``service_id`` up in the cached catalog, asking the database on a miss.
+
+    The miss path covers a service added by another worker that this one has
+    not heard about yet; unknown ids cost one primary-key lookup.
+    """
+
+    service = (await active_services(cache)).get(service_id)
+    if service is not None:
+        return service
+    async with AsyncSessionLocal() as db:
+        row = await crud_async.get_service(db, service_id)
+        if row is None or not row.is_active:
+            return None
+        return ServicePublic.model_validate(row)
+
+
+def _shared_key(key: str) -> str:
+    return f"catalog:{key}"
+
+
+def notify_catalog_changed(*keys: str) -> None:
+    """Drop ``keys`` here and tell the other processes to do the same."""
+
+    catalog_cache.invalidate(*keys)
+    if shared_state is not None:
+        shared_state.bump_soon(*(_shared_key(key) for key in keys))
+
+
+def _invalidate_changed(shared_keys: set[str]) -> None:
+    keys = [key for key in _MODEL_KEYS.values() if _shared_key(key) in shared_keys]
+    if keys:
+        catalog_cache.invalidate(*keys)
+
+
+catalog_watcher: VersionWatcher | None = (
+    VersionWatcher(
+        shared_state,
+        _invalidate_changed,
+        interval_seconds=get_settings().shared_state_poll_interval_seconds,
+    )
+    if shared_state is not None
+    else None
+)
+
+
+def _pending_keys(session: Session) -> set[str]:
+    return session.info.setdefault(_PENDING_INFO_KEY, set())
+
+
+@event.listens_for(Session, "after_flush")
+def _track_flushed_changes(session: Session, flush_context) -> None:
+    for obj in itertools.chain(session.new, session.dirty, session.deleted):
+        key = _MODEL_KEYS.get(type(obj))
+        if key:
+            _pending_keys(session).add(key)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_bulk_statements(state: ORMExecuteState) -> None:
+    if not (state.is_insert or state.is_update or state.is_delete):
+        return
+    mapper = state.bind_mapper
+    key = _MODEL_KEYS.get(mapper.class_) if mapper is not None else None
+    if key:
+        _pending_keys(state.session).add(key)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session: Session) -> None:
+    keys = session.info.pop(_PENDING_INFO_KEY, None)
+    if keys:
+        notify_catalog_changed(*keys)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session: Session) -> None:
+    session.info.pop(_PENDING_INFO_KEY, None)
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import hashlib
+import io
+import logging
+import os
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterable
+
+from fastapi.staticfiles import StaticFiles
+from starlette.responses import Response
+
+from ..core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Variant name -> longest side in pixels; originals are never upscaled.
+VARIANTS: dict[str, int] = {"thumb": 320, "medium": 960, "full": 1920}
+FORMATS: dict[str, tuple[str, dict]] = {
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+}
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def _read_source(source: str) -> bytes:
+    if source.startswith(("http://", "https://")):
+        request = urllib.request.Request(source, headers={"User-Agent": "master-service/1.0"})
+        with urllib.request.urlopen(request, timeout=30) as response:
+            return response.read()
+    return Path(source).expanduser().read_bytes()
+
+
+def image_key_for(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:32]
+
+
+def variant_dir(media_dir: Path, key: str) -> Path:
+    return media_dir / key[:2] / key
+
+
+def ingest_image(source: str, media_dir: str) -> str:
+    """Store ``source`` under its content hash and render every variant.
+
+    Runs in worker processes, so it takes plain arguments and imports Pillow
+    lazily. Already ingested content is detected by key and skipped.
+    """
+
+    from PIL import Image, ImageOps
+
+    data = _read_source(source)
+    key = image_key_for(data)
+    target = variant_dir(Path(media_dir), key)
+    if (target / "full.webp").exists():
+        return key
+
+    target.mkdir(parents=True, exist_ok=True)
+    with Image.open(io.BytesIO(data)) as original:
+        image = ImageOps.exif_transpose(original).convert("RGB")
+    for variant, size in VARIANTS.items():
+        resized = image.copy()
+        resized.thumbnail((size, size), Image.Resampling.LANCZOS)
+        for extension, (image_format, options) in FORMATS.items():
+            tmp_path = target / f".{variant}.{extension}.tmp"
+            resized.save(tmp_path, image_format, **options)
+            os.replace(tmp_path, target / f"{variant}.{extension}")
+    return key
+
+
+def ingest_many(
+    sources: Iterable[str], media_dir: Path, workers: int | None = None
+) -> dict[str, str]:
+    """Ingest ``sources`` in a process pool; returns ``source -> key`` for successes."""
+
+    unique = list(dict.fromkeys(sources))
+    if not unique:
+        return {}
+
+    keys: dict[str, str] = {}
+    with ProcessPoolExecutor(max_workers=workers or None) as pool:
+        futures = {
+            source: pool.submit(ingest_image, source, str(media_dir)) for source in unique
+        }
+        for source, future in futures.items():
+            try:
+                keys[source] = future.result()
+            except Exception:
+                logger.exception("Failed to ingest image", extra={"source": source})
+    return keys
+
+
+def variant_urls(key: str) -> dict[str, dict[str, object]]:
+    prefix = get_settings().media_mount_path.rstrip("/")
+    base = f"{prefix}/{key[:2]}/{key}"
+    return {
+        variant: {
+            "width": size,
+            **{extension: f"{base}/{variant}.{extension}" for extension in FORMATS},
+        }
+        for variant, size in VARIANTS.items()
+    }
+
+
+class ImmutableStaticFiles(StaticFiles):
+    """Static files whose URLs change with content, so they can be cached forever."""
+
+    def file_response(self, *args, **kwargs) -> Response:
+        response = super().file_response(*args, **kwargs)
+        if response.status_code == 200:
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        return response
@@ -1,35 +1,367 @@
+from __future__ import annotations
+
+import asyncio
+import json
 import logging
+import random
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Protocol
+
+from sqlalchemy import inspect
 
-from ..core.config import get_settings
+from ..core.config import Settings, get_settings
+from ..core.logging import correlation_id
+from ..core.metrics import NOTIFICATION_SENDS, NOTIFICATIONS
 from ..models import Request
 
 logger = logging.getLogger(__name__)
 
 
+class RetryLater(Exception):
+    """Transient delivery failure; ``retry_after`` overrides the backoff."""
+
+    def __init__(self, message: str, retry_after: float | None = None) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class PermanentDeliveryError(Exception):
+    """Delivery failure that retrying will not fix (bad chat id, bot blocked)."""
+
+
+class NotificationSink(Protocol):
+    async def send_message(self, chat_id: int, text: str) -> None: ...
+
+    async def close(self) -> None: ...
+
+
+class LoggingSink:
+    """Sink used when the bot token is missing: only records the intent."""
+
+    async def send_message(self, chat_id: int, text: str) -> None:
+        logger.info("Notify master", extra={"chat_id": chat_id, "text": text})
+
+    async def close(self) -> None:
+        return None
+
+
+class FakeBotSink:
+    """In-memory Bot API stand-in for offline runs and tests.
+
+    ``fail_next`` transient failures are raised before messages are accepted,
+    which exercises the retry path without a network.
+    """
+
+    def __init__(self, fail_next: int = 0, retry_after: float | None = None) -> None:
+        self.messages: list[tuple[int, str]] = []
+        self.fail_next = fail_next
+        self.retry_after = retry_after
+
+    async def send_message(self, chat_id: int, text: str) -> None:
+        if self.fail_next > 0:
+            self.fail_next -= 1
+            raise RetryLater("Simulated Bot API failure", self.retry_after)
+        self.messages.append((chat_id, text))
+
+    async def close(self) -> None:
+        return None
+
+
+class TelegramBotSink:
+    """Deliver through aiogram, mapping Bot API errors onto retry semantics."""
+
+    def __init__(self, token: str) -> None:
+        self.token = token
+        self._bot = None
+
+    async def send_message(self, chat_id: int, text: str) -> None:
+        from aiogram import Bot
+        from aiogram.exceptions import (
+            TelegramBadRequest,
+            TelegramForbiddenError,
+            TelegramNetworkError,
+            TelegramRetryAfter,
+            TelegramServerError,
+        )
+
+        if self._bot is None:
+            self._bot = Bot(token=self.token)
+        try:
+            await self._bot.send_message(chat_id, text)
+        except TelegramRetryAfter as exc:
+            raise RetryLater(str(exc), exc.retry_after) from exc
+        except (TelegramNetworkError, TelegramServerError) as exc:
+            raise RetryLater(str(exc)) from exc
+        except (TelegramBadRequest, TelegramForbiddenError) as exc:
+            raise PermanentDeliveryError(str(exc)) from exc
+
+    async def close(self) -> None:
+        if self._bot is not None:
+            await self._bot.session.close()
+            self._bot = None
+
+
+class TokenBucket:
+    """Async token bucket; ``acquire`` sleeps until a token is available."""
+
+    def __init__(self, rate_per_second: float, capacity: float) -> None:
+        self.rate = rate_per_second
+        self.capacity = max(1.0, capacity)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self) -> None:
+        while True:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+@dataclass(frozen=True, slots=True)
+class RequestNotification:
+    request_id: int
+    user_id: int
+    service_id: int | None
+    service_name: str | None
+    details: str | None
+    created_at: datetime | None
+    # Correlation id of the HTTP request that created the request, for logs.
+    correlation_id: str | None = None
+
+    @classmethod
+    def from_request(
+        cls, request: Request, *, service_name: str | None = None
+    ) -> RequestNotification:
+        if service_name is None:
+            state = inspect(request)
+            service = None if "service" in state.unloaded else request.service
+            service_name = service.name if service is not None else None
+        return cls(
+            request_id=request.id,
+            user_id=request.user_id,
+            service_id=request.service_id,
+            service_name=service_name,
+            details=request.details,
+            created_at=request.created_at,
+            correlation_id=correlation_id.get(),
+        )
+
+    def to_json(self) -> str:
+        data = asdict(self)
+        data["created_at"] = self.created_at.isoformat() if self.created_at else None
+        return json.dumps(data, ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, raw: str) -> RequestNotification:
+        data = json.loads(raw)
+        if data.get("created_at"):
+            data["created_at"] = datetime.fromisoformat(data["created_at"])
+        return cls(**data)
+
+
+def format_notifications(items: list[RequestNotification]) -> str:
+    if len(items) == 1:
+        item = items[0]
+        lines = [f"Новая заявка #{item.request_id}", f"Клиент: {item.user_id}"]
+        if item.service_name:
+            lines.append(f"Услуга: {item.service_name}")
+        if item.details:
+            lines.append(f"Комментарий: {item.details}")
+        lines.append(f"Взять в работу: /claim {item.request_id}")
+        return "\n".join(lines)
+
+    lines = [f"Новые заявки: {len(items)}"]
+    for item in items:
+        service = item.service_name or "без услуги"
+        lines.append(f"#{item.request_id} — {service} (клиент {item.user_id})")
+    lines.append("Очередь: /queue")
+    return "\n".join(lines)
+
+
 class NotificationService:
-    """Simple async notification publisher for the master."""
+    """Background publisher of master notifications.
+
+    ``submit`` only puts the notification on a bounded queue and returns a
+    future that resolves once it has been delivered; a long-lived task
+    drains it, coalesces bursts into one digest message, waits for per-chat
+    and global token buckets and retries transient failures with backoff.
+    """
 
-    def __init__(self) -> None:
-        self.settings = get_settings()
+    def __init__(self, settings: Settings, sink: NotificationSink) -> None:
+        self.settings = settings
+        self.sink = sink
+        self._queue: asyncio.Queue[tuple[RequestNotification, asyncio.Future[None]]] | None = None
+        self._chat_buckets: dict[int, TokenBucket] = {}
+        self._global_bucket = TokenBucket(
+            settings.notification_global_rate_per_second,
+            settings.notification_global_rate_per_second,
+        )
+        self._task: asyncio.Task[None] | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
 
-    def send_new_request(self, request: Request) -> None:
+    async def start(self) -> None:
+        if not self.running:
+            self._queue = asyncio.Queue(maxsize=self.settings.notification_queue_size)
+            self._task = asyncio.create_task(self._run(), name="notification-dispatcher")
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        if not self._task or self._queue is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                "Dropping undelivered notifications on shutdown",
+                extra={"pending": self._queue.qsize()},
+            )
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._queue = None
+        await self.sink.close()
+
+    def submit(self, notification: RequestNotification) -> asyncio.Future[None]:
+        """Queue ``notification``; the future fails if it cannot be delivered."""
+
+        future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
         if not self.settings.telegram_master_chat_id:
             logger.info("Master chat id is not set; skipping notification")
-            return
+            future.set_result(None)
+            return future
+        if self._queue is None:
+            future.set_exception(RuntimeError("Notification dispatcher is not running"))
+            return future
 
-        # Placeholder for integration with aiogram Bot or another channel.
+        try:
+            self._queue.put_nowait((notification, future))
+        except asyncio.QueueFull:
+            NOTIFICATIONS.inc("queue_full")
+            future.set_exception(RetryLater("Notification queue is full"))
+            return future
+        NOTIFICATIONS.inc("submitted")
         logger.info(
             "Notify master about request",
             extra={
-                "request_id": request.id,
-                "user": request.user_id,
-                "service_id": request.service_id,
+                "request_id": notification.request_id,
+                "user": notification.user_id,
+                "service_id": notification.service_id,
+                "correlation_id": notification.correlation_id,
             },
         )
+        return future
+
+    async def _collect_batch(
+        self,
+    ) -> list[tuple[RequestNotification, asyncio.Future[None]]]:
+        assert self._queue is not None
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.settings.notification_digest_window_seconds
+        while len(batch) < self.settings.notification_digest_max_items:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._collect_batch()
+            items = [item for item, _ in batch]
+            error: BaseException | None = None
+            delivered = False
+            try:
+                await self._deliver(self.settings.telegram_master_chat_id, items)
+                delivered = True
+                NOTIFICATIONS.inc("delivered", amount=len(items))
+            except Exception as exc:
+                error = exc
+                NOTIFICATIONS.inc("failed", amount=len(items))
+                logger.exception(
+                    "Failed to deliver master notification",
+                    extra={
+                        "request_ids": [item.request_id for item in items],
+                        "correlation_ids": [item.correlation_id for item in items],
+                    },
+                )
+            finally:
+                for _, future in batch:
+                    if future.done():
+                        pass
+                    elif delivered:
+                        future.set_result(None)
+                    elif error is not None:
+                        future.set_exception(error)
+                    else:
+                        future.cancel()
+                    self._queue.task_done()
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(
+                self.settings.notification_chat_rate_per_second,
+                self.settings.notification_chat_burst,
+            )
+            self._chat_buckets[chat_id] = bucket
+        return bucket
+
+    async def _deliver(self, chat_id: int, batch: list[RequestNotification]) -> None:
+        text = format_notifications(batch)
+        attempt = 0
+        while True:
+            await self._chat_bucket(chat_id).acquire()
+            await self._global_bucket.acquire()
+            started = time.perf_counter()
+            try:
+                await self.sink.send_message(chat_id, text)
+                NOTIFICATION_SENDS.observe(time.perf_counter() - started, "ok")
+                return
+            except RetryLater as exc:
+                NOTIFICATION_SENDS.observe(time.perf_counter() - started, "retry")
+                attempt += 1
+                if attempt > self.settings.notification_max_retries:
+                    raise
+                delay = exc.retry_after
+                if delay is None:
+                    base = self.settings.notification_retry_base_seconds
+                    delay = base * 2 ** (attempt - 1) * (1 + random.random() / 2)
+                NOTIFICATIONS.inc("retried")
+                logger.warning(
+                    "Retrying master notification",
+                    extra={"attempt": attempt, "delay": delay, "error": str(exc)},
+                )
+                await asyncio.sleep(delay)
+
+
+def _build_sink(settings: Settings) -> NotificationSink:
+    if settings.notification_sink == "fake":
+        return FakeBotSink()
+    if settings.notification_sink == "telegram" and settings.telegram_bot_token:
+        return TelegramBotSink(settings.telegram_bot_token)
+    return LoggingSink()
+
 
-    def enqueue(self, request: Request) -> None:
-        self.send_new_request(request)
+_settings = get_settings()
+notification_service = NotificationService(_settings, _build_sink(_settings))
 
 
 def get_notification_service() -> NotificationService:
-    return NotificationService()
+    return notification_service
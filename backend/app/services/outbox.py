@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import crud_async
+from ..core.config import Settings, get_settings
+from ..write_queue import WriteQueue, write_queue
+from .notifications import NotificationService, RequestNotification, notification_service
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxWorker:
+    """Deliver ``notifications_outbox`` rows with at-least-once semantics.
+
+    Rows are claimed in batches under a lease, handed to the notification
+    dispatcher and marked sent only after delivery succeeded. A crashed worker
+    simply lets its lease expire and the rows are claimed again.
+    """
+
+    def __init__(
+        self, settings: Settings, writer: WriteQueue, notifier: NotificationService
+    ) -> None:
+        self.settings = settings
+        self.writer = writer
+        self.notifier = notifier
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        if not self.running:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self.run_forever(), name="outbox-worker")
+
+    async def stop(self) -> None:
+        if not self._task:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def wake(self) -> None:
+        """Skip the poll delay after a new row has been committed."""
+
+        self._wakeup.set()
+
+    async def run_forever(self) -> None:
+        while True:
+            try:
+                processed = await self.run_once()
+            except Exception:
+                logger.exception("Outbox batch failed")
+                processed = 0
+            if processed:
+                continue
+            try:
+                await asyncio.wait_for(
+                    self._wakeup.wait(), self.settings.outbox_poll_interval_seconds
+                )
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def run_once(self) -> int:
+        token = uuid.uuid4().hex
+        now = datetime.utcnow()
+
+        async def claim(db: AsyncSession):
+            return await crud_async.claim_outbox_batch(
+                db,
+                token=token,
+                limit=self.settings.outbox_batch_size,
+                max_attempts=self.settings.outbox_max_attempts,
+                now=now,
+                lease_until=now + timedelta(seconds=self.settings.outbox_lease_seconds),
+            )
+
+        entries = await self.writer.submit(claim)
+        if not entries:
+            return 0
+
+        futures = [
+            self.notifier.submit(RequestNotification.from_json(entry.payload))
+            for entry in entries
+        ]
+        results = await asyncio.gather(*futures, return_exceptions=True)
+
+        sent_ids = [entry.id for entry, result in zip(entries, results) if result is None]
+        failed = [
+            (entry, result)
+            for entry, result in zip(entries, results)
+            if isinstance(result, BaseException)
+        ]
+
+        async def settle(db: AsyncSession) -> None:
+            finished_at = datetime.utcnow()
+            if sent_ids:
+                await crud_async.mark_outbox_sent(db, ids=sent_ids, now=finished_at)
+            for entry, error in failed:
+                delay = self.settings.outbox_poll_interval_seconds * 2 ** entry.attempts
+                await crud_async.mark_outbox_failed(
+                    db,
+                    entry_id=entry.id,
+                    error=repr(error),
+                    retry_at=finished_at + timedelta(seconds=delay),
+                )
+
+        await self.writer.submit(settle)
+        logger.info(
+            "Processed notification outbox batch",
+            extra={"sent": len(sent_ids), "failed": len(failed)},
+        )
+        return len(entries)
+
+
+outbox_worker = OutboxWorker(get_settings(), write_queue, notification_service)
+
+
+def get_outbox_worker() -> OutboxWorker:
+    return outbox_worker
@@ -0,0 +1,300 @@
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+from typing import AsyncIterator, Optional, Sequence
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from .. import crud_async, models
+from ..core.config import get_settings
+from ..core.metrics import REQUEST_STREAM_DROPPED, REQUEST_STREAM_SUBSCRIBERS
+from ..database import AsyncSessionLocal
+from ..schemas import RequestEventPublic
+from .shared_state import VersionWatcher, shared_state
+
+CREATED = "created"
+STATUS = "status"
+# The client's view is behind by more than the replay limit: reload the list.
+RESET = "reset"
+# Sent first on a fresh connection so the client has an id to resume from.
+READY = "ready"
+# How long EventSource-style clients wait before reconnecting.
+RETRY_MS = 3000
+
+_PENDING_INFO_KEY = "request_events_pending"
+_SHARED_KEY = "request_events"
+# Ids delivered ahead of the database cursor that are remembered for dedup.
+_DELIVERED_LIMIT = 4096
+
+
+@dataclass(frozen=True, slots=True)
+class RequestEvent:
+    id: int
+    name: str
+    data: bytes = b"{}"
+
+    def encode(self) -> bytes:
+        return b"id: %d\nevent: %s\ndata: %s\n\n" % (self.id, self.name.encode(), self.data)
+
+
+def request_event(history: models.RequestStatusHistory, request: models.Request) -> RequestEvent:
+    payload = RequestEventPublic(
+        id=history.id,
+        request_id=request.id,
+        status=history.to_status,
+        from_status=history.from_status,
+        service_id=request.service_id,
+        details=request.details,
+        created_at=request.created_at,
+        changed_at=history.created_at,
+        actor_id=history.actor_id,
+        note=history.note,
+    )
+    name = CREATED if history.from_status is None else STATUS
+    return RequestEvent(history.id, name, payload.model_dump_json().encode())
+
+
+class TooManySubscribers(RuntimeError):
+    pass
+
+
+class Subscription:
+    def __init__(self, buffer_size: int) -> None:
+        self.queue: asyncio.Queue[RequestEvent] = asyncio.Queue(buffer_size)
+        self.evicted = False
+
+
+class RequestBroadcaster:
+    """Fan committed request events out to the open streams of this process.
+
+    Every subscriber gets a bounded queue and ``publish`` never waits: a
+    subscriber whose queue is full is evicted instead of slowing the writer
+    or the other streams down, and its client resumes from the database with
+    ``Last-Event-ID``. An idle subscriber costs one queue and one sleeping
+    coroutine, so many dashboards can stay connected.
+
+    Events come from two sources: commits in this process (``publish``) and
+    the database, read by ``catch_up`` for commits of other processes. Only
+    the database read moves ``cursor``, so a local event never makes the
+    catch-up skip an older foreign one; ids seen from both sources are
+    delivered once.
+    """
+
+    def __init__(self, buffer_size: int, max_subscribers: int) -> None:
+        self.buffer_size = max(1, buffer_size)
+        self.max_subscribers = max_subscribers
+        # Events up to this id were read from the database; ``None`` while nobody listens.
+        self.cursor: Optional[int] = None
+        # Ids above ``cursor`` that were already delivered.
+        self._delivered: set[int] = set()
+        self._subscribers: set[Subscription] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self) -> Subscription:
+        if len(self._subscribers) >= self.max_subscribers:
+            REQUEST_STREAM_DROPPED.inc("rejected")
+            raise TooManySubscribers("Too many open request streams")
+        self._loop = asyncio.get_running_loop()
+        subscription = Subscription(self.buffer_size)
+        self._subscribers.add(subscription)
+        REQUEST_STREAM_SUBSCRIBERS.inc()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        if subscription in self._subscribers:
+            self._subscribers.discard(subscription)
+            REQUEST_STREAM_SUBSCRIBERS.dec()
+        if not self._subscribers:
+            self.cursor = None
+            self._delivered.clear()
+
+    def start_from(self, event_id: int) -> None:
+        """Set the database cursor for the first subscriber; later ones leave it alone."""
+
+        if self._subscribers and self.cursor is None:
+            self.advance(event_id)
+
+    def advance(self, event_id: int) -> None:
+        self.cursor = max(self.cursor or 0, event_id)
+        self._delivered = {item for item in self._delivered if item > self.cursor}
+
+    def publish(self, events: Sequence[RequestEvent]) -> None:
+        """Queue ``events`` for every subscriber; safe to call from any thread."""
+
+        loop = self._loop
+        if not events or not self._subscribers or loop is None or loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._deliver(events)
+        else:
+            loop.call_soon_threadsafe(self._deliver, events)
+
+    def deliver_read(self, events: Sequence[RequestEvent]) -> None:
+        """Deliver events read from the database and move the cursor past them.
+
+        Must run on the subscribers' loop.
+        """
+
+        if events:
+            self._deliver(events)
+            self.advance(events[-1].id)
+
+    def _deliver(self, events: Sequence[RequestEvent]) -> None:
+        cursor = self.cursor or 0
+        # Anything at or below the cursor was already delivered by ``catch_up``.
+        events = [item for item in events if item.id > cursor and item.id not in self._delivered]
+        if not events or not self._subscribers:
+            return
+        self._delivered.update(item.id for item in events)
+        if len(self._delivered) > _DELIVERED_LIMIT:
+            # The cursor only moves on catch-up; without other processes it stays put.
+            self._delivered = set(sorted(self._delivered)[-_DELIVERED_LIMIT // 2 :])
+        for subscription in list(self._subscribers):
+            for item in events:
+                try:
+                    subscription.queue.put_nowait(item)
+                except asyncio.QueueFull:
+                    subscription.evicted = True
+                    self.unsubscribe(subscription)
+                    REQUEST_STREAM_DROPPED.inc("evicted")
+                    break
+
+
+settings = get_settings()
+request_broadcaster = RequestBroadcaster(
+    settings.request_stream_buffer_size, settings.request_stream_max_subscribers
+)
+
+
+def get_request_broadcaster() -> RequestBroadcaster:
+    return request_broadcaster
+
+
+async def stream_events(
+    broadcaster: RequestBroadcaster,
+    last_event_id: Optional[int],
+    *,
+    keepalive_seconds: float,
+    replay_limit: int,
+) -> AsyncIterator[bytes]:
+    """Server-sent events for one client: the replay after ``last_event_id``, then live ones.
+
+    The subscription is taken before the database is read, so nothing
+    committed in between is lost; replayed events that also arrive live are
+    skipped. An evicted stream ends and the client reconnects from the last
+    id it received.
+    """
+
+    subscription = broadcaster.subscribe()
+    try:
+        yield b"retry: %d\n\n" % RETRY_MS
+        # Read everything first: the session must not stay open while the client is slow.
+        async with AsyncSessionLocal() as db:
+            if last_event_id is None:
+                backlog = [RequestEvent(await crud_async.latest_request_event_id(db), READY)]
+            else:
+                rows = await crud_async.list_request_events(
+                    db, after_id=last_event_id, limit=replay_limit + 1
+                )
+                if len(rows) > replay_limit:
+                    backlog = [RequestEvent(await crud_async.latest_request_event_id(db), RESET)]
+                else:
+                    backlog = [request_event(history, request) for history, request in rows]
+        replayed = {item.id for item in backlog if item.name not in (READY, RESET)}
+        for item in backlog:
+            yield item.encode()
+        latest = backlog[-1].id if backlog else last_event_id
+        broadcaster.start_from(latest)
+
+        while not subscription.evicted:
+            try:
+                item = await asyncio.wait_for(subscription.queue.get(), keepalive_seconds)
+            except asyncio.TimeoutError:
+                # Nothing in flight any more can overlap the replay.
+                replayed.clear()
+                yield b": keepalive\n\n"
+                continue
+            if subscription.evicted:
+                break
+            if item.id not in replayed:
+                yield item.encode()
+    finally:
+        broadcaster.unsubscribe(subscription)
+
+
+_catch_up_lock = asyncio.Lock()
+
+
+async def catch_up(broadcaster: RequestBroadcaster) -> None:
+    """Publish events other processes committed since the database cursor."""
+
+    limit = settings.request_stream_replay_limit
+    async with _catch_up_lock:
+        while broadcaster.cursor is not None:
+            async with AsyncSessionLocal() as db:
+                rows = await crud_async.list_request_events(
+                    db, after_id=broadcaster.cursor, limit=limit
+                )
+            if not rows or broadcaster.cursor is None:
+                return
+            broadcaster.deliver_read([request_event(*row) for row in rows])
+            if len(rows) < limit:
+                return
+
+
+def _on_shared_change(shared_keys: set[str]) -> None:
+    if _SHARED_KEY in shared_keys and request_broadcaster.cursor is not None:
+        asyncio.get_running_loop().create_task(catch_up(request_broadcaster))
+
+
+request_events_watcher: VersionWatcher | None = (
+    VersionWatcher(
+        shared_state,
+        _on_shared_change,
+        interval_seconds=settings.shared_state_poll_interval_seconds,
+    )
+    if shared_state is not None
+    else None
+)
+
+
+def _pending(session: Session) -> list[tuple[models.RequestStatusHistory, RequestEvent]]:
+    return session.info.setdefault(_PENDING_INFO_KEY, [])
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_flushed_events(session: Session, flush_context) -> None:
+    # Payloads are built now, while the attributes are loaded; commit expires them.
+    for obj in session.new:
+        if not isinstance(obj, models.RequestStatusHistory):
+            continue
+        request = inspect(obj).attrs.request.loaded_value
+        if isinstance(request, models.Request):
+            _pending(session).append((obj, request_event(obj, request)))
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_on_commit(session: Session) -> None:
+    pending = session.info.pop(_PENDING_INFO_KEY, None)
+    if not pending:
+        return
+    request_broadcaster.publish([item for obj, item in pending if inspect(obj).persistent])
+    if shared_state is not None:
+        shared_state.bump_soon(_SHARED_KEY)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_on_rollback(session: Session, previous_transaction) -> None:
+    # Also called for a rolled back SAVEPOINT, which only drops the rows written inside it.
+    pending = session.info.get(_PENDING_INFO_KEY)
+    if pending:
+        pending[:] = [entry for entry in pending if inspect(entry[0]).persistent]
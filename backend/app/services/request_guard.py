@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Generic, TypeVar
+
+from fastapi import HTTPException, status
+from pydantic import BaseModel
+
+from ..core.config import get_settings
+from ..core.metrics import REQUEST_GUARD
+from .shared_state import SharedState, shared_state
+
+M = TypeVar("M", bound=BaseModel)
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_IDEMPOTENCY_KEY_LENGTH = 255
+
+_SHARED_NAMESPACE = "idempotency"
+# How often a retry checks whether another worker finished the first attempt.
+_SHARED_POLL_SECONDS = 0.05
+
+
+class RateLimited(HTTPException):
+    def __init__(self, retry_after: float):
+        super().__init__(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many requests, try again later",
+            headers={"Retry-After": str(max(1, int(retry_after + 0.999)))},
+        )
+
+
+class RateLimiter:
+    """Non-blocking token buckets per key, kept in a bounded LRU.
+
+    A bucket that is idle long enough to refill completely carries no state,
+    so evicting the least recently used one when the map is full only forgets
+    keys that have stopped sending. Buckets are ``(tokens, updated_at)``
+    tuples to keep each key to a couple of floats.
+    """
+
+    def __init__(self, rate_per_second: float, burst: int, max_keys: int) -> None:
+        self.rate = rate_per_second
+        self.capacity = float(max(1, burst))
+        self.max_keys = max(1, max_keys)
+        self._buckets: OrderedDict[int, tuple[float, float]] = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def acquire(self, key: int) -> float:
+        """Take one token for ``key``; returns 0, or seconds until one is available."""
+
+        if not self.enabled:
+            return 0.0
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.get(key, (self.capacity, now))
+        tokens = min(self.capacity, tokens + (now - updated_at) * self.rate)
+        if tokens >= 1:
+            tokens -= 1
+            retry_after = 0.0
+        else:
+            retry_after = (1 - tokens) / self.rate
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return retry_after
+
+    def check(self, key: int) -> None:
+        retry_after = self.acquire(key)
+        if retry_after:
+            REQUEST_GUARD.inc("rate_limited")
+            raise RateLimited(retry_after)
+
+
+class _Entry(Generic[M]):
+    __slots__ = ("fingerprint", "expires_at", "future")
+
+    def __init__(self, fingerprint: str, expires_at: float, future: asyncio.Future[M]) -> None:
+        self.fingerprint = fingerprint
+        self.expires_at = expires_at
+        self.future = future
+
+
+class IdempotencyCache(Generic[M]):
+    """Remember results per ``(scope, Idempotency-Key)`` for a TTL.
+
+    The entry is created before the work starts, so a retry that arrives
+    while the first attempt is still running waits for it instead of running
+    twice. Failed attempts are forgotten so the client can retry them; a key
+    reused with a different request body is rejected with 422. When full,
+    the oldest keys are dropped first.
+
+    With ``state`` the key is also claimed in the shared dedup table and the
+    serialized result is stored there, so a retry that lands on another
+    worker replays it. While the first attempt runs elsewhere the retry
+    polls for up to ``wait_seconds`` and then gets 409; the claim itself
+    lapses after ``wait_seconds`` too, so a worker that died mid-attempt
+    does not block the key for the whole TTL.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float,
+        max_entries: int,
+        *,
+        state: SharedState | None = None,
+        wait_seconds: float = 30.0,
+    ) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self.state = state
+        self.wait_seconds = wait_seconds
+        self._entries: OrderedDict[tuple[int, str], _Entry[M]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def fingerprint(body: str) -> str:
+        return hashlib.sha256(body.encode()).hexdigest()
+
+    def _evict(self, now: float) -> None:
+        # Every entry gets the same TTL, so insertion order is expiry order.
+        while self._entries:
+            entry = next(iter(self._entries.values()))
+            if entry.expires_at > now and len(self._entries) <= self.max_entries:
+                break
+            self._entries.popitem(last=False)
+
+    async def run(
+        self,
+        scope: int,
+        key: str,
+        fingerprint: str,
+        work: Callable[[], Awaitable[M]],
+        result_type: type[M],
+    ) -> tuple[M, bool]:
+        """Return ``(result, replayed)``, running ``work`` at most once per key."""
+
+        if len(key) > MAX_IDEMPOTENCY_KEY_LENGTH:
+            raise HTTPException(status.HTTP_400_BAD_REQUEST, "Idempotency key is too long")
+
+        now = time.monotonic()
+        cache_key = (scope, key)
+        entry = self._entries.get(cache_key)
+        if entry is not None and entry.expires_at <= now:
+            del self._entries[cache_key]
+            entry = None
+
+        if entry is not None:
+            _check_fingerprint(entry.fingerprint, fingerprint)
+            REQUEST_GUARD.inc("replayed")
+            return await asyncio.shield(entry.future), True
+
+        future: asyncio.Future[M] = asyncio.get_running_loop().create_future()
+        entry = self._entries[cache_key] = _Entry(fingerprint, now + self.ttl_seconds, future)
+        self._evict(now)
+        try:
+            result, replayed = await self._run_shared(
+                f"{scope}:{key}", fingerprint, work, result_type
+            )
+        except BaseException as exc:
+            if self._entries.get(cache_key) is entry:
+                del self._entries[cache_key]
+            if isinstance(exc, Exception):
+                future.set_exception(exc)
+                # Retrieved here so an attempt without waiters doesn't log a warning.
+                future.exception()
+            else:
+                future.cancel()
+            raise
+        future.set_result(result)
+        return result, replayed
+
+    async def _run_shared(
+        self,
+        shared_key: str,
+        fingerprint: str,
+        work: Callable[[], Awaitable[M]],
+        result_type: type[M],
+    ) -> tuple[M, bool]:
+        if self.state is None:
+            return await work(), False
+
+        claim = json.dumps({"fingerprint": fingerprint})
+        deadline = time.monotonic() + self.wait_seconds
+        while not await self.state.add_if_absent_async(
+            _SHARED_NAMESPACE, shared_key, self.wait_seconds, claim
+        ):
+            stored = await self.state.get_async(_SHARED_NAMESPACE, shared_key)
+            if stored is not None:
+                data = json.loads(stored)
+                _check_fingerprint(data["fingerprint"], fingerprint)
+                if data.get("result") is not None:
+                    REQUEST_GUARD.inc("replayed")
+                    return result_type.model_validate_json(data["result"]), True
+            if time.monotonic() >= deadline:
+                raise HTTPException(
+                    status.HTTP_409_CONFLICT,
+                    "A request with this idempotency key is still in progress",
+                )
+            await asyncio.sleep(_SHARED_POLL_SECONDS)
+
+        try:
+            result = await work()
+        except BaseException:
+            await self.state.discard_async(_SHARED_NAMESPACE, shared_key)
+            raise
+        stored = {"fingerprint": fingerprint, "result": result.model_dump_json()}
+        await self.state.set_value_async(
+            _SHARED_NAMESPACE, shared_key, json.dumps(stored), self.ttl_seconds
+        )
+        return result, False
+
+
+def _check_fingerprint(stored: str, fingerprint: str) -> None:
+    if stored != fingerprint:
+        raise HTTPException(
+            status.HTTP_422_UNPROCESSABLE_ENTITY,
+            "Idempotency key was already used with a different request",
+        )
+
+
+settings = get_settings()
+request_rate_limiter = RateLimiter(
+    settings.request_rate_limit_per_minute / 60,
+    settings.request_rate_limit_burst,
+    settings.request_rate_limit_max_users,
+)
+idempotency_cache: IdempotencyCache = IdempotencyCache(
+    settings.idempotency_ttl_seconds, settings.idempotency_cache_size, state=shared_state
+)
+
+
+def get_request_rate_limiter() -> RateLimiter:
+    return request_rate_limiter
+
+
+def get_idempotency_cache() -> IdempotencyCache:
+    return idempotency_cache
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import logging
+from typing import Optional, Sequence
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import crud_async, models
+
+logger = logging.getLogger(__name__)
+
+Status = models.RequestStatusEnum
+
+# Allowed moves; anything else is rejected before touching the row.
+TRANSITIONS: dict[Status, frozenset[Status]] = {
+    Status.NEW: frozenset({Status.IN_PROGRESS, Status.CLOSED}),
+    Status.IN_PROGRESS: frozenset({Status.CLOSED}),
+    Status.CLOSED: frozenset(),
+}
+
+# Named master actions and the status each one moves a request to.
+ACTIONS: dict[str, Status] = {
+    "claim": Status.IN_PROGRESS,
+    "close": Status.CLOSED,
+}
+
+
+STATUS_LABELS: dict[Status, str] = {
+    Status.NEW: "новая",
+    Status.IN_PROGRESS: "в работе",
+    Status.CLOSED: "закрыта",
+}
+
+
+class RequestNotFound(LookupError):
+    pass
+
+
+class InvalidTransition(ValueError):
+    def __init__(self, request_id: int, current: Status, target: Status) -> None:
+        super().__init__(
+            f"Request #{request_id} is {current.value}, it cannot become {target.value}"
+        )
+        self.current = current
+        self.target = target
+
+
+def can_transition(current: Status, target: Status) -> bool:
+    return target in TRANSITIONS[current]
+
+
+async def transition(
+    db: AsyncSession,
+    request_id: int,
+    target: Status,
+    *,
+    actor_id: Optional[int],
+    note: Optional[str] = None,
+) -> models.Request:
+    """Move a request to ``target`` and record it in the status history.
+
+    The row is read ``FOR UPDATE`` (a no-op on SQLite, where the write queue
+    already serialises writers), so two concurrent claims cannot both win.
+    Per-status counters follow through the ``Request`` mapper events.
+    """
+
+    request = await crud_async.get_request_for_update(db, request_id)
+    if request is None:
+        raise RequestNotFound(f"Request #{request_id} not found")
+    current = request.status
+    if not can_transition(current, target):
+        raise InvalidTransition(request_id, current, target)
+
+    request.status = target
+    db.add(
+        models.RequestStatusHistory(
+            request=request,
+            from_status=current,
+            to_status=target,
+            actor_id=actor_id,
+            note=note,
+        )
+    )
+    await db.flush()
+    logger.info(
+        "Request status changed",
+        extra={
+            "request_id": request_id,
+            "from_status": current.value,
+            "to_status": target.value,
+            "actor_id": actor_id,
+        },
+    )
+    return request
+
+
+async def apply_action(
+    db: AsyncSession,
+    request_id: int,
+    action: str,
+    *,
+    actor_id: Optional[int],
+    note: Optional[str] = None,
+) -> models.Request:
+    return await transition(db, request_id, ACTIONS[action], actor_id=actor_id, note=note)
+
+
+def format_counts(counts: dict[Status, int]) -> str:
+    return ", ".join(f"{STATUS_LABELS[status]}: {counts.get(status, 0)}" for status in Status)
+
+
+def format_queue(requests: Sequence[models.Request], counts: dict[Status, int]) -> str:
+    lines = [f"Заявки — {format_counts(counts)}"]
+    if not requests:
+        lines.append("Открытых заявок нет.")
+    for request in requests:
+        service = request.service.name if request.service is not None else "без услуги"
+        lines.append(
+            f"#{request.id} [{STATUS_LABELS[request.status]}] {service}, "
+            f"{request.created_at:%d.%m %H:%M}"
+        )
+    return "\n".join(lines)
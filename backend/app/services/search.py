@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import re
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models import SEARCH_INDEXES, search_fill_statement
+
+KINDS = ("request", "portfolio")
+SNIPPET_MARK = "**"
+SNIPPET_TOKENS = 12
+# Column weights for bm25: a hit in a portfolio title outranks one in its text.
+PORTFOLIO_WEIGHTS = "10.0, 1.0, 2.0"
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+_CYRILLIC = re.compile("[а-я]+")
+
+_ARMS = {
+    "request": f"""
+        SELECT 'request' AS kind, requests.id AS id, NULL AS title,
+               snippet(requests_fts, 0, '{SNIPPET_MARK}', '{SNIPPET_MARK}', '…', {SNIPPET_TOKENS})
+                   AS snippet,
+               bm25(requests_fts) AS rank, requests.created_at AS created_at
+        FROM requests_fts JOIN requests ON requests.id = requests_fts.rowid
+        WHERE requests_fts MATCH :query
+    """,
+    "portfolio": f"""
+        SELECT 'portfolio' AS kind, portfolio_fts.rowid AS id,
+               highlight(portfolio_fts, 0, '{SNIPPET_MARK}', '{SNIPPET_MARK}') AS title,
+               snippet(portfolio_fts, -1, '{SNIPPET_MARK}', '{SNIPPET_MARK}', '…', {SNIPPET_TOKENS})
+                   AS snippet,
+               bm25(portfolio_fts, {PORTFOLIO_WEIGHTS}) AS rank,
+               portfolio.created_at AS created_at
+        FROM portfolio_fts JOIN portfolio ON portfolio.id = portfolio_fts.rowid
+        WHERE portfolio_fts MATCH :query
+    """,
+}
+_COUNTS = {
+    "request": "SELECT count(*) FROM requests_fts WHERE requests_fts MATCH :query",
+    "portfolio": "SELECT count(*) FROM portfolio_fts WHERE portfolio_fts MATCH :query",
+}
+_KIND_INDEXES = {"request": "requests_fts", "portfolio": "portfolio_fts"}
+# Probe results per engine; the app probes at startup, after the schema is current.
+_supported: dict[Engine, bool] = {}
+
+
+def _probe(engine: Engine) -> bool:
+    if engine.dialect.name != "sqlite":
+        return False
+    try:
+        with engine.connect() as conn:
+            for index in _KIND_INDEXES.values():
+                conn.execute(text(f"SELECT rowid FROM {index} LIMIT 0"))
+    except OperationalError:
+        return False
+    return True
+
+
+def is_supported(engine: Engine) -> bool:
+    """Whether the FTS5 indexes exist and can be read; probed once per engine.
+
+    They are not created when SQLite lacks FTS5, and a database indexed
+    elsewhere fails to open them (``no such module: fts5``).
+    """
+
+    if engine not in _supported:
+        _supported[engine] = _probe(engine)
+    return _supported[engine]
+
+
+@dataclass(slots=True)
+class SearchPage:
+    total: int
+    hits: list[dict]
+
+
+def build_match_query(raw: str) -> Optional[str]:
+    """Turn free text into an FTS5 query: every word must match as a prefix.
+
+    Words are quoted, so FTS5 syntax in user input is inert, and ``ё`` is
+    folded like the index does. Russian words are inflected and FTS5 has no
+    Russian stemmer, so longer Cyrillic words lose their ending first:
+    ``поклейка`` becomes ``"поклей"*`` and also matches ``поклейки`` and
+    ``поклейку``. Short words, Latin words and numbers are kept whole, so
+    ``обои`` or a brand name does not widen into unrelated terms.
+    """
+
+    terms = []
+    for word in _WORD.findall(raw.lower().replace("ё", "е")):
+        if _CYRILLIC.fullmatch(word):
+            if len(word) >= 7:
+                word = word[:-2]
+            elif len(word) >= 5:
+                word = word[:-1]
+        terms.append(f'"{word}"*')
+    return " ".join(terms) or None
+
+
+async def search(
+    db: AsyncSession,
+    raw_query: str,
+    *,
+    kinds: tuple[str, ...] = KINDS,
+    limit: int = 20,
+    offset: int = 0,
+) -> SearchPage:
+    """Best matches first (bm25) across the selected kinds, with snippets."""
+
+    query = build_match_query(raw_query)
+    if query is None:
+        return SearchPage(total=0, hits=[])
+
+    params = {"query": query, "limit": limit, "offset": offset}
+    statement = (
+        " UNION ALL ".join(_ARMS[kind] for kind in kinds)
+        + " ORDER BY rank, id DESC LIMIT :limit OFFSET :offset"
+    )
+    rows = (await db.execute(text(statement), params)).mappings().all()
+    total = 0
+    for kind in kinds:
+        total += (await db.execute(text(_COUNTS[kind]), {"query": query})).scalar_one()
+    return SearchPage(total=total, hits=[dict(row) for row in rows])
+
+
+@dataclass(slots=True)
+class ReindexResult:
+    index: str
+    rows: int
+    batches: int
+    duration_s: float
+
+
+def reindex(
+    engine: Engine,
+    *,
+    kinds: tuple[str, ...] = KINDS,
+    batch_size: int = 1000,
+    on_batch: Optional[Callable[[ReindexResult], None]] = None,
+) -> list[ReindexResult]:
+    """Rebuild the FTS indexes from their tables, one write transaction per index.
+
+    Rows are copied ``batch_size`` at a time so ``on_batch`` can report
+    progress. The transaction keeps the index consistent with its table: a
+    row deleted or edited mid-run would otherwise make the triggers remove
+    text the index does not hold. Searches keep using the old index until the
+    commit; writers to the table wait for it, up to the SQLite busy timeout.
+    """
+
+    results = []
+    for kind in kinds:
+        index = _KIND_INDEXES[kind]
+        table, _ = SEARCH_INDEXES[index]
+        result = ReindexResult(index=index, rows=0, batches=0, duration_s=0.0)
+        started = time.perf_counter()
+        with engine.begin() as conn:
+            conn.execute(text(f"INSERT INTO {index}({index}) VALUES ('delete-all')"))
+            last_id = 0
+            while True:
+                ids = conn.execute(
+                    text(f"SELECT id FROM {table} WHERE id > :last_id ORDER BY id LIMIT :limit"),
+                    {"last_id": last_id, "limit": batch_size},
+                ).scalars().all()
+                if not ids:
+                    break
+                conn.execute(
+                    text(search_fill_statement(index, "WHERE id BETWEEN :first AND :last")),
+                    {"first": ids[0], "last": ids[-1]},
+                )
+                last_id = ids[-1]
+                result.rows += len(ids)
+                result.batches += 1
+                result.duration_s = time.perf_counter() - started
+                if on_batch is not None:
+                    on_batch(result)
+            conn.execute(text(f"INSERT INTO {index}({index}) VALUES ('optimize')"))
+        result.duration_s = time.perf_counter() - started
+        results.append(result)
+    return results
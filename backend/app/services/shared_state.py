@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Callable
+
+from ..core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS versions (key TEXT PRIMARY KEY, version INTEGER NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS dedup ("
+    " namespace TEXT NOT NULL, key TEXT NOT NULL, expires_at REAL NOT NULL, value TEXT,"
+    " PRIMARY KEY (namespace, key)) WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS ix_dedup_expires_at ON dedup (expires_at)",
+)
+
+
+def _add_value_column(conn: sqlite3.Connection) -> None:
+    # Files created before dedup values existed; their contents are disposable.
+    if "value" in {row[1] for row in conn.execute("PRAGMA table_info(dedup)")}:
+        return
+    try:
+        conn.execute("ALTER TABLE dedup ADD COLUMN value TEXT")
+    except sqlite3.OperationalError as exc:
+        if "duplicate column" not in str(exc):
+            raise
+
+
+class SharedState:
+    """Cross-process state for workers on one host, kept in a small SQLite file.
+
+    Holds version counters (a process bumps a key, the others notice the new
+    version and drop their local copies) and expiring dedup sets, whose keys
+    may carry a small value (idempotent replies). The file is
+    independent of ``DATABASE_URL`` and holds nothing that must survive a
+    restart, so it runs with ``synchronous=OFF``. Connections are opened per
+    process, which keeps the object safe to create before workers fork.
+
+    The plain methods block for up to the 5 s busy timeout when the file is
+    contended; code on the event loop uses the ``*_async`` variants, which run
+    them in a thread, or ``bump_soon``.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        self._pid: int | None = None
+        self._dedup_calls = 0
+        self._pending: set[asyncio.Task[None]] = set()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None or self._pid != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(
+                self.path, timeout=5.0, isolation_level=None, check_same_thread=False
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            for statement in _SCHEMA:
+                conn.execute(statement)
+            _add_value_column(conn)
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def bump(self, *keys: str) -> None:
+        with self._lock:
+            conn = self._connection()
+            conn.executemany(
+                "INSERT INTO versions (key, version) VALUES (?, 1) "
+                "ON CONFLICT (key) DO UPDATE SET version = version + 1",
+                [(key,) for key in keys],
+            )
+
+    def versions(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self._connection().execute("SELECT key, version FROM versions"))
+
+    def add_if_absent(
+        self, namespace: str, key: str, ttl_seconds: float, value: str | None = None
+    ) -> bool:
+        """Record ``key`` in ``namespace``; ``False`` if another process already did."""
+
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            self._dedup_calls += 1
+            if self._dedup_calls % 1000 == 0:
+                conn.execute("DELETE FROM dedup WHERE expires_at < ?", (now,))
+            cursor = conn.execute(
+                "INSERT INTO dedup (namespace, key, expires_at, value) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (namespace, key) DO UPDATE "
+                "SET expires_at = excluded.expires_at, value = excluded.value "
+                "WHERE dedup.expires_at < ?",
+                (namespace, key, now + ttl_seconds, value, now),
+            )
+            return cursor.rowcount > 0
+
+    def get(self, namespace: str, key: str) -> str | None:
+        """Value of an unexpired ``key``; ``None`` if it is absent or has none."""
+
+        with self._lock:
+            row = (
+                self._connection()
+                .execute(
+                    "SELECT value FROM dedup WHERE namespace = ? AND key = ? AND expires_at >= ?",
+                    (namespace, key, time.time()),
+                )
+                .fetchone()
+            )
+        return row[0] if row else None
+
+    def set_value(self, namespace: str, key: str, value: str, ttl_seconds: float) -> None:
+        with self._lock:
+            self._connection().execute(
+                "UPDATE dedup SET value = ?, expires_at = ? WHERE namespace = ? AND key = ?",
+                (value, time.time() + ttl_seconds, namespace, key),
+            )
+
+    def discard(self, namespace: str, key: str) -> None:
+        with self._lock:
+            self._connection().execute(
+                "DELETE FROM dedup WHERE namespace = ? AND key = ?", (namespace, key)
+            )
+
+    async def bump_async(self, *keys: str) -> None:
+        await asyncio.to_thread(self.bump, *keys)
+
+    async def versions_async(self) -> dict[str, int]:
+        return await asyncio.to_thread(self.versions)
+
+    async def add_if_absent_async(
+        self, namespace: str, key: str, ttl_seconds: float, value: str | None = None
+    ) -> bool:
+        return await asyncio.to_thread(self.add_if_absent, namespace, key, ttl_seconds, value)
+
+    async def get_async(self, namespace: str, key: str) -> str | None:
+        return await asyncio.to_thread(self.get, namespace, key)
+
+    async def set_value_async(
+        self, namespace: str, key: str, value: str, ttl_seconds: float
+    ) -> None:
+        await asyncio.to_thread(self.set_value, namespace, key, value, ttl_seconds)
+
+    async def discard_async(self, namespace: str, key: str) -> None:
+        await asyncio.to_thread(self.discard, namespace, key)
+
+    def bump_soon(self, *keys: str) -> None:
+        """Bump ``keys`` without waiting for the file; failures are only logged.
+
+        For synchronous hooks such as ``after_commit``: on the event loop the
+        write runs in a thread, elsewhere (CLI, sync sessions in threads) it
+        runs inline.
+        """
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            try:
+                self.bump(*keys)
+            except sqlite3.Error:
+                logger.exception("Failed to bump shared versions", extra={"keys": list(keys)})
+            return
+
+        task = loop.create_task(self.bump_async(*keys))
+        self._pending.add(task)
+        task.add_done_callback(lambda done: self._bumped(done, keys))
+
+    def _bumped(self, task: asyncio.Task[None], keys: tuple[str, ...]) -> None:
+        self._pending.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(
+                "Failed to bump shared versions",
+                exc_info=task.exception(),
+                extra={"keys": list(keys)},
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+
+
+class VersionWatcher:
+    """Poll shared versions and call back with the keys that changed elsewhere."""
+
+    def __init__(
+        self,
+        state: SharedState,
+        on_change: Callable[[set[str]], None],
+        *,
+        interval_seconds: float,
+    ) -> None:
+        self.state = state
+        self.on_change = on_change
+        self.interval_seconds = interval_seconds
+        self._known: dict[str, int] | None = None
+        self._task: asyncio.Task[None] | None = None
+
+    async def poll(self) -> set[str]:
+        current = await self.state.versions_async()
+        if self._known is None:
+            changed: set[str] = set()
+        else:
+            changed = {key for key, version in current.items() if self._known.get(key) != version}
+        self._known = current
+        if changed:
+            self.on_change(changed)
+        return changed
+
+    async def start(self) -> None:
+        if self._task is None:
+            await self.poll()
+            self._task = asyncio.create_task(self._run(), name="shared-state-watcher")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                await self.poll()
+            except sqlite3.Error:
+                logger.exception("Failed to poll shared state")
+
+
+settings = get_settings()
+shared_state: SharedState | None = (
+    SharedState(settings.shared_state_path) if settings.shared_state_enabled else None
+)
+
+
+def get_shared_state() -> SharedState | None:
+    return shared_state
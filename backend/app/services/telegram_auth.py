@@ -4,13 +4,17 @@ import hashlib
 import hmac
 import json
 import secrets
+import time
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import Any, Dict
+from functools import lru_cache
+from typing import Any, Dict, Mapping
 from urllib.parse import parse_qsl
 
-from fastapi import HTTPException, status
+from fastapi import Depends, Header, HTTPException, Query, Request, status
 
 from ..core.config import get_settings
+from ..core.metrics import AUTH_CACHE_HITS, AUTH_LATENCY
 from ..schemas import TelegramUserPayload
 
 
@@ -18,6 +22,7 @@ from ..schemas import TelegramUserPayload
 class TelegramAuthResult:
     payload: TelegramUserPayload
     raw: Dict[str, Any]
+    auth_date: int | None = None
 
 
 class TelegramAuthError(HTTPException):
@@ -25,44 +30,191 @@ class TelegramAuthError(HTTPException):
         super().__init__(status_code=status.HTTP_401_UNAUTHORIZED, detail=detail)
 
 
-def _compute_hash(data_check_string: str, bot_token: str) -> str:
-    secret_key = hmac.new(b"WebAppData", bot_token.encode(), hashlib.sha256).digest()
+def derive_secret_key(bot_token: str) -> bytes:
+    return hmac.new(b"WebAppData", bot_token.encode(), hashlib.sha256).digest()
+
+
+def init_data_hash(secret_key: bytes, fields: Mapping[str, str]) -> str:
+    """Signature of ``initData`` fields (without ``hash``) as Telegram computes it."""
+
+    data_check_string = "\n".join(f"{k}={fields[k]}" for k in sorted(fields))
     return hmac.new(secret_key, data_check_string.encode(), hashlib.sha256).hexdigest()
 
 
-def validate_init_data(init_data: str | None) -> TelegramAuthResult:
-    """Validate Telegram initData payload that comes from the WebApp."""
+class InitDataVerifier:
+    """Verify WebApp ``initData`` for one bot token.
+
+    The HMAC secret is derived once. Successfully verified payloads are kept
+    in a bounded LRU keyed by the full ``initData`` string, so repeated calls
+    from the same Mini App session skip parsing and hashing; the ``auth_date``
+    freshness window is still enforced on every call.
+    """
+
+    def __init__(
+        self,
+        bot_token: str,
+        *,
+        max_age_seconds: int,
+        cache_size: int,
+        cache_ttl_seconds: float,
+    ) -> None:
+        self._secret_key = derive_secret_key(bot_token)
+        self.max_age_seconds = max_age_seconds
+        self.cache_size = cache_size
+        self.cache_ttl_seconds = cache_ttl_seconds
+        self._cache: OrderedDict[str, tuple[float, TelegramAuthResult]] = OrderedDict()
+
+    def _check_freshness(self, auth_date: int | None, now: float) -> None:
+        if self.max_age_seconds <= 0:
+            return
+        if auth_date is None:
+            raise TelegramAuthError("Missing auth date")
+        if now - auth_date > self.max_age_seconds:
+            raise TelegramAuthError("Telegram init data is expired")
+
+    def _cached(self, init_data: str, now: float) -> TelegramAuthResult | None:
+        cached = self._cache.get(init_data)
+        if cached is None:
+            return None
+        expires_at, result = cached
+        if now >= expires_at:
+            del self._cache[init_data]
+            return None
+        self._cache.move_to_end(init_data)
+        AUTH_CACHE_HITS.inc()
+        return result
+
+    def _remember(self, init_data: str, result: TelegramAuthResult, now: float) -> None:
+        if self.cache_size <= 0:
+            return
+        self._cache[init_data] = (now + self.cache_ttl_seconds, result)
+        self._cache.move_to_end(init_data)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def verify(self, init_data: str | None) -> TelegramAuthResult:
+        if not init_data:
+            raise TelegramAuthError("Missing Telegram init data")
+
+        now = time.time()
+        cached = self._cached(init_data, now)
+        if cached is not None:
+            self._check_freshness(cached.auth_date, now)
+            return cached
+
+        data_pairs = dict(parse_qsl(init_data, keep_blank_values=True))
+        received_hash = data_pairs.pop("hash", None)
+        if not received_hash:
+            raise TelegramAuthError("Missing signature")
+
+        expected_hash = init_data_hash(self._secret_key, data_pairs)
+        if not secrets.compare_digest(expected_hash, received_hash):
+            raise TelegramAuthError("Invalid Telegram signature")
+
+        auth_date_raw = data_pairs.get("auth_date")
+        auth_date = int(auth_date_raw) if auth_date_raw and auth_date_raw.isdigit() else None
+        self._check_freshness(auth_date, now)
+
+        user_raw = data_pairs.get("user")
+        if not user_raw:
+            raise TelegramAuthError("Missing user payload")
+
+        user_payload = json.loads(user_raw)
+        payload = TelegramUserPayload(
+            id=user_payload["id"],
+            first_name=user_payload.get("first_name"),
+            last_name=user_payload.get("last_name"),
+            username=user_payload.get("username"),
+        )
+
+        result = TelegramAuthResult(payload=payload, raw=user_payload, auth_date=auth_date)
+        self._remember(init_data, result, now)
+        return result
+
+
+@lru_cache(maxsize=4)
+def _verifier_for(bot_token: str) -> InitDataVerifier:
+    settings = get_settings()
+    return InitDataVerifier(
+        bot_token,
+        max_age_seconds=settings.telegram_auth_max_age_seconds,
+        cache_size=settings.telegram_auth_cache_size,
+        cache_ttl_seconds=settings.telegram_auth_cache_ttl_seconds,
+    )
 
-    if not init_data:
-        raise TelegramAuthError("Missing Telegram init data")
 
+def get_init_data_verifier() -> InitDataVerifier:
     settings = get_settings()
     if not settings.telegram_bot_token:
         raise TelegramAuthError("Bot token is not configured")
+    return _verifier_for(settings.telegram_bot_token)
 
-    data_pairs = dict(parse_qsl(init_data, keep_blank_values=True))
-    received_hash = data_pairs.pop("hash", None)
-    if not received_hash:
-        raise TelegramAuthError("Missing signature")
 
-    data_check_string = "\n".join(
-        f"{k}={data_pairs[k]}" for k in sorted(data_pairs.keys()) if k != "hash"
-    )
-
-    expected_hash = _compute_hash(data_check_string, settings.telegram_bot_token)
-    if not secrets.compare_digest(expected_hash, received_hash):
-        raise TelegramAuthError("Invalid Telegram signature")
-
-    user_raw = data_pairs.get("user")
-    if not user_raw:
-        raise TelegramAuthError("Missing user payload")
+def validate_init_data(init_data: str | None) -> TelegramAuthResult:
+    """Validate Telegram initData payload that comes from the WebApp."""
 
-    user_payload = json.loads(user_raw)
-    payload = TelegramUserPayload(
-        id=user_payload["id"],
-        first_name=user_payload.get("first_name"),
-        last_name=user_payload.get("last_name"),
-        username=user_payload.get("username"),
+    started = time.perf_counter()
+    try:
+        if not init_data:
+            raise TelegramAuthError("Missing Telegram init data")
+        result = get_init_data_verifier().verify(init_data)
+    except TelegramAuthError:
+        AUTH_LATENCY.observe(time.perf_counter() - started, "rejected")
+        raise
+    AUTH_LATENCY.observe(time.perf_counter() - started, "ok")
+    return result
+
+
+async def require_telegram_auth(
+    request: Request,
+    x_telegram_init_data: str | None = Header(default=None),
+    authorization: str | None = Header(default=None),
+) -> TelegramAuthResult:
+    """FastAPI dependency returning the verified Mini App user.
+
+    ``initData`` is taken from ``X-Telegram-Init-Data``, an
+    ``Authorization: tma <initData>`` header, or the ``init_data`` field of a
+    JSON body, in that order.
+    """
+
+    init_data = x_telegram_init_data
+    if not init_data and authorization and authorization.lower().startswith("tma "):
+        init_data = authorization[4:].strip()
+    if not init_data and request.headers.get("content-type", "").startswith(
+        "application/json"
+    ):
+        try:
+            body = await request.json()
+        except ValueError:
+            body = None
+        if isinstance(body, dict) and isinstance(body.get("init_data"), str):
+            init_data = body["init_data"]
+    return validate_init_data(init_data)
+
+
+async def require_master(
+    auth_result: TelegramAuthResult = Depends(require_telegram_auth),
+) -> TelegramAuthResult:
+    """Like ``require_telegram_auth``, but only for the master's accounts."""
+
+    if auth_result.payload.id not in get_settings().master_ids:
+        raise HTTPException(status.HTTP_403_FORBIDDEN, "Only the master can do this")
+    return auth_result
+
+
+async def require_master_stream(
+    request: Request,
+    init_data: str | None = Query(default=None),
+    x_telegram_init_data: str | None = Header(default=None),
+    authorization: str | None = Header(default=None),
+) -> TelegramAuthResult:
+    """``require_master`` that also accepts ``initData`` in the ``init_data`` query parameter.
+
+    Only for event streams: a browser ``EventSource`` cannot send headers.
+    The headers still win when present.
+    """
+
+    auth_result = await require_telegram_auth(
+        request, x_telegram_init_data or (None if authorization else init_data), authorization
     )
-
-    return TelegramAuthResult(payload=payload, raw=user_payload)
+    return await require_master(auth_result)
@@ -1,21 +1,94 @@
 from __future__ import annotations
 
 import logging
+import time
+from datetime import date, datetime
 from typing import Any, Dict
 
 from aiogram import Bot, Dispatcher, F
-from aiogram.filters import CommandStart
+from aiogram.filters import Command, CommandObject, CommandStart
 from aiogram.types import KeyboardButton, Message, ReplyKeyboardMarkup, Update
 from aiogram.types.web_app_info import WebAppInfo
-from fastapi import APIRouter, HTTPException, Request, status
-
-from ..core.config import get_settings
+from pydantic import ValidationError
+
+from .. import crud_async
+from ..core.config import Settings
+from ..core.metrics import TELEGRAM_UPDATES
+from ..database import AsyncSessionLocal
+from ..services.analytics import daily_digest
+from ..services.request_workflow import (
+    STATUS_LABELS,
+    InvalidTransition,
+    RequestNotFound,
+    apply_action,
+    format_queue,
+)
+from ..services.shared_state import shared_state
+from ..write_queue import write_queue
+from .pipeline import OfferResult, SharedUpdateDedup, UpdatePipeline
 
 logger = logging.getLogger(__name__)
 
+QUEUE_PAGE_SIZE = 20
+
+
+def _register_master_commands(dispatcher: Dispatcher, master_ids: set[int]) -> None:
+    """``/queue``, ``/digest [YYYY-MM-DD]``, ``/claim <id> [note]`` and ``/close <id> [note]``."""
+
+    from_master = F.from_user.id.in_(master_ids)
+
+    @dispatcher.message(Command("queue"), from_master)
+    async def handle_queue(message: Message):
+        async with AsyncSessionLocal() as db:
+            requests = await crud_async.list_request_queue(db, limit=QUEUE_PAGE_SIZE)
+            counts = await crud_async.status_counts(db)
+        await message.answer(format_queue(requests, counts))
+
+    @dispatcher.message(Command("digest"), from_master)
+    async def handle_digest(message: Message, command: CommandObject):
+        raw_day = (command.args or "").strip()
+        try:
+            day = date.fromisoformat(raw_day) if raw_day else datetime.utcnow().date()
+        except ValueError:
+            await message.answer("Укажите дату в формате ГГГГ-ММ-ДД: /digest 2024-05-01")
+            return
+        async with AsyncSessionLocal() as db:
+            await message.answer(await daily_digest(db, day))
+
+    @dispatcher.message(Command("claim", "close"), from_master)
+    async def handle_transition(message: Message, command: CommandObject):
+        request_id, _, note = (command.args or "").strip().partition(" ")
+        if not request_id.isdigit():
+            await message.answer(f"Укажите номер заявки: /{command.command} 42 [комментарий]")
+            return
+
+        async def persist(db):
+            request = await apply_action(
+                db,
+                int(request_id),
+                command.command,
+                actor_id=message.from_user.id if message.from_user else None,
+                note=note.strip() or None,
+            )
+            return request.id, request.status
+
+        try:
+            changed_id, new_status = await write_queue.submit(persist)
+        except RequestNotFound:
+            await message.answer(f"Заявка #{request_id} не найдена")
+            return
+        except InvalidTransition as exc:
+            await message.answer(
+                f"Заявка #{request_id} сейчас {STATUS_LABELS[exc.current]}, действие недоступно"
+            )
+            return
+        await message.answer(f"Заявка #{changed_id}: {STATUS_LABELS[new_status]}")
 
-def _build_dispatcher(web_app_url: str | None) -> Dispatcher:
+
+def _build_dispatcher(web_app_url: str | None, master_ids: set[int]) -> Dispatcher:
     dispatcher = Dispatcher()
+    if master_ids:
+        _register_master_commands(dispatcher, master_ids)
 
     def _build_keyboard() -> ReplyKeyboardMarkup | None:
         if not web_app_url:
@@ -55,61 +128,88 @@ def _build_dispatcher(web_app_url: str | None) -> Dispatcher:
     return dispatcher
 
 
-class TelegramWebhookRouter:
-    def __init__(self) -> None:
-        self.settings = get_settings()
-        self.router = APIRouter(prefix="/telegram", tags=["telegram"])
-        web_app_url = (
-            str(self.settings.telegram_web_app_url).rstrip("/")
-            if self.settings.telegram_web_app_url
-            else None
+def _resolve_web_app_url(settings: Settings) -> str | None:
+    web_app_url = (
+        str(settings.telegram_web_app_url).rstrip("/")
+        if settings.telegram_web_app_url
+        else None
+    )
+    if web_app_url and not web_app_url.startswith("https://"):
+        logger.warning("Web App URL must be HTTPS. Ignoring value: %s", web_app_url)
+        web_app_url = None
+    return web_app_url
+
+
+def build_dispatcher(settings: Settings) -> Dispatcher:
+    """Dispatcher with all bot handlers, shared by the webhook and polling runners."""
+
+    return _build_dispatcher(_resolve_web_app_url(settings), settings.master_ids)
+
+
+def build_bot(settings: Settings) -> Bot:
+    """Bot client, optionally pointed at a custom (e.g. local fake) Bot API server."""
+
+    if not settings.telegram_bot_token:
+        raise RuntimeError("Telegram bot token is not configured")
+    if not settings.telegram_api_base_url:
+        return Bot(token=settings.telegram_bot_token)
+
+    from aiogram.client.session.aiohttp import AiohttpSession
+    from aiogram.client.telegram import TelegramAPIServer
+
+    server = TelegramAPIServer.from_base(str(settings.telegram_api_base_url).rstrip("/"))
+    return Bot(token=settings.telegram_bot_token, session=AiohttpSession(api=server))
+
+
+class TelegramRuntime:
+    """Dispatcher, Bot client and update pipeline behind the webhook.
+
+    Built by ``TelegramWebhookRouter`` on the first webhook hit, so processes
+    that never receive updates do not pay for importing aiogram.
+    """
+
+    def __init__(self, settings: Settings, bot: Bot | None = None) -> None:
+        self.settings = settings
+        self.dispatcher = build_dispatcher(settings)
+        self.bot = bot or build_bot(settings)
+        self.pipeline = UpdatePipeline(
+            self._process_update,
+            workers=settings.telegram_update_workers,
+            queue_size=settings.telegram_update_queue_size,
+            dedup_window=settings.telegram_update_dedup_window,
+            shared_dedup=(
+                SharedUpdateDedup(shared_state)
+                if settings.telegram_update_shared_dedup and shared_state is not None
+                else None
+            ),
         )
-        if web_app_url and not web_app_url.startswith("https://"):
-            logger.warning("Web App URL must be HTTPS. Ignoring value: %s", web_app_url)
-            web_app_url = None
-        self.dispatcher = _build_dispatcher(web_app_url)
-        self.bot: Bot | None = None
-        self._register_routes()
-
-    def _require_bot(self) -> Bot:
-        if self.bot:
-            return self.bot
-
-        if not self.settings.telegram_bot_token:
-            raise HTTPException(
-                status.HTTP_503_SERVICE_UNAVAILABLE, "Telegram bot is not configured"
-            )
 
-        self.bot = Bot(token=self.settings.telegram_bot_token)
-        return self.bot
+    async def start(self) -> None:
+        if self.settings.telegram_webhook_processing == "queued":
+            await self.pipeline.start()
+
+    async def stop(self) -> None:
+        await self.pipeline.stop()
+
+    async def _process_update(self, update: Update) -> None:
+        await self.dispatcher.feed_update(self.bot, update)
+        logger.debug("Processed Telegram update", extra={"update_id": update.update_id})
 
-    def _register_routes(self) -> None:
-        @self.router.post("/webhook")
-        async def handle_webhook(request: Request) -> Dict[str, Any]:
-            bot = self._require_bot()
-            raw = await request.json()
+    async def handle(self, raw: Dict[str, Any]) -> OfferResult:
+        try:
             update = Update.model_validate(raw)
-            await self.dispatcher.feed_update(bot, update)
-            logger.debug("Processed Telegram update")
-            return {"ok": True}
-
-        @self.router.post("/set-webhook")
-        async def set_webhook_endpoint() -> Dict[str, Any]:
-            bot = self._require_bot()
-            if not self.settings.webhook_base_url:
-                raise HTTPException(status.HTTP_400_BAD_REQUEST, "Base URL is not set")
-
-            base = str(self.settings.webhook_base_url).rstrip().rstrip("/")    
-            webhook_url = f"{base}/telegram/webhook"
-            await bot.set_webhook(webhook_url)
-            return {"ok": True, "url": webhook_url}
-
-        @self.router.post("/delete-webhook")
-        async def delete_webhook_endpoint() -> Dict[str, Any]:
-            bot = self._require_bot()
-            await bot.delete_webhook(drop_pending_updates=True)
-            return {"ok": True}
-
-
-telegram_webhook_router = TelegramWebhookRouter()
-router = telegram_webhook_router.router
+        except ValidationError as exc:
+            logger.warning("Dropping malformed Telegram update: %s", exc.errors()[:3])
+            return OfferResult.INVALID
+        if self.pipeline.running:
+            # Acknowledge right away; a slow handler must not make Telegram retry.
+            return await self.pipeline.offer(update)
+
+        started = time.perf_counter()
+        try:
+            await self._process_update(update)
+        except Exception:
+            TELEGRAM_UPDATES.observe(time.perf_counter() - started, "error")
+            raise
+        TELEGRAM_UPDATES.observe(time.perf_counter() - started, "ok")
+        return OfferResult.ACCEPTED
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from typing import Any, Dict
+
+from fastapi import FastAPI, Request
+
+
+class FakeBotAPI:
+    """In-memory subset of the Telegram Bot API for offline runs.
+
+    Supports the methods the bot uses (``getMe``, ``getUpdates``,
+    ``sendMessage``, webhook management). Tests push updates through
+    ``POST /_fake/updates`` and inspect replies on ``GET /_fake/sent``.
+    """
+
+    def __init__(self) -> None:
+        self.updates: list[Dict[str, Any]] = []
+        self.sent: list[Dict[str, Any]] = []
+        self.next_update_id = 1
+        self.next_message_id = 1
+        self._new_updates = asyncio.Condition()
+
+    async def push_update(self, update: Dict[str, Any]) -> Dict[str, Any]:
+        update.setdefault("update_id", self.next_update_id)
+        self.next_update_id = max(self.next_update_id, update["update_id"]) + 1
+        async with self._new_updates:
+            self.updates.append(update)
+            self._new_updates.notify_all()
+        return update
+
+    async def get_updates(self, params: Dict[str, Any]) -> list[Dict[str, Any]]:
+        offset = int(params.get("offset") or 0)
+        limit = int(params.get("limit") or 100)
+        timeout = float(params.get("timeout") or 0)
+
+        # Confirming an offset forgets everything before it, like Telegram does.
+        self.updates = [u for u in self.updates if u["update_id"] >= offset]
+        if not self.updates and timeout > 0:
+            async with self._new_updates:
+                try:
+                    await asyncio.wait_for(self._new_updates.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+        return self.updates[:limit]
+
+    def send_message(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        chat_id = int(params["chat_id"])
+        message = {
+            "message_id": self.next_message_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "text": params.get("text", ""),
+        }
+        self.next_message_id += 1
+        self.sent.append(message)
+        return message
+
+    async def call(self, method: str, params: Dict[str, Any]) -> Any:
+        if method == "getMe":
+            return {"id": 1, "is_bot": True, "first_name": "FakeBot", "username": "fake_bot"}
+        if method == "getUpdates":
+            return await self.get_updates(params)
+        if method == "sendMessage":
+            return self.send_message(params)
+        if method in {"setWebhook", "deleteWebhook"}:
+            return True
+        raise LookupError(method)
+
+
+def _decode(value: Any) -> Any:
+    if isinstance(value, str) and value[:1] in "[{":
+        try:
+            return json.loads(value)
+        except ValueError:
+            return value
+    return value
+
+
+def create_fake_api_app(api: FakeBotAPI | None = None) -> FastAPI:
+    api = api or FakeBotAPI()
+    app = FastAPI(title="Fake Telegram Bot API")
+    app.state.fake_api = api
+
+    @app.post("/bot{token}/{method}")
+    async def bot_method(token: str, method: str, request: Request) -> Dict[str, Any]:
+        if request.headers.get("content-type", "").startswith("application/json"):
+            params = await request.json()
+        else:
+            params = {key: _decode(value) for key, value in (await request.form()).items()}
+        try:
+            return {"ok": True, "result": await api.call(method, params)}
+        except LookupError:
+            return {"ok": False, "error_code": 404, "description": f"Not Found: {method}"}
+
+    @app.post("/_fake/updates")
+    async def push_update(request: Request) -> Dict[str, Any]:
+        return await api.push_update(await request.json())
+
+    @app.get("/_fake/sent")
+    async def sent_messages() -> list[Dict[str, Any]]:
+        return api.sent
+
+    return app
@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from enum import Enum
+from typing import TYPE_CHECKING, Awaitable, Callable
+
+from ..core.logging import correlation_id
+from ..core.metrics import TELEGRAM_UPDATES
+
+if TYPE_CHECKING:
+    from aiogram.types import Update
+
+    from ..services.shared_state import SharedState
+
+logger = logging.getLogger(__name__)
+
+UpdateHandler = Callable[["Update"], Awaitable[None]]
+
+
+class OfferResult(str, Enum):
+    ACCEPTED = "accepted"
+    DUPLICATE = "duplicate"
+    REJECTED = "rejected"
+    INVALID = "invalid"
+
+
+@dataclass(slots=True)
+class PipelineStats:
+    accepted: int = 0
+    duplicates: int = 0
+    rejected: int = 0
+    processed: int = 0
+    failed: int = 0
+    queued: int = 0
+    max_queued: int = 0
+
+
+class SlidingWindowDedup:
+    """Remember the last ``size`` update ids in O(1) per lookup."""
+
+    def __init__(self, size: int) -> None:
+        self.size = max(1, size)
+        self._order: deque[int] = deque()
+        self._seen: set[int] = set()
+
+    def __contains__(self, update_id: int) -> bool:
+        return update_id in self._seen
+
+    def add(self, update_id: int) -> None:
+        self._order.append(update_id)
+        self._seen.add(update_id)
+        while len(self._order) > self.size:
+            self._seen.discard(self._order.popleft())
+
+
+class SharedUpdateDedup:
+    """Claim update ids across worker processes through shared state."""
+
+    namespace = "telegram-update"
+
+    def __init__(self, state: SharedState, ttl_seconds: float = 3600.0) -> None:
+        self.state = state
+        self.ttl_seconds = ttl_seconds
+
+    async def claim(self, update_id: int) -> bool:
+        return await self.state.add_if_absent_async(
+            self.namespace, str(update_id), self.ttl_seconds
+        )
+
+    async def release(self, update_id: int) -> None:
+        await self.state.discard_async(self.namespace, str(update_id))
+
+
+def chat_key(update: Update) -> int:
+    """Key that serialises updates of one conversation onto one worker."""
+
+    event = update.event
+    chat = getattr(event, "chat", None) or getattr(getattr(event, "message", None), "chat", None)
+    if chat is not None:
+        return chat.id
+    user = getattr(event, "from_user", None)
+    if user is not None:
+        return user.id
+    return update.update_id
+
+
+class UpdatePipeline:
+    """Bounded worker pool for Telegram updates.
+
+    Each worker owns one queue shard and updates are routed by chat, so a
+    chat's updates are handled in arrival order while different chats run
+    concurrently. Duplicate ``update_id`` values inside the dedup window are
+    dropped, and a full shard rejects the update so the caller can push back.
+    """
+
+    def __init__(
+        self,
+        handler: UpdateHandler,
+        *,
+        workers: int,
+        queue_size: int,
+        dedup_window: int,
+        shared_dedup: SharedUpdateDedup | None = None,
+    ) -> None:
+        self.handler = handler
+        self.shared_dedup = shared_dedup
+        self.workers = max(1, workers)
+        self.shard_size = max(1, queue_size // self.workers)
+        self.dedup = SlidingWindowDedup(dedup_window)
+        self.stats = PipelineStats()
+        self._shards: list[asyncio.Queue[Update]] = []
+        self._tasks: list[asyncio.Task[None]] = []
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._shards = [asyncio.Queue(maxsize=self.shard_size) for _ in range(self.workers)]
+        self._tasks = [
+            asyncio.create_task(self._work(shard), name=f"telegram-update-worker-{index}")
+            for index, shard in enumerate(self._shards)
+        ]
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        if not self.running:
+            return
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(shard.join() for shard in self._shards)), timeout
+            )
+        except asyncio.TimeoutError:
+            logger.warning(
+                "Dropping unprocessed Telegram updates on shutdown",
+                extra={"pending": self.stats.queued},
+            )
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._shards = []
+
+    async def _is_duplicate(self, update: Update) -> bool:
+        duplicate = update.update_id in self.dedup or (
+            self.shared_dedup is not None and not await self.shared_dedup.claim(update.update_id)
+        )
+        if duplicate:
+            self.stats.duplicates += 1
+        return duplicate
+
+    async def offer(self, update: Update) -> OfferResult:
+        if await self._is_duplicate(update):
+            return OfferResult.DUPLICATE
+
+        shard = self._shards[chat_key(update) % self.workers]
+        try:
+            shard.put_nowait(update)
+        except asyncio.QueueFull:
+            # Telegram will redeliver; let whichever worker gets it claim it again.
+            if self.shared_dedup is not None:
+                await self.shared_dedup.release(update.update_id)
+            self.stats.rejected += 1
+            logger.warning(
+                "Telegram update queue is full; rejecting update",
+                extra={"update_id": update.update_id},
+            )
+            return OfferResult.REJECTED
+
+        return self._accepted(update)
+
+    async def put(self, update: Update) -> OfferResult:
+        """Like ``offer`` but waits for queue space instead of rejecting."""
+
+        if await self._is_duplicate(update):
+            return OfferResult.DUPLICATE
+
+        await self._shards[chat_key(update) % self.workers].put(update)
+        return self._accepted(update)
+
+    def _accepted(self, update: Update) -> OfferResult:
+        # Only accepted updates are remembered, so a rejected one may be retried.
+        self.dedup.add(update.update_id)
+        self.stats.accepted += 1
+        self.stats.queued += 1
+        self.stats.max_queued = max(self.stats.max_queued, self.stats.queued)
+        return OfferResult.ACCEPTED
+
+    def snapshot(self) -> dict[str, int]:
+        data = asdict(self.stats)
+        data["capacity"] = self.shard_size * self.workers
+        data["workers"] = self.workers
+        return data
+
+    async def _work(self, shard: asyncio.Queue[Update]) -> None:
+        while True:
+            update = await shard.get()
+            token = correlation_id.set(f"tg-{update.update_id}")
+            started = time.perf_counter()
+            try:
+                await self.handler(update)
+                self.stats.processed += 1
+                TELEGRAM_UPDATES.observe(time.perf_counter() - started, "ok")
+            except Exception:
+                self.stats.failed += 1
+                TELEGRAM_UPDATES.observe(time.perf_counter() - started, "error")
+                logger.exception(
+                    "Failed to process Telegram update", extra={"update_id": update.update_id}
+                )
+            finally:
+                correlation_id.reset(token)
+                self.stats.queued -= 1
+                shard.task_done()
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from pathlib import Path
+
+from aiogram import Bot, Dispatcher
+from aiogram.exceptions import TelegramNetworkError, TelegramRetryAfter, TelegramServerError
+
+from ..core.config import Settings
+from .bot import build_bot, build_dispatcher
+from .pipeline import UpdatePipeline
+
+logger = logging.getLogger(__name__)
+
+
+class OffsetStore:
+    """Persist the next ``getUpdates`` offset in a small text file."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+
+    def load(self) -> int | None:
+        try:
+            return int(self.path.read_text().strip())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def save(self, offset: int) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(str(offset))
+        os.replace(tmp_path, self.path)
+
+
+class LongPollingRunner:
+    """``getUpdates`` loop that feeds the shared dispatcher through a worker pool.
+
+    The offset is advanced and persisted as soon as updates are queued, so a
+    restart does not replay them; a graceful stop drains the queue first.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        dispatcher: Dispatcher,
+        *,
+        timeout: int,
+        limit: int,
+        offset_store: OffsetStore,
+        workers: int,
+        queue_size: int,
+        dedup_window: int,
+    ) -> None:
+        self.bot = bot
+        self.dispatcher = dispatcher
+        self.timeout = timeout
+        self.limit = max(1, min(limit, 100))
+        self.offset_store = offset_store
+        self.pipeline = UpdatePipeline(
+            self._process_update,
+            workers=workers,
+            queue_size=queue_size,
+            dedup_window=dedup_window,
+        )
+        self._stopping = asyncio.Event()
+
+    async def _process_update(self, update) -> None:
+        await self.dispatcher.feed_update(self.bot, update)
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+    async def run(self) -> None:
+        # getUpdates is refused while a webhook is registered.
+        await self.bot.delete_webhook(drop_pending_updates=False)
+        await self.pipeline.start()
+        offset = self.offset_store.load()
+        failures = 0
+        logger.info("Long polling started", extra={"offset": offset})
+        try:
+            while not self._stopping.is_set():
+                try:
+                    updates = await self.bot.get_updates(
+                        offset=offset,
+                        limit=self.limit,
+                        timeout=self.timeout,
+                        request_timeout=self.timeout + 10,
+                    )
+                    failures = 0
+                except TelegramRetryAfter as exc:
+                    await asyncio.sleep(exc.retry_after)
+                    continue
+                except (TelegramNetworkError, TelegramServerError):
+                    failures += 1
+                    delay = min(30.0, 0.5 * 2**failures)
+                    logger.warning("getUpdates failed, retrying", extra={"delay": delay})
+                    await asyncio.sleep(delay)
+                    continue
+
+                for update in updates:
+                    await self.pipeline.put(update)
+                if updates:
+                    offset = updates[-1].update_id + 1
+                    self.offset_store.save(offset)
+        finally:
+            await self.pipeline.stop()
+            await self.bot.session.close()
+            logger.info("Long polling stopped", extra={"offset": offset})
+
+
+def build_polling_runner(settings: Settings) -> LongPollingRunner:
+    return LongPollingRunner(
+        build_bot(settings),
+        build_dispatcher(settings),
+        timeout=settings.telegram_polling_timeout,
+        limit=settings.telegram_polling_limit,
+        offset_store=OffsetStore(settings.telegram_polling_offset_file),
+        workers=settings.telegram_update_workers,
+        queue_size=settings.telegram_update_queue_size,
+        dedup_window=settings.telegram_update_dedup_window,
+    )
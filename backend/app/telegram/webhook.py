@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import asyncio
+import importlib
+import logging
+import secrets
+from typing import TYPE_CHECKING, Any, Dict
+
+from fastapi import APIRouter, HTTPException, Request, status
+
+from ..core.config import get_settings
+from .pipeline import OfferResult
+
+if TYPE_CHECKING:
+    from aiogram import Bot
+
+    from .bot import TelegramRuntime
+
+logger = logging.getLogger(__name__)
+
+
+class TelegramWebhookRouter:
+    """HTTP surface of the bot; the aiogram runtime is loaded on first use.
+
+    Importing aiogram dominates the service's cold start, so this module only
+    depends on FastAPI. The first request that needs the bot imports
+    ``telegram.bot`` in a worker thread (the event loop keeps serving other
+    requests) and builds a ``TelegramRuntime``.
+    """
+
+    def __init__(self) -> None:
+        self.settings = get_settings()
+        self.router = APIRouter(prefix="/telegram", tags=["telegram"])
+        # Optional pre-built client for the runtime, e.g. a stub in benchmarks.
+        self.bot: Bot | None = None
+        self._runtime: TelegramRuntime | None = None
+        self._runtime_lock = asyncio.Lock()
+        self.router.add_event_handler("shutdown", self.shutdown)
+        self._register_routes()
+
+    @property
+    def loaded(self) -> bool:
+        return self._runtime is not None
+
+    async def runtime(self) -> TelegramRuntime:
+        if self._runtime is not None:
+            return self._runtime
+        if not self.settings.telegram_bot_token and self.bot is None:
+            raise HTTPException(
+                status.HTTP_503_SERVICE_UNAVAILABLE, "Telegram bot is not configured"
+            )
+
+        async with self._runtime_lock:
+            if self._runtime is None:
+                bot_module = await asyncio.to_thread(
+                    importlib.import_module, f"{__package__}.bot"
+                )
+                runtime = bot_module.TelegramRuntime(self.settings, bot=self.bot)
+                await runtime.start()
+                self._runtime = runtime
+        return self._runtime
+
+    async def shutdown(self) -> None:
+        if self._runtime is not None:
+            await self._runtime.stop()
+
+    def _check_secret(self, request: Request) -> None:
+        expected = self.settings.telegram_webhook_secret
+        if not expected:
+            return
+        received = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+        if not secrets.compare_digest(received.encode(), expected.encode()):
+            raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Invalid webhook secret")
+
+    def _register_routes(self) -> None:
+        @self.router.post("/webhook")
+        async def handle_webhook(request: Request) -> Dict[str, Any]:
+            self._check_secret(request)
+            try:
+                raw = await request.json()
+            except ValueError:
+                # Answering with an error would make Telegram redeliver it forever.
+                logger.warning("Dropping Telegram update with a non-JSON body")
+                return {"ok": True}
+            runtime = await self.runtime()
+            result = await runtime.handle(raw)
+            if result is OfferResult.REJECTED:
+                raise HTTPException(
+                    status.HTTP_503_SERVICE_UNAVAILABLE, "Update queue is full"
+                )
+            return {"ok": True}
+
+        @self.router.get("/pipeline")
+        async def pipeline_stats() -> Dict[str, Any]:
+            if self._runtime is None:
+                return {"loaded": False, "running": False}
+            pipeline = self._runtime.pipeline
+            return {"loaded": True, "running": pipeline.running, **pipeline.snapshot()}
+
+        @self.router.post("/set-webhook")
+        async def set_webhook_endpoint() -> Dict[str, Any]:
+            bot = (await self.runtime()).bot
+            if not self.settings.webhook_base_url:
+                raise HTTPException(status.HTTP_400_BAD_REQUEST, "Base URL is not set")
+
+            base = str(self.settings.webhook_base_url).rstrip().rstrip("/")
+            webhook_url = f"{base}/telegram/webhook"
+            await bot.set_webhook(
+                webhook_url, secret_token=self.settings.telegram_webhook_secret
+            )
+            return {"ok": True, "url": webhook_url}
+
+        @self.router.post("/delete-webhook")
+        async def delete_webhook_endpoint() -> Dict[str, Any]:
+            bot = (await self.runtime()).bot
+            await bot.delete_webhook(drop_pending_updates=True)
+            return {"ok": True}
+
+
+telegram_webhook_router = TelegramWebhookRouter()
+router = telegram_webhook_router.router
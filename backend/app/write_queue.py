@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from .core.config import get_settings
+from .core.logging import correlation_id
+from .core.metrics import request_queries
+from .database import AsyncSessionLocal, database_url
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+WriteUnit = Callable[[AsyncSession], Awaitable[T]]
+# Unit, caller's future, the caller's correlation id for log context and the
+# caller's SQL statement counter for metrics.
+QueuedUnit = tuple[WriteUnit[Any], asyncio.Future[Any], str | None, list[int] | None]
+
+
+class WriteQueue:
+    """Single-writer queue that commits concurrent write units together.
+
+    SQLite allows one writer at a time, so instead of letting every request
+    race for the lock, units are funnelled through one task which runs each of
+    them in its own SAVEPOINT and commits the whole batch once. A failing unit
+    only rolls back its savepoint and receives its own exception.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        *,
+        max_batch: int,
+        enabled: bool,
+        stop_timeout: float = 5.0,
+    ) -> None:
+        self.session_factory = session_factory
+        self.max_batch = max(1, max_batch)
+        self.enabled = enabled
+        self.stop_timeout = stop_timeout
+        # ``None`` tells the writer task to finish what is queued and exit.
+        self._queue: asyncio.Queue[QueuedUnit | None] | None = None
+        self._task: asyncio.Task[None] | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        if not self.enabled or self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run(), name="sqlite-write-queue")
+
+    async def stop(self) -> None:
+        """Commit the units queued so far, then stop the writer task.
+
+        A batch still running after ``stop_timeout`` is cancelled.
+        """
+
+        if not self._task:
+            return
+        if self._queue is not None:
+            self._queue.put_nowait(None)
+        try:
+            await asyncio.wait_for(self._task, self.stop_timeout)
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            pass
+        while self._queue is not None and not self._queue.empty():
+            queued = self._queue.get_nowait()
+            if queued is not None:
+                queued[1].cancel()
+        self._task = None
+        self._queue = None
+
+    async def submit(self, unit: WriteUnit[T]) -> T:
+        """Run ``unit`` inside a committed transaction and return its result."""
+
+        if not self.running or self._queue is None:
+            async with self.session_factory() as db:
+                result = await unit(db)
+                await db.commit()
+                return result
+
+        future: asyncio.Future[T] = asyncio.get_running_loop().create_future()
+        await self._queue.put((unit, future, correlation_id.get(), request_queries.get()))
+        return await future
+
+    async def _run(self) -> None:
+        assert self._queue is not None
+        stopping = False
+        while not stopping:
+            queued = await self._queue.get()
+            if queued is None:
+                return
+            batch = [queued]
+            while len(batch) < self.max_batch and not self._queue.empty():
+                queued = self._queue.get_nowait()
+                if queued is None:
+                    stopping = True
+                    break
+                batch.append(queued)
+            try:
+                await self._commit_batch(batch)
+            except asyncio.CancelledError:
+                # Stopped mid-batch: callers must not wait for a result that never comes.
+                for _, future, _, _ in batch:
+                    future.cancel()
+                raise
+
+    async def _commit_batch(self, batch: list[QueuedUnit]) -> None:
+        outcomes: list[tuple[asyncio.Future[Any], Any, BaseException | None]] = []
+        async with self.session_factory() as db:
+            for unit, future, unit_correlation_id, unit_queries in batch:
+                if future.cancelled():
+                    continue
+                token = correlation_id.set(unit_correlation_id)
+                queries_token = request_queries.set(unit_queries)
+                try:
+                    async with db.begin_nested():
+                        outcomes.append((future, await unit(db), None))
+                except Exception as exc:  # noqa: BLE001 - delivered to the caller
+                    outcomes.append((future, None, exc))
+                finally:
+                    request_queries.reset(queries_token)
+                    correlation_id.reset(token)
+
+            try:
+                await db.commit()
+            except Exception as exc:  # noqa: BLE001 - the whole batch failed
+                logger.exception("Write batch commit failed", extra={"size": len(batch)})
+                outcomes = [(future, None, exc) for future, _, _ in outcomes]
+
+        for future, result, error in outcomes:
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+        logger.debug("Committed write batch", extra={"size": len(batch)})
+
+
+settings = get_settings()
+write_queue = WriteQueue(
+    AsyncSessionLocal,
+    max_batch=settings.sqlite_write_batch_size,
+    enabled=settings.sqlite_write_queue_enabled
+    and database_url.get_backend_name() == "sqlite",
+)
+
+
+def get_write_queue() -> WriteQueue:
+    return write_queue
@@ -0,0 +1,68 @@
+import os
+import tempfile
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+import httpx
+import pytest
+
+# Settings are read once at import time, so the test environment is set up
+# before anything from ``backend.app`` is imported.
+_data_dir = Path(tempfile.mkdtemp(prefix="master-service-tests-"))
+os.environ.update(
+    {
+        "DATABASE_URL": f"sqlite:///{_data_dir / 'test.db'}",
+        "SHARED_STATE_PATH": str(_data_dir / "shared_state.db"),
+        "SCHEMA_LOCK_PATH": str(_data_dir / "schema.lock"),
+        "MEDIA_DIR": str(_data_dir / "media"),
+        "FRONTEND_BUILD_DIR": str(_data_dir / "frontend"),
+        "TELEGRAM_BOT_TOKEN": "123456:TESTTOKEN",
+        "TELEGRAM_MASTER_CHAT_ID": "777",
+        "NOTIFICATION_SINK": "fake",
+        "LOG_LEVEL": "WARNING",
+    }
+)
+
+from backend.app.admin.bench import sign_init_data  # noqa: E402
+from backend.app.database import Base, engine, ensure_schema  # noqa: E402
+
+BOT_TOKEN = os.environ["TELEGRAM_BOT_TOKEN"]
+MASTER_ID = int(os.environ["TELEGRAM_MASTER_CHAT_ID"])
+
+
+@pytest.fixture(scope="session", autouse=True)
+def schema():
+    ensure_schema()
+
+
+@pytest.fixture
+def clean_db():
+    yield
+    with engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            conn.execute(table.delete())
+
+
+@pytest.fixture
+def init_data():
+    def sign(user_id: int) -> str:
+        return sign_init_data(user_id, BOT_TOKEN)
+
+    return sign
+
+
+@pytest.fixture
+def api():
+    """``async with api() as client`` runs the app's startup and shutdown around a client."""
+
+    from backend.app.main import app
+
+    @asynccontextmanager
+    async def client():
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+                yield http
+        app.dependency_overrides.clear()
+
+    return client
@@ -0,0 +1,71 @@
+import asyncio
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import select
+
+from backend.app import crud, models, schemas
+from backend.app.database import AsyncSessionLocal, SessionLocal, engine
+from backend.app.services import analytics
+from backend.app.services.request_workflow import transition
+
+Status = models.RequestStatusEnum
+
+pytestmark = pytest.mark.usefixtures("clean_db")
+
+
+def _rollups() -> set[tuple]:
+    with SessionLocal() as db:
+        rows = db.scalars(select(models.RequestDailyRollup))
+        return {(row.day, row.service_id, row.status, row.count) for row in rows if row.count}
+
+
+def test_rollups_match_a_fresh_backfill():
+    with SessionLocal() as db:
+        service = models.Service(name="Поклейка", description="", price="1", is_active=True)
+        user = models.User(telegram_id=6001, first_name="a")
+        db.add_all([service, user])
+        db.flush()
+        requests = [
+            crud.create_request(
+                db,
+                user=user,
+                request_in=schemas.RequestCreate(
+                    service_id=service.id if n % 2 else None, details=f"r{n}"
+                ),
+            )
+            for n in range(6)
+        ]
+        db.commit()
+        ids = [request.id for request in requests]
+
+    async def move(request_id: int, target: Status) -> None:
+        async with AsyncSessionLocal() as db:
+            await transition(db, request_id, target, actor_id=777)
+            await db.commit()
+
+    async def main():
+        await move(ids[0], Status.IN_PROGRESS)
+        await move(ids[0], Status.CLOSED)
+        await move(ids[1], Status.CLOSED)
+        await move(ids[2], Status.IN_PROGRESS)
+
+    asyncio.run(main())
+
+    with SessionLocal() as db:
+        backdated = db.get(models.Request, ids[3])
+        backdated.created_at -= timedelta(days=2)
+        db.get(models.Request, ids[4]).service_id = None
+        deleted = db.get(models.Request, ids[5])
+        for entry in deleted.history:
+            db.delete(entry)
+        db.delete(deleted)
+        db.commit()
+
+    live = _rollups()
+    result = analytics.backfill(engine, chunk_size=2)
+
+    assert live == _rollups()
+    assert result.rows == 5
+    assert sum(count for *_, count in live) == 5
+    assert len({day for day, *_ in live}) == 2
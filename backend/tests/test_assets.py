@@ -0,0 +1,51 @@
+import asyncio
+import re
+
+import httpx
+
+from backend.app import main as app_main
+from backend.app.services.assets import MANIFEST_NAME, build_assets
+
+
+def test_frontend_is_built_on_startup_not_on_import(tmp_path, monkeypatch):
+    build_dir = tmp_path / "frontend"
+    settings = app_main.settings.model_copy(update={"frontend_build_dir": build_dir})
+    monkeypatch.setattr(app_main, "settings", settings)
+    app = app_main.create_app()
+    built_on_import = build_dir.exists()
+
+    async def main():
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                index = await client.get("/")
+                script = re.search(r'src="(/web/app\.[0-9a-f]{12}\.js)"', index.text)
+                return index, await client.get(script.group(1))
+
+    index, script = asyncio.run(main())
+
+    assert not built_on_import
+    assert index.status_code == 200
+    assert index.headers["Cache-Control"] == "no-cache"
+    assert script.status_code == 200
+    assert "immutable" in script.headers["Cache-Control"]
+
+
+def test_rebuild_removes_stale_fingerprinted_files(tmp_path):
+    source = tmp_path / "src"
+    output = tmp_path / "out"
+    source.mkdir()
+    (source / "index.html").write_text('<script src="/web/app.js"></script>')
+    (source / "app.js").write_text("console.log('first build');" * 20)
+    first = build_assets(source, output, "/web")
+    first_names = {path.name for path in output.iterdir()}
+    (source / "app.js").write_text("console.log('second build');" * 20)
+    second = build_assets(source, output, "/web")
+
+    old_name, new_name = first.manifest["app.js"], second.manifest["app.js"]
+    names = {path.name for path in output.iterdir()}
+    stale = first_names - names
+
+    assert stale == {name for name in first_names if name.startswith(old_name)}
+    assert second.removed == len(stale) >= 2
+    assert {new_name, f"{new_name}.gz", "index.html", MANIFEST_NAME} <= names
@@ -0,0 +1,139 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from backend.app import crud, crud_async, models, schemas
+from backend.app.core.config import get_settings
+from backend.app.database import AsyncSessionLocal, SessionLocal
+from backend.app.services.notifications import RequestNotification
+from backend.app.services.outbox import OutboxWorker
+from backend.app.write_queue import WriteQueue
+
+pytestmark = pytest.mark.usefixtures("clean_db")
+
+
+def _add_entries(*details: str) -> list[int]:
+    with SessionLocal() as db:
+        user = models.User(telegram_id=5001, first_name="a")
+        entries = []
+        for text in details:
+            request = crud.create_request(
+                db, user=user, request_in=schemas.RequestCreate(service_id=None, details=text)
+            )
+            db.flush()
+            payload = RequestNotification.from_request(request).to_json()
+            entries.append(models.NotificationOutbox(request_id=request.id, payload=payload))
+        db.add_all(entries)
+        db.commit()
+        return [entry.id for entry in entries]
+
+
+def _entries() -> dict[int, models.NotificationOutbox]:
+    with SessionLocal() as db:
+        return {entry.id: entry for entry in db.scalars(select(models.NotificationOutbox))}
+
+
+async def _claim(token: str, now: datetime, lease_seconds: float = 60) -> list[int]:
+    async with AsyncSessionLocal() as db:
+        entries = await crud_async.claim_outbox_batch(
+            db,
+            token=token,
+            limit=10,
+            max_attempts=3,
+            now=now,
+            lease_until=now + timedelta(seconds=lease_seconds),
+        )
+        await db.commit()
+        return [entry.id for entry in entries]
+
+
+def test_claim_holds_a_lease_until_it_expires():
+    ids = _add_entries("a", "b")
+    now = datetime.utcnow()
+
+    async def main():
+        first = await _claim("first", now)
+        during_lease = await _claim("second", now + timedelta(seconds=30))
+        after_lease = await _claim("third", now + timedelta(seconds=61))
+        return first, during_lease, after_lease
+
+    first, during_lease, after_lease = asyncio.run(main())
+
+    assert first == ids
+    assert during_lease == []
+    assert after_lease == ids
+    assert {entry.claim_token for entry in _entries().values()} == {"third"}
+
+
+def test_sent_and_exhausted_entries_are_not_claimed():
+    sent, exhausted, pending = _add_entries("sent", "exhausted", "pending")
+    now = datetime.utcnow()
+
+    async def main():
+        async with AsyncSessionLocal() as db:
+            await crud_async.mark_outbox_sent(db, ids=[sent], now=now)
+            for _ in range(3):
+                await crud_async.mark_outbox_failed(
+                    db, entry_id=exhausted, error="boom", retry_at=now
+                )
+            await db.commit()
+        return await _claim("token", now)
+
+    assert asyncio.run(main()) == [pending]
+
+
+class _Notifier:
+    """Fails deliveries of requests whose details are in ``failing``."""
+
+    def __init__(self, failing: set[str]) -> None:
+        self.failing = failing
+        self.delivered: list[str] = []
+
+    async def submit(self, notification: RequestNotification) -> None:
+        if notification.details in self.failing:
+            raise RuntimeError("chat unavailable")
+        self.delivered.append(notification.details)
+
+
+def test_failed_delivery_is_retried_with_exponential_delay():
+    ok, failing = _add_entries("ok", "failing")
+    settings = get_settings().model_copy(
+        update={"outbox_poll_interval_seconds": 2.0, "outbox_max_attempts": 5}
+    )
+    notifier = _Notifier({"failing"})
+    worker = OutboxWorker(
+        settings, WriteQueue(AsyncSessionLocal, max_batch=1, enabled=False), notifier
+    )
+
+    def make_due(entry_id: int) -> None:
+        with SessionLocal() as db:
+            db.get(models.NotificationOutbox, entry_id).available_at = datetime(2000, 1, 1)
+            db.commit()
+
+    async def main():
+        delays = []
+        started = datetime.utcnow()
+        processed = [await worker.run_once()]
+        delays.append(_entries()[failing].available_at - started)
+        # Not due yet: nothing to do.
+        processed.append(await worker.run_once())
+        make_due(failing)
+        started = datetime.utcnow()
+        processed.append(await worker.run_once())
+        delays.append(_entries()[failing].available_at - started)
+        return processed, delays
+
+    processed, delays = asyncio.run(main())
+    entries = _entries()
+
+    assert processed == [2, 0, 1]
+    assert notifier.delivered == ["ok"]
+    assert entries[ok].sent_at is not None
+    assert entries[failing].sent_at is None
+    assert entries[failing].attempts == 2
+    assert entries[failing].last_error == "RuntimeError('chat unavailable')"
+    assert entries[failing].claim_token is None
+    assert timedelta(seconds=2) <= delays[0] < timedelta(seconds=3)
+    assert timedelta(seconds=4) <= delays[1] < timedelta(seconds=5)
@@ -0,0 +1,136 @@
+import asyncio
+from urllib.parse import quote
+
+import pytest
+
+from backend.app import crud, models, schemas
+from backend.app.database import SessionLocal
+from backend.app.services.request_events import (
+    RequestBroadcaster,
+    RequestEvent,
+    TooManySubscribers,
+    stream_events,
+)
+
+pytestmark = pytest.mark.usefixtures("clean_db")
+
+
+def _add_requests(count: int) -> list[int]:
+    """Create requests and return the ids of their ``created`` events."""
+
+    with SessionLocal() as db:
+        user = models.User(telegram_id=4001, first_name="a")
+        requests = [
+            crud.create_request(
+                db, user=user, request_in=schemas.RequestCreate(service_id=None, details=f"r{n}")
+            )
+            for n in range(count)
+        ]
+        db.commit()
+        return [request.history[0].id for request in requests]
+
+
+def _event_head(chunk: bytes) -> tuple[str, ...]:
+    return tuple(line.decode() for line in chunk.split(b"\n")[:2])
+
+
+async def _read(events, count: int) -> list[bytes]:
+    return [await asyncio.wait_for(anext(events), 1) for _ in range(count)]
+
+
+async def _open_stream(app, query: str = "", headers: dict[str, str] | None = None):
+    """Drive the ASGI app by hand: httpx's transport waits for the whole body."""
+
+    messages: asyncio.Queue[dict] = asyncio.Queue()
+    disconnected = asyncio.Event()
+
+    async def receive() -> dict:
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/api/requests/stream",
+        "raw_path": b"/api/requests/stream",
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()],
+        "client": ("test", 1),
+        "server": ("test", 80),
+    }
+    task = asyncio.create_task(app(scope, receive, messages.put))
+    start = await asyncio.wait_for(messages.get(), 1)
+    return start, messages, disconnected, task
+
+
+def test_stream_accepts_init_data_in_the_query(api, init_data):
+    from backend.app.main import app
+
+    (event_id,) = _add_requests(1)
+
+    async def main():
+        async with api() as client:
+            denied = await client.get(f"/api/requests/stream?init_data={quote(init_data(5))}")
+            missing = await client.get("/api/requests/stream")
+            start, messages, disconnected, task = await _open_stream(
+                app, f"init_data={quote(init_data(777))}", {"Last-Event-ID": str(event_id - 1)}
+            )
+            chunks = [(await asyncio.wait_for(messages.get(), 1))["body"] for _ in range(2)]
+            disconnected.set()
+            await asyncio.wait_for(task, 1)
+            return denied, missing, start, chunks
+
+    denied, missing, start, chunks = asyncio.run(main())
+
+    assert denied.status_code == 403
+    assert missing.status_code == 401
+    assert start["status"] == 200
+    assert chunks[0] == b"retry: 3000\n\n"
+    assert _event_head(chunks[1]) == (f"id: {event_id}", "event: created")
+
+
+def test_last_event_id_replays_missed_events():
+    ids = _add_requests(4)
+
+    async def main():
+        broadcaster = RequestBroadcaster(buffer_size=8, max_subscribers=5)
+        replay = stream_events(broadcaster, ids[1], keepalive_seconds=10, replay_limit=3)
+        replayed = await _read(replay, 3)
+        await replay.aclose()
+        too_far = stream_events(broadcaster, ids[0] - 1, keepalive_seconds=10, replay_limit=3)
+        reset = await _read(too_far, 2)
+        await too_far.aclose()
+        return replayed, reset
+
+    replayed, reset = asyncio.run(main())
+
+    assert [_event_head(chunk) for chunk in replayed[1:]] == [
+        (f"id: {ids[2]}", "event: created"),
+        (f"id: {ids[3]}", "event: created"),
+    ]
+    assert _event_head(reset[1]) == (f"id: {ids[3]}", "event: reset")
+
+
+def test_slow_subscriber_is_evicted():
+    async def main():
+        broadcaster = RequestBroadcaster(buffer_size=2, max_subscribers=2)
+        slow = broadcaster.subscribe()
+        fast = broadcaster.subscribe()
+        with pytest.raises(TooManySubscribers):
+            broadcaster.subscribe()
+        received = []
+        for event_id in range(1, 4):
+            broadcaster.publish([RequestEvent(event_id, "status")])
+            received.append(fast.queue.get_nowait().id)
+        return broadcaster, slow, fast, received
+
+    broadcaster, slow, fast, received = asyncio.run(main())
+
+    assert slow.evicted
+    assert not fast.evicted
+    assert received == [1, 2, 3]
+    assert len(broadcaster) == 1
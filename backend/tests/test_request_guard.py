@@ -0,0 +1,211 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from sqlalchemy import func, select
+
+from fastapi import HTTPException
+
+from backend.app import models, schemas
+from backend.app.database import SessionLocal
+from backend.app.services.request_guard import (
+    IDEMPOTENCY_HEADER,
+    REPLAYED_HEADER,
+    IdempotencyCache,
+    RateLimiter,
+    get_request_rate_limiter,
+    idempotency_cache,
+)
+from backend.app.services.shared_state import SharedState
+
+pytestmark = pytest.mark.usefixtures("clean_db")
+
+
+def _request_count() -> int:
+    with SessionLocal() as db:
+        return db.scalar(select(func.count(models.Request.id)))
+
+
+def _add_service() -> int:
+    with SessionLocal() as db:
+        service = models.Service(name="Поклейка", description="", price="1", is_active=True)
+        db.add(service)
+        db.commit()
+        return service.id
+
+
+def test_concurrent_retries_share_one_attempt(api, init_data):
+    async def main():
+        async with api() as client:
+            body = {"init_data": init_data(1001), "service_id": None, "details": "d"}
+            headers = {IDEMPOTENCY_HEADER: "key-1"}
+            return await asyncio.gather(
+                *(client.post("/api/requests/", json=body, headers=headers) for _ in range(3))
+            )
+
+    responses = asyncio.run(main())
+
+    assert [response.status_code for response in responses] == [201, 201, 201]
+    assert len({response.json()["id"] for response in responses}) == 1
+    assert sorted(REPLAYED_HEADER in response.headers for response in responses) == [
+        False,
+        True,
+        True,
+    ]
+    assert _request_count() == 1
+
+
+def test_key_reused_with_another_body_is_rejected(api, init_data):
+    async def main():
+        async with api() as client:
+            headers = {IDEMPOTENCY_HEADER: "key-2"}
+            first = await client.post(
+                "/api/requests/",
+                json={"init_data": init_data(1002), "service_id": None, "details": "a"},
+                headers=headers,
+            )
+            # A fresh initData alone is still the same request.
+            replay = await client.post(
+                "/api/requests/",
+                json={"init_data": init_data(1002), "service_id": None, "details": "a"},
+                headers=headers,
+            )
+            other = await client.post(
+                "/api/requests/",
+                json={"init_data": init_data(1002), "service_id": None, "details": "b"},
+                headers=headers,
+            )
+            return first, replay, other
+
+    first, replay, other = asyncio.run(main())
+
+    assert first.status_code == 201
+    assert replay.status_code == 201
+    assert replay.headers[REPLAYED_HEADER] == "true"
+    assert other.status_code == 422
+    assert _request_count() == 1
+
+
+def test_failed_attempt_is_forgotten(api, init_data):
+    async def main():
+        async with api() as client:
+            body = {"init_data": init_data(1003), "service_id": 999_999, "details": "d"}
+            headers = {IDEMPOTENCY_HEADER: "key-3"}
+            missing = await client.post("/api/requests/", json=body, headers=headers)
+            body["service_id"] = _add_service()
+            retried = await client.post("/api/requests/", json=body, headers=headers)
+            return missing, retried
+
+    missing, retried = asyncio.run(main())
+
+    assert missing.status_code == 404
+    assert retried.status_code == 201
+    assert REPLAYED_HEADER not in retried.headers
+    assert _request_count() == 1
+
+
+def test_token_bucket_answers_429(api, init_data):
+    from backend.app.main import app
+
+    limiter = RateLimiter(rate_per_second=1 / 60, burst=2, max_keys=10)
+
+    async def main():
+        app.dependency_overrides[get_request_rate_limiter] = lambda: limiter
+        async with api() as client:
+            responses = []
+            for user_id in (1004, 1004, 1004, 1005):
+                body = {"init_data": init_data(user_id), "service_id": None, "details": "d"}
+                responses.append(await client.post("/api/requests/", json=body))
+            return responses
+
+    responses = asyncio.run(main())
+
+    assert [response.status_code for response in responses] == [201, 201, 429, 201]
+    assert int(responses[2].headers["Retry-After"]) >= 1
+    assert _request_count() == 3
+
+
+def test_retry_on_another_worker_is_replayed(api, init_data):
+    async def main():
+        async with api() as client:
+            body = {"init_data": init_data(1006), "service_id": None, "details": "d"}
+            headers = {IDEMPOTENCY_HEADER: "key-6"}
+            first = await client.post("/api/requests/", json=body, headers=headers)
+            # What another worker knows: only the shared state.
+            idempotency_cache._entries.clear()
+            replay = await client.post("/api/requests/", json=body, headers=headers)
+            idempotency_cache._entries.clear()
+            other = await client.post(
+                "/api/requests/", json={**body, "details": "other"}, headers=headers
+            )
+            return first, replay, other
+
+    first, replay, other = asyncio.run(main())
+
+    assert replay.status_code == 201
+    assert replay.headers[REPLAYED_HEADER] == "true"
+    assert replay.json() == first.json()
+    assert other.status_code == 422
+    assert _request_count() == 1
+
+
+def test_retry_waits_for_an_attempt_running_on_another_worker(tmp_path):
+    state = SharedState(tmp_path / "shared.db")
+    first_worker = IdempotencyCache(60, 10, state=state)
+    second_worker = IdempotencyCache(60, 10, state=state, wait_seconds=5)
+    impatient_worker = IdempotencyCache(60, 10, state=state, wait_seconds=0.1)
+    release = asyncio.Event()
+    runs = []
+
+    def work(request_id: int):
+        async def create() -> schemas.RequestPublic:
+            runs.append(request_id)
+            await release.wait()
+            return schemas.RequestPublic(
+                id=request_id,
+                status=models.RequestStatusEnum.NEW,
+                details="d",
+                created_at=datetime(2024, 5, 1),
+                service=None,
+            )
+
+        return create
+
+    async def main():
+        first = asyncio.create_task(
+            first_worker.run(1, "key", "fp", work(1), schemas.RequestPublic)
+        )
+        await asyncio.sleep(0.05)
+        with pytest.raises(HTTPException) as impatient:
+            await impatient_worker.run(1, "key", "fp", work(3), schemas.RequestPublic)
+        second = asyncio.create_task(
+            second_worker.run(1, "key", "fp", work(2), schemas.RequestPublic)
+        )
+        await asyncio.sleep(0.1)
+        release.set()
+        return impatient.value, await first, await second
+
+    impatient, first, second = asyncio.run(main())
+    state.close()
+
+    assert impatient.status_code == 409
+    assert runs == [1]
+    assert first == (second[0], False)
+    assert second[1] is True
+
+
+def test_profile_is_saved_on_every_request(api, init_data):
+    async def main():
+        async with api() as client:
+            body = {"init_data": init_data(1007), "service_id": None, "details": "d"}
+            await client.post("/api/requests/", json=body)
+            # Another worker stored a newer profile in between.
+            with SessionLocal() as db:
+                db.get(models.User, 1007).first_name = "Changed"
+                db.commit()
+            await client.post("/api/requests/", json=body)
+
+    asyncio.run(main())
+
+    with SessionLocal() as db:
+        assert db.get(models.User, 1007).first_name == "Bench"
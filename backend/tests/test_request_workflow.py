@@ -0,0 +1,103 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select
+
+from backend.app import crud, models, schemas
+from backend.app.database import SessionLocal, engine
+
+Status = models.RequestStatusEnum
+
+pytestmark = pytest.mark.usefixtures("clean_db")
+
+
+def _query_plan(statement) -> str:
+    compiled = statement.compile(engine)
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params).all()
+    return " | ".join(row[-1] for row in rows)
+
+
+def _add_requests(count: int) -> list[int]:
+    with SessionLocal() as db:
+        user = models.User(telegram_id=3001, first_name="a")
+        requests = [
+            crud.create_request(
+                db, user=user, request_in=schemas.RequestCreate(service_id=None, details=f"r{n}")
+            )
+            for n in range(count)
+        ]
+        db.commit()
+        return [request.id for request in requests]
+
+
+def _status_counts() -> dict[Status, int]:
+    with SessionLocal() as db:
+        return crud.status_counts(db)
+
+
+def _history(request_id: int) -> list[tuple]:
+    with SessionLocal() as db:
+        rows = db.scalars(
+            select(models.RequestStatusHistory)
+            .where(models.RequestStatusHistory.request_id == request_id)
+            .order_by(models.RequestStatusHistory.id)
+        )
+        return [(row.from_status, row.to_status, row.actor_id, row.note) for row in rows]
+
+
+@pytest.mark.parametrize("after", [None, (datetime(2024, 1, 1), 10)], ids=["first", "next"])
+def test_queue_uses_the_partial_index(after):
+    plan = _query_plan(crud.request_queue_statement(limit=20, after=after))
+
+    assert "ix_requests_open_created_at_id" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def test_transitions_are_recorded_and_counted(api, init_data):
+    first, second, third = _add_requests(3)
+    headers = {"X-Telegram-Init-Data": init_data(777)}
+
+    async def main():
+        async with api() as client:
+            responses = []
+            for request_id, action, body in [
+                (first, "claim", {"note": "go"}),
+                (first, "close", None),
+                (second, "close", None),
+                (second, "claim", None),
+                (999_999, "claim", None),
+            ]:
+                url = f"/api/requests/{request_id}/{action}"
+                responses.append(await client.post(url, json=body, headers=headers))
+            responses.append(await client.get("/api/requests/queue", headers=headers))
+            return responses
+
+    *actions, queue = asyncio.run(main())
+
+    assert [response.status_code for response in actions] == [200, 200, 200, 409, 404]
+    assert [item["id"] for item in queue.json()] == [third]
+    assert _history(first) == [
+        (None, Status.NEW, 3001, None),
+        (Status.NEW, Status.IN_PROGRESS, 777, "go"),
+        (Status.IN_PROGRESS, Status.CLOSED, 777, None),
+    ]
+    assert _status_counts() == {Status.NEW: 1, Status.IN_PROGRESS: 0, Status.CLOSED: 2}
+
+
+def test_status_counts_follow_updates_and_deletes():
+    first, second = _add_requests(2)
+    with SessionLocal() as db:
+        db.get(models.Request, first).status = Status.IN_PROGRESS
+        db.commit()
+        # Setting the same status again must not count twice.
+        db.get(models.Request, first).status = Status.IN_PROGRESS
+        deleted = db.get(models.Request, second)
+        for entry in deleted.history:
+            db.delete(entry)
+        db.delete(deleted)
+        db.commit()
+
+    assert _status_counts() == {Status.NEW: 0, Status.IN_PROGRESS: 1, Status.CLOSED: 0}
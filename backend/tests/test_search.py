@@ -0,0 +1,44 @@
+import asyncio
+
+import pytest
+
+from backend.app import models
+from backend.app.database import SessionLocal, engine
+from backend.app.services import search
+
+
+@pytest.mark.parametrize(
+    ("raw", "expected"),
+    [
+        ("Поклейка обоев", '"поклей"* "обое"*'),
+        ("обои", '"обои"*'),
+        ("Ёлка стены", '"елка"* "стен"*'),
+        ("Tikkurila Euro 2024", '"tikkurila"* "euro"* "2024"*'),
+        ('ремонт" OR NEAR(a', '"ремон"* "or"* "near"* "a"*'),
+        (" -- ", None),
+    ],
+)
+def test_match_query(raw, expected):
+    assert search.build_match_query(raw) == expected
+
+
+@pytest.mark.usefixtures("clean_db")
+def test_search_finds_inflected_words(api, init_data):
+    with SessionLocal() as db:
+        user = models.User(telegram_id=2001, first_name="a")
+        db.add(user)
+        db.add(models.Request(user=user, details="Нужна поклейка обоев в спальне"))
+        db.add(models.Request(user=user, details="Покраска стен"))
+        db.commit()
+
+    async def main():
+        async with api() as client:
+            headers = {"X-Telegram-Init-Data": init_data(777)}
+            return await client.get("/api/search?q=поклейку&kind=request", headers=headers)
+
+    assert search.is_supported(engine)
+    response = asyncio.run(main())
+
+    assert response.status_code == 200
+    assert response.json()["total"] == 1
+    assert "**поклейка**" in response.json()["items"][0]["snippet"]
@@ -0,0 +1,22 @@
+import asyncio
+
+from backend.app.telegram.webhook import telegram_webhook_router
+
+
+def test_malformed_updates_are_dropped(api):
+    async def main():
+        async with api() as client:
+            not_json = await client.post(
+                "/telegram/webhook",
+                content=b"{not json",
+                headers={"Content-Type": "application/json"},
+            )
+            loaded_after_garbage = telegram_webhook_router.loaded
+            invalid = await client.post("/telegram/webhook", json={"message": "hi"})
+            return not_json, loaded_after_garbage, invalid
+
+    not_json, loaded_after_garbage, invalid = asyncio.run(main())
+
+    assert not_json.status_code == 200
+    assert not loaded_after_garbage
+    assert invalid.status_code == 200
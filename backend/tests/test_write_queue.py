@@ -0,0 +1,129 @@
+import asyncio
+
+import pytest
+from sqlalchemy import event, func, select
+
+from backend.app import models
+from backend.app.database import AsyncSessionLocal, async_engine
+from backend.app.write_queue import WriteQueue
+
+pytestmark = pytest.mark.usefixtures("clean_db")
+
+
+def _service(name: str) -> models.Service:
+    return models.Service(name=name, description="", price="1", is_active=True)
+
+
+async def _service_names() -> set[str]:
+    async with AsyncSessionLocal() as db:
+        return set(await db.scalars(select(models.Service.name)))
+
+
+def test_batch_is_committed_once():
+    commits = []
+
+    def count_commit(conn) -> None:
+        commits.append(conn)
+
+    async def main() -> tuple[list, set[str]]:
+        queue = WriteQueue(AsyncSessionLocal, max_batch=16, enabled=True)
+        await queue.start()
+
+        def unit(name: str):
+            async def add(db):
+                db.add(_service(name))
+                await db.flush()
+                return name
+
+            return add
+
+        async def peek(db):
+            # Another connection must not see the units released before this one.
+            async with AsyncSessionLocal() as other:
+                return await other.scalar(select(func.count(models.Service.id)))
+
+        async def failing(db):
+            db.add(_service("failed"))
+            await db.flush()
+            raise RuntimeError("unit failed")
+
+        event.listen(async_engine.sync_engine, "commit", count_commit)
+        try:
+            results = await asyncio.gather(
+                *(queue.submit(unit(f"s{index}")) for index in range(5)),
+                queue.submit(peek),
+                queue.submit(failing),
+                return_exceptions=True,
+            )
+        finally:
+            event.remove(async_engine.sync_engine, "commit", count_commit)
+            await queue.stop()
+        return results, await _service_names()
+
+    results, names = asyncio.run(main())
+
+    assert results[:5] == [f"s{index}" for index in range(5)]
+    assert results[5] == 0
+    assert isinstance(results[6], RuntimeError)
+    assert names == {f"s{index}" for index in range(5)}
+    assert len(commits) == 1
+
+
+def test_released_savepoint_is_undone_by_outer_rollback():
+    async def main() -> set[str]:
+        async with AsyncSessionLocal() as db:
+            async with db.begin_nested():
+                db.add(_service("released"))
+            async with AsyncSessionLocal() as other:
+                assert await other.scalar(select(func.count(models.Service.id))) == 0
+            await db.rollback()
+        return await _service_names()
+
+    assert asyncio.run(main()) == set()
+
+
+def test_stop_commits_the_queued_units():
+    async def main() -> list:
+        queue = WriteQueue(AsyncSessionLocal, max_batch=2, enabled=True)
+        await queue.start()
+
+        def unit(name: str):
+            async def add(db):
+                db.add(_service(name))
+                return name
+
+            return add
+
+        callers = [asyncio.create_task(queue.submit(unit(f"s{index}"))) for index in range(5)]
+        await asyncio.sleep(0)
+        await queue.stop()
+        return await asyncio.wait_for(asyncio.gather(*callers), 1)
+
+    results = asyncio.run(main())
+
+    assert results == [f"s{index}" for index in range(5)]
+    assert asyncio.run(_service_names()) == set(results)
+
+
+def test_stop_cancels_the_running_batch():
+    async def main() -> list:
+        queue = WriteQueue(AsyncSessionLocal, max_batch=16, enabled=True, stop_timeout=0.1)
+        await queue.start()
+        started = asyncio.Event()
+
+        async def stuck(db):
+            started.set()
+            await asyncio.Event().wait()
+
+        async def add(db):
+            db.add(_service("queued"))
+
+        callers = [asyncio.create_task(queue.submit(unit)) for unit in (stuck, add)]
+        await started.wait()
+        await queue.stop()
+        return await asyncio.wait_for(asyncio.gather(*callers, return_exceptions=True), 1)
+
+    results = asyncio.run(main())
+
+    assert [type(result) for result in results] == [asyncio.CancelledError] * 2
+    assert asyncio.run(_service_names()) == set()
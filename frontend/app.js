@@ -83,13 +83,30 @@ function renderServices(services) {
   });
 }
 
+function portfolioPicture(item) {
+  const images = item.images;
+  if (!images) {
+    return `<img src="${item.image_url}" alt="${item.title}" loading="lazy" />`;
+  }
+  const srcset = (format) =>
+    `${images.thumb[format]} ${images.thumb.width}w, ${images.medium[format]} ${images.medium.width}w`;
+  const sizes = "(max-width: 600px) 100vw, 50vw";
+  return `
+    <picture>
+      <source type="image/webp" srcset="${srcset("webp")}" sizes="${sizes}" />
+      <img src="${images.thumb.jpeg}" srcset="${srcset("jpeg")}" sizes="${sizes}"
+        alt="${item.title}" loading="lazy" decoding="async" />
+    </picture>
+  `;
+}
+
 function renderPortfolio(items) {
   portfolioGrid.innerHTML = "";
   items.forEach((item) => {
     const card = document.createElement("article");
     card.className = "card";
     card.innerHTML = `
-      <img src="${item.image_url}" alt="${item.title}" data-id="${item.id}" />
+      ${portfolioPicture(item)}
       <h3>${item.title}</h3>
       <p>${item.description}</p>
       <div class="badges">
@@ -116,13 +133,21 @@ async function bootstrapContent() {
 }
 
 const lightbox = document.getElementById("lightbox");
+const lightboxSource = document.getElementById("lightbox-source");
 const lightboxImage = document.getElementById("lightbox-image");
 const lightboxTitle = document.getElementById("lightbox-title");
 const lightboxDescription = document.getElementById("lightbox-description");
 const lightboxClose = document.getElementById("lightbox-close");
 
 function openLightbox(item) {
-  lightboxImage.src = item.image_url;
+  // Same WebP-with-JPEG-fallback as the gallery cards.
+  if (item.images) {
+    lightboxSource.srcset = item.images.full.webp;
+    lightboxImage.src = item.images.full.jpeg;
+  } else {
+    lightboxSource.removeAttribute("srcset");
+    lightboxImage.src = item.image_url;
+  }
   lightboxImage.alt = item.title;
   lightboxTitle.textContent = item.title;
   lightboxDescription.textContent = `${item.wallpaper_type} • ${item.area_sqm} м² • ${item.highlights}`;
@@ -157,6 +182,15 @@ btnWrite.addEventListener("click", openChat);
 
 document.getElementById("year").textContent = new Date().getFullYear();
 
+// Reused until the server confirms, so a retry after a dropped connection
+// returns the already created request instead of a duplicate.
+let pendingRequestKey = null;
+
+function newRequestKey() {
+  if (window.crypto?.randomUUID) return window.crypto.randomUUID();
+  return `${Date.now()}-${Math.random().toString(16).slice(2)}`;
+}
+
 btnEstimate.addEventListener("click", async () => {
   if (!tg?.initData) {
     alert("Откройте мини-приложение внутри Telegram, чтобы отправить запрос.");
@@ -165,18 +199,25 @@ btnEstimate.addEventListener("click", async () => {
 
   btnEstimate.disabled = true;
   btnEstimate.textContent = "Отправляем...";
+  pendingRequestKey = pendingRequestKey ?? newRequestKey();
 
   try {
     const response = await fetch(`${API_BASE}/requests/`, {
       method: "POST",
-      headers: { "Content-Type": "application/json" },
-      body: JSON.stringify({
-        details: "Запрос из mini app",
-        init_data: tg.initData,
-      }),
+      headers: {
+        "Content-Type": "application/json",
+        "X-Telegram-Init-Data": tg.initData,
+        "Idempotency-Key": pendingRequestKey,
+      },
+      body: JSON.stringify({ details: "Запрос из mini app" }),
     });
 
+    if (response.status === 429) {
+      pendingRequestKey = null;
+      throw new Error("Слишком много запросов, попробуйте через минуту");
+    }
     if (!response.ok) throw new Error("Не удалось отправить запрос");
+    pendingRequestKey = null;
     if (tg?.sendData) {
       tg.sendData(
         JSON.stringify({